@@ -0,0 +1,128 @@
+"""Benchmark for ProfanityFilter.contains_profanity.
+
+Compares the current matcher against the old loop that ran one `re.search`
+per bad word, and reports samples where the verdicts differ (message
+normalization catches obfuscations the old loop could not). Also checks that
+every entry of the old expanded word list (the defaults plus the separator and
+leet variants the old filter generated) is still flagged, and that ordinary
+messages resembling disguised entries are not.
+
+Usage: python benchmark_profanity.py [rounds]
+"""
+import re
+import sys
+import time
+
+from profanity_filter import ProfanityFilter
+
+SAMPLE_MESSAGES = [
+    "hello everyone, kaise ho sab log?",
+    "kal ka match dekha? kya shot mara tha yaar",
+    "bhai notes bhej do please, exam kal hai",
+    "tu pagal hai kya bsdk",
+    "what the f*ck is this",
+    "yeh group bahut accha hai, sab log active raho " * 10,
+    "koi mujhe batayega ki /help kaise use karte hain?",
+    "Good morning! Have a nice day all of you 🌞",
+    "teri maa ki chut",
+    "8==D lol",
+    "m@d4rch0d saala",
+    "𝕗𝕦𝕔𝕜 off",
+    "spam spam spam buy followers now cheap price dm me " * 40,
+]
+
+
+# Ordinary messages that contain the plain spelling of a disguised entry ("sh00t",
+# "c_nt", "f$ck") or a leet look-alike of a masked one ("a**"); none may be flagged
+BENIGN_MESSAGES = [
+    "photo shoot kal hai",
+    "shoot me a message",
+    "run fsck on the disk",
+    "item cnt: 4",
+    "Rated 4** by critics",
+]
+
+
+# How the old filter expanded the default list before matching
+LEGACY_PHRASE_SEPARATORS = [
+    '', '_', '-', '.', '*', '0', 'o', '@', '#', '$', '%', '&', '+', '=', '!', '?', '~', '`',
+    '|', '\\', '/', ':', ';', '<', '>', '"', "'", '(', ')', '[', ']', '{', '}',
+]
+LEGACY_LEET_MAP = {
+    'a': '@', 'e': '3', 'i': '1', 'o': '0', 's': '$', 't': '7', 'l': '1',
+    'A': '@', 'E': '3', 'I': '1', 'O': '0', 'S': '$', 'T': '7', 'L': '1'
+}
+
+
+def legacy_expanded_words(default_words):
+    """The word set the original filter searched for, built from its default list."""
+    words = set(default_words)
+    for word in default_words:
+        if ' ' in word:
+            words.update(word.replace(' ', separator) for separator in LEGACY_PHRASE_SEPARATORS)
+        leet_word = word
+        for char, replacement in LEGACY_LEET_MAP.items():
+            leet_word = leet_word.replace(char, replacement)
+        words.add(leet_word)
+    return words
+
+
+def legacy_contains_profanity(bad_words, text):
+    """The original implementation: one regex search per bad word."""
+    if not text:
+        return False
+    text = text.lower()
+    for word in bad_words:
+        if re.search(r'\b' + re.escape(word) + r'\b', text):
+            return True
+    return False
+
+
+def time_it(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in SAMPLE_MESSAGES:
+            func(text)
+    return time.perf_counter() - start
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    profanity_filter = ProfanityFilter(mongo_uri=None, index_path=None)
+    bad_words = set(profanity_filter.bad_words)
+
+    legacy_words = legacy_expanded_words(profanity_filter.default_words)
+    missed = sorted(word for word in legacy_words if not profanity_filter.contains_profanity(word))
+    assert not missed, f"{len(missed)} of {len(legacy_words)} legacy entries are no longer flagged: {missed[:20]}"
+    print(f"All {len(legacy_words)} entries of the legacy expanded word list are flagged.")
+
+    flagged = [text for text in BENIGN_MESSAGES if profanity_filter.contains_profanity(text)]
+    assert not flagged, f"Ordinary messages are flagged: {flagged}"
+    flagged = [text for text, matches in zip(BENIGN_MESSAGES, profanity_filter.classify_many(BENIGN_MESSAGES)) if matches]
+    assert not flagged, f"classify_many reports matches in ordinary messages: {flagged}"
+    print(f"None of the {len(BENIGN_MESSAGES)} ordinary messages are flagged.")
+
+    for text in SAMPLE_MESSAGES:
+        expected = legacy_contains_profanity(bad_words, text)
+        actual = profanity_filter.contains_profanity(text)
+        if expected != actual:
+            print(f"Verdict differs for {text[:40]!r}: legacy={expected} current={actual}")
+
+    legacy_time = time_it(lambda text: legacy_contains_profanity(bad_words, text), rounds)
+    current_time = time_it(profanity_filter.contains_profanity, rounds)
+    checks = rounds * len(SAMPLE_MESSAGES)
+
+    print(f"Vocabulary size: {len(bad_words)} words, {checks} checks")
+    print(f"Legacy regex loop: {legacy_time * 1000 / checks:.3f} ms/message")
+    print(f"Current matcher:   {current_time * 1000 / checks:.3f} ms/message")
+    print(f"Speedup: {legacy_time / current_time:.1f}x")
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        profanity_filter.classify_many(SAMPLE_MESSAGES)
+    batch_time = time.perf_counter() - start
+    print(f"classify_many:     {batch_time * 1000 / checks:.3f} ms/message (with spans and categories)")
+
+
+if __name__ == "__main__":
+    main()
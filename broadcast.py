@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from pyrogram import Client, enums
+from pyrogram.types import Message
+from pyrogram.errors import UserIsBlocked, InputUserDeactivated, ChannelPrivate, ChatIdInvalid
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from dispatcher import OutboundDispatcher, PRIORITY_NOTIFICATION, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# Targets are read, sent and checkpointed in batches of this size
+BATCH_SIZE = 200
+# How many copies may be waiting on the dispatcher at once
+WORKERS = 25
+# Minimum seconds between two edits of the progress message
+PROGRESS_INTERVAL = 10
+# How often the leader looks for jobs created by other instances
+JOB_POLL_SECONDS = 15
+
+# (collection, id field) pairs, broadcast in this order
+TARGETS = (("users", "user_id"), ("groups", "chat_id"))
+
+# Errors that mean the target will never accept messages again
+PERMANENT_ERRORS = {
+    "users": (UserIsBlocked, InputUserDeactivated),
+    "groups": (ChannelPrivate, ChatIdInvalid),
+}
+
+
+class BroadcastEngine:
+    """Runs broadcasts as resumable background jobs.
+
+    A job copies one source message to every user and group. Targets are walked
+    in id order, one batch at a time, with up to WORKERS copies in flight, paced by
+    the outbound dispatcher. After each batch the job document in `broadcast_jobs`
+    records the last id done, and every target's outcome is stored in
+    `broadcast_results` as soon as it is known. A job interrupted by a restart
+    resumes from its checkpoint and skips the targets that already have a result.
+    Targets that blocked the bot or no longer exist are removed from
+    `users`/`groups`.
+
+    With a leader `lease` (clustered mode) only the leader sends: other instances
+    just create the job, and the leader's `run` picks it up. A leader that loses
+    the lease stops after the current batch and the next one resumes the job.
+    """
+
+    def __init__(self, client: Client, db: AsyncIOMotorDatabase, dispatcher: OutboundDispatcher, lease=None):
+        self.client = client
+        self.db = db
+        self.dispatcher = dispatcher
+        self.lease = lease
+        self._running = {}
+
+    def _leading(self) -> bool:
+        return self.lease is None or self.lease.is_leader
+
+    async def start(self, source: Message, status_message: Message) -> ObjectId:
+        """Creates a broadcast job for `source` and runs it in the background."""
+        job = {
+            "admin_id": source.from_user.id,
+            "source_chat_id": source.chat.id,
+            "source_message_id": source.id,
+            "status_chat_id": status_message.chat.id,
+            "status_message_id": status_message.id,
+            "status": "running",
+            "phase": 0,
+            "cursor": None,
+            "sent": 0,
+            "failed": 0,
+            "pruned": 0,
+            "created_at": datetime.now(),
+        }
+        result = await self.db.broadcast_jobs.insert_one(job)
+        job["_id"] = result.inserted_id
+        if self._leading():
+            self._spawn(job)
+        return job["_id"]
+
+    async def run(self):
+        """Resumes interrupted jobs, then keeps picking up jobs created elsewhere."""
+        await self.db.broadcast_results.create_index([("job_id", 1), ("target_id", 1)], unique=True)
+        while not self.client.is_initialized:
+            await asyncio.sleep(1)
+        while True:
+            await self.resume_pending()
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+    async def resume_pending(self):
+        """Restarts jobs that are marked running but have no task on this instance."""
+        async for job in self.db.broadcast_jobs.find({"status": "running", "_id": {"$nin": list(self._running)}}):
+            # The counters are only checkpointed per batch; the result log is exact
+            for outcome in ("sent", "failed", "pruned"):
+                job[outcome] = await self.db.broadcast_results.count_documents({"job_id": job["_id"], "outcome": outcome})
+            logger.info(f"Resuming broadcast {job['_id']} at phase {job['phase']}, cursor {job['cursor']}.")
+            self._spawn(job)
+
+    def is_running(self) -> bool:
+        return bool(self._running)
+
+    def _spawn(self, job):
+        task = asyncio.ensure_future(self._run(job))
+        self._running[job["_id"]] = task
+        task.add_done_callback(lambda _: self._running.pop(job["_id"], None))
+
+    async def _run(self, job):
+        try:
+            while job["phase"] < len(TARGETS):
+                if not self._leading():
+                    logger.info(f"Broadcast {job['_id']} handed over to the new leader at phase {job['phase']}, cursor {job['cursor']}.")
+                    return
+                collection_name, id_field = TARGETS[job["phase"]]
+                query = {} if job["cursor"] is None else {id_field: {"$gt": job["cursor"]}}
+                batch = [
+                    doc[id_field]
+                    async for doc in self.db[collection_name]
+                        .find(query, {id_field: 1})
+                        .sort(id_field, 1)
+                        .limit(BATCH_SIZE)
+                ]
+                if not batch:
+                    job["phase"] += 1
+                    job["cursor"] = None
+                else:
+                    await self._send_batch(job, collection_name, id_field, batch)
+                    job["cursor"] = batch[-1]
+                await self._checkpoint(job)
+                await self._report_progress(job)
+
+            job["status"] = "done"
+            await self._checkpoint(job)
+            await self._report_progress(job, force=True)
+            await self._send_report(job)
+        except Exception as e:
+            logger.error(f"Broadcast {job['_id']} stopped at phase {job['phase']}, cursor {job['cursor']}: {e}")
+
+    async def _send_batch(self, job, collection_name, id_field, batch):
+        done = {
+            doc["target_id"]
+            async for doc in self.db.broadcast_results.find(
+                {"job_id": job["_id"], "target_id": {"$in": batch}}, {"target_id": 1}
+            )
+        }
+        semaphore = asyncio.Semaphore(WORKERS)
+
+        async def send_one(target_id):
+            async with semaphore:
+                outcome = await self._copy_to(job, collection_name, target_id)
+            job[outcome] += 1
+            # Recorded right away so a restart mid-batch doesn't send to this target again
+            await self.db.broadcast_results.insert_one(
+                {"job_id": job["_id"], "target_id": target_id, "kind": collection_name, "outcome": outcome}
+            )
+            return target_id, outcome
+
+        results = await asyncio.gather(*[send_one(target_id) for target_id in batch if target_id not in done])
+        pruned = [target_id for target_id, outcome in results if outcome == "pruned"]
+        if pruned:
+            await self.db[collection_name].delete_many({id_field: {"$in": pruned}})
+
+    async def _copy_to(self, job, collection_name, target_id) -> str:
+        try:
+            await self.dispatcher.call(
+                PRIORITY_BACKGROUND, target_id, self.client.copy_message,
+                chat_id=target_id,
+                from_chat_id=job["source_chat_id"],
+                message_id=job["source_message_id"]
+            )
+            return "sent"
+        except PERMANENT_ERRORS[collection_name] as e:
+            logger.info(f"Pruning {collection_name} target {target_id} after broadcast error: {e}")
+            return "pruned"
+        except Exception as e:
+            logger.error(f"Failed to send broadcast to {collection_name} target {target_id}: {e}")
+            return "failed"
+
+    async def _checkpoint(self, job):
+        await self.db.broadcast_jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {key: job[key] for key in ("status", "phase", "cursor", "sent", "failed", "pruned")}}
+        )
+
+    async def _report_progress(self, job, force=False):
+        now = time.monotonic()
+        if not force and now - job.get("_reported_at", 0) < PROGRESS_INTERVAL:
+            return
+        job["_reported_at"] = now
+        if job["status"] == "done":
+            stage = "Complete"
+        else:
+            stage = f"in progress ({TARGETS[min(job['phase'], len(TARGETS) - 1)][0]})"
+        try:
+            await self.dispatcher.call(
+                PRIORITY_BACKGROUND, job["status_chat_id"], self.client.edit_message_text,
+                job["status_chat_id"], job["status_message_id"],
+                f"<b>📢 Broadcast {stage}</b>\n\n"
+                f"✅ Sent: {job['sent']}\n"
+                f"❌ Failed: {job['failed']}\n"
+                f"🧹 Removed (blocked/deleted): {job['pruned']}",
+                parse_mode=enums.ParseMode.HTML
+            )
+        except Exception as e:
+            logger.debug(f"Could not update broadcast progress message: {e}")
+
+    async def _send_report(self, job):
+        broadcast_report = (
+            f"<b>📢 Broadcast Complete!</b>\n\n"
+            f"✅ Sent to: {job['sent']} chats.\n"
+            f"❌ Failed to send to: {job['failed'] + job['pruned']} chats "
+            f"({job['pruned']} blocked or deleted, removed from the database)."
+        )
+        await self.dispatcher.call(
+            PRIORITY_NOTIFICATION, job["admin_id"], self.client.send_message,
+            job["admin_id"], broadcast_report, parse_mode=enums.ParseMode.HTML
+        )
+        logger.info(f"Broadcast {job['_id']} finished. Sent: {job['sent']}, Failed: {job['failed']}, Pruned: {job['pruned']}")
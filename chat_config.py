@@ -0,0 +1,103 @@
+import asyncio
+import logging
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# The per-chat collections merged into one ChatConfig
+CONFIG_COLLECTIONS = ("settings", "warn_settings", "notification_settings", "reminder_settings")
+
+
+class ChatConfig:
+    """All per-chat configuration documents of one chat, loaded together.
+
+    Each attribute holds the raw MongoDB document of the collection with the same
+    name, or None if the chat has no document there yet.
+    """
+
+    __slots__ = ("chat_id",) + CONFIG_COLLECTIONS
+
+    def __init__(self, chat_id, documents):
+        self.chat_id = chat_id
+        for collection_name, document in zip(CONFIG_COLLECTIONS, documents):
+            setattr(self, collection_name, document)
+
+    def apply(self, collection_name, fields):
+        """Applies a `$set` style update (dotted keys allowed) to the cached document."""
+        document = getattr(self, collection_name)
+        if document is None:
+            document = {"chat_id": self.chat_id}
+            setattr(self, collection_name, document)
+        for key, value in fields.items():
+            target = document
+            *parents, leaf = key.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = value
+
+
+class ChatConfigCache:
+    """Write-through LRU cache of ChatConfig objects keyed by chat_id.
+
+    A miss loads the four collections concurrently, and concurrent misses for the
+    same chat share one load. Updates go to MongoDB first and are then applied to
+    the cached object, so reads never see stale values written by this process.
+    Entries also expire after `ttl` seconds to pick up writes from other replicas.
+    """
+
+    def __init__(self, db, max_size=10000, ttl=300):
+        self.db = db
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._pending = {}
+
+    async def get(self, chat_id) -> ChatConfig:
+        config = self._cache.get(chat_id)
+        if config is not None:
+            return config
+
+        pending = self._pending.get(chat_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load(chat_id))
+            self._pending[chat_id] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(chat_id, None))
+        return await asyncio.shield(pending)
+
+    async def _load(self, chat_id) -> ChatConfig:
+        documents = await asyncio.gather(*[
+            self.db[collection_name].find_one({"chat_id": chat_id})
+            for collection_name in CONFIG_COLLECTIONS
+        ])
+        config = ChatConfig(chat_id, documents)
+        self._cache.set(chat_id, config)
+        return config
+
+    async def update(self, collection_name, chat_id, fields):
+        """Writes `fields` to MongoDB with `$set` and then to the cached config."""
+        await self.db[collection_name].update_one({"chat_id": chat_id}, {"$set": fields}, upsert=True)
+        config = self._cache.get(chat_id)
+        if config is None and chat_id in self._pending:
+            # A load that started before this write may have read the old document
+            config = await asyncio.shield(self._pending[chat_id])
+        if config is not None:
+            config.apply(collection_name, fields)
+
+    async def ensure_defaults(self, collection_name, chat_id, defaults) -> dict:
+        """Returns the chat's document, creating it from `defaults` if it doesn't exist."""
+        config = await self.get(chat_id)
+        document = getattr(config, collection_name)
+        if document is None:
+            document = {"chat_id": chat_id, **defaults}
+            setattr(config, collection_name, document)
+            await self.db[collection_name].update_one(
+                {"chat_id": chat_id},
+                {"$setOnInsert": defaults},
+                upsert=True
+            )
+        return document
+
+    def invalidate(self, chat_id):
+        self._cache.pop(chat_id)
+
+    def clear(self):
+        self._cache.clear()
@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import logging
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+# A chat's updates handled in one go before its slot goes to the next waiting chat
+MAX_BURST_PER_CHAT = 20
+
+
+class _Shard:
+    """Bounded queue of pending updates for the chats that hash to one shard.
+
+    Updates of one chat are handled strictly in order, by at most one task at a
+    time. Up to `concurrency` chats of the shard are handled at once. When
+    `max_pending` updates are waiting, the oldest update of the chat with the
+    longest queue is dropped, so the noisy chat pays for the overload.
+    """
+
+    def __init__(self, index: int, max_pending: int, concurrency: int):
+        self.index = index
+        self.max_pending = max_pending
+        self.concurrency = concurrency
+        self.queues = OrderedDict()
+        self.active = set()
+        self.size = 0
+        self.dropped = 0
+
+    def submit(self, chat_id, job):
+        if self.size >= self.max_pending:
+            self._shed()
+        queue = self.queues.get(chat_id)
+        if queue is None:
+            queue = self.queues[chat_id] = deque()
+        queue.append(job)
+        self.size += 1
+        self._start_waiting_chats()
+
+    def _shed(self):
+        chat_id = max(self.queues, key=lambda c: len(self.queues[c]))
+        queue = self.queues[chat_id]
+        queue.popleft()
+        self.size -= 1
+        self.dropped += 1
+        if not queue and chat_id not in self.active:
+            del self.queues[chat_id]
+        if self.dropped % 100 == 1:
+            logger.warning(f"Shard {self.index} is full; dropping updates from chat {chat_id} ({self.dropped} dropped so far).")
+
+    def _start_waiting_chats(self):
+        while len(self.active) < self.concurrency:
+            chat_id = next((c for c in self.queues if c not in self.active), None)
+            if chat_id is None:
+                return
+            self.active.add(chat_id)
+            asyncio.ensure_future(self._drain(chat_id))
+
+    async def _drain(self, chat_id):
+        try:
+            for _ in range(MAX_BURST_PER_CHAT):
+                queue = self.queues.get(chat_id)
+                if not queue:
+                    break
+                job = queue.popleft()
+                self.size -= 1
+                try:
+                    await job()
+                except Exception as e:
+                    logger.exception(f"Unhandled error while handling an update from chat {chat_id}: {e}")
+        finally:
+            queue = self.queues.get(chat_id)
+            if queue:
+                # Still busy: go to the back so the other waiting chats get a turn
+                self.queues.move_to_end(chat_id)
+            else:
+                self.queues.pop(chat_id, None)
+            self.active.discard(chat_id)
+            self._start_waiting_chats()
+
+
+class ChatShardPipeline:
+    """Spreads incoming updates over a fixed set of shards by chat_id.
+
+    Handlers decorated with `sharded` return as soon as the update is queued, so
+    Pyrogram's own workers are never tied up by one busy chat. Each shard keeps
+    per-chat ordering, bounds its queue and sheds load on its own, so a flood in
+    one group only affects the groups that share its shard, and only after the
+    flooding group's own backlog has been cut.
+    """
+
+    def __init__(self, num_shards: int = 8, max_pending: int = 1000, concurrency: int = 8):
+        self.shards = [_Shard(index, max_pending, concurrency) for index in range(num_shards)]
+
+    def submit(self, chat_id, job):
+        """Queues `job` (a coroutine function without arguments) for `chat_id`."""
+        self.shards[hash(chat_id) % len(self.shards)].submit(chat_id, job)
+
+    def sharded(self, handler):
+        """Decorator for `handler(client, update)` that runs it through the chat's shard."""
+        @functools.wraps(handler)
+        async def enqueue(client, update):
+            chat = getattr(update, "chat", None) or getattr(getattr(update, "message", None), "chat", None)
+            self.submit(chat.id if chat else None, lambda: handler(client, update))
+        return enqueue
+
+    def queue_depths(self) -> dict:
+        return {str(shard.index): shard.size for shard in self.shards}
+
+    def dropped(self) -> dict:
+        return {str(shard.index): shard.dropped for shard in self.shards}
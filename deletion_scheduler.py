@@ -0,0 +1,117 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+
+from pyrogram import Client
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from dispatcher import OutboundDispatcher, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# Telegram accepts at most 100 message ids per delete_messages call
+MAX_IDS_PER_DELETE = 100
+# Deletions due within this many seconds of each other are sent together
+BATCH_WINDOW_SECONDS = 2
+
+
+class DeletionScheduler:
+    """Deletes bot messages (e.g. incident notifications) after a delay.
+
+    Pending deletions live in a min-heap ordered by due time and are mirrored to
+    the `scheduled_deletions` collection, so they survive restarts. A single
+    background task sleeps until the earliest one is due, then deletes everything
+    due in the next BATCH_WINDOW_SECONDS with one delete_messages call per chat.
+    """
+
+    def __init__(self, client: Client, dispatcher: OutboundDispatcher = None):
+        self.client = client
+        self.dispatcher = dispatcher
+        self.db = None
+        self._heap = []
+        self._wakeup = asyncio.Event()
+
+    async def load(self, db: AsyncIOMotorDatabase):
+        """Attaches the database and restores deletions pending from before a restart."""
+        self.db = db
+        await db.scheduled_deletions.create_index("due_at")
+        await db.scheduled_deletions.create_index([("chat_id", 1), ("message_id", 1)], unique=True)
+        async for doc in db.scheduled_deletions.find({}, {"_id": 0}):
+            due_at = doc["due_at"].replace(tzinfo=timezone.utc).timestamp()
+            heapq.heappush(self._heap, (due_at, doc["chat_id"], doc["message_id"]))
+        if self._heap:
+            logger.info(f"Restored {len(self._heap)} scheduled message deletions.")
+        self._wakeup.set()
+
+    async def schedule(self, chat_id: int, message_id: int, delay_seconds: float):
+        due_at = time.time() + delay_seconds
+        if self.db is not None:
+            try:
+                await self.db.scheduled_deletions.update_one(
+                    {"chat_id": chat_id, "message_id": message_id},
+                    {"$set": {"due_at": datetime.fromtimestamp(due_at, tz=timezone.utc)}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"Error persisting scheduled deletion for message {message_id} in {chat_id}: {e}")
+        heapq.heappush(self._heap, (due_at, chat_id, message_id))
+        if self._heap[0][0] == due_at:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        return len(self._heap)
+
+    def _pop_due(self) -> dict:
+        """Pops every entry due within the batch window, grouped by chat_id."""
+        horizon = time.time() + BATCH_WINDOW_SECONDS
+        due = {}
+        while self._heap and self._heap[0][0] <= horizon:
+            _, chat_id, message_id = heapq.heappop(self._heap)
+            due.setdefault(chat_id, []).append(message_id)
+        return due
+
+    async def _delete_batch(self, chat_id: int, message_ids: list):
+        for i in range(0, len(message_ids), MAX_IDS_PER_DELETE):
+            chunk = message_ids[i:i + MAX_IDS_PER_DELETE]
+            try:
+                if self.dispatcher is not None:
+                    await self.dispatcher.call(
+                        PRIORITY_BACKGROUND, chat_id, self.client.delete_messages,
+                        chat_id=chat_id, message_ids=chunk
+                    )
+                else:
+                    await self.client.delete_messages(chat_id=chat_id, message_ids=chunk)
+            except Exception as e:
+                # Usually the message was already closed by a user or the bot lost its rights
+                logger.warning(f"Error deleting timed notifications {chunk} in {chat_id}: {e}")
+        if self.db is not None:
+            try:
+                await self.db.scheduled_deletions.delete_many({"chat_id": chat_id, "message_id": {"$in": message_ids}})
+            except Exception as e:
+                logger.error(f"Error clearing scheduled deletions for {chat_id}: {e}")
+
+    async def run(self):
+        while not self.client.is_initialized:
+            await asyncio.sleep(1)
+
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self._pop_due()
+            await asyncio.gather(*[
+                self._delete_batch(chat_id, message_ids)
+                for chat_id, message_ids in due.items()
+            ])
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+from pyrogram.errors import FloodWait
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, served strictly in this order
+PRIORITY_MODERATION = 0    # deleting offending messages, mutes and bans
+PRIORITY_INTERACTIVE = 1   # replies to commands and buttons, edits of the bot's menus
+PRIORITY_NOTIFICATION = 2  # warnings and other unprompted messages in groups
+PRIORITY_BACKGROUND = 3    # log channel, reminders, broadcasts, cleanup
+
+# Telegram allows about 30 messages/s overall and 20 messages/minute in one group
+GLOBAL_RATE = 30
+GLOBAL_BURST = 30
+PER_CHAT_RATE = 20 / 60
+PER_CHAT_BURST = 5
+
+# An idle bucket refills completely within a few seconds, so old ones can be dropped
+CHAT_BUCKET_TTL = 600
+CHAT_BUCKET_MAX_CHATS = 20000
+
+MAX_CONCURRENT_CALLS = 20
+MAX_FLOOD_RETRIES = 3
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def blocked_time(self, now) -> float:
+        return max(0.0, self.blocked_until - now)
+
+    def wait_time(self, now) -> float:
+        """Seconds until one token is available (0 if one is available now)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        """Hands out no tokens for `seconds` (used after a FloodWait)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class _Job:
+    __slots__ = ("priority", "chat_id", "func", "args", "kwargs", "future", "paced", "attempts")
+
+    def __init__(self, priority, chat_id, func, args, kwargs, future, paced):
+        self.priority = priority
+        self.chat_id = chat_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.paced = paced
+        self.attempts = 0
+
+
+class OutboundDispatcher:
+    """Central queue for outbound Telegram calls, paced by token buckets.
+
+    Every call takes a token from one global bucket and, for most calls, from a
+    per-chat bucket, so one noisy group cannot use up the bot's whole budget.
+    Moderation calls skip the per-chat budget (deleting spam must not wait behind
+    the chat's own message limit), and so do calls queued with `call_unpaced`, such
+    as edits of the bot's own messages, which Telegram doesn't count as new
+    messages; both still honour a FloodWait on the chat. Pending calls are served by
+    priority class and round-robin across chats within a class. A FloodWait blocks
+    the global bucket and the chat's bucket for the requested time (Telegram doesn't
+    say which limit was hit) and the call is retried.
+    """
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self._chat_buckets = TTLCache(max_size=CHAT_BUCKET_MAX_CHATS, ttl=CHAT_BUCKET_TTL)
+        # priority -> chat_id -> deque of jobs; OrderedDict order is the round-robin order
+        self._queues = [OrderedDict() for _ in (PRIORITY_MODERATION, PRIORITY_INTERACTIVE, PRIORITY_NOTIFICATION, PRIORITY_BACKGROUND)]
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def call(self, priority, chat_id, func, /, *args, **kwargs):
+        """Queues `func(*args, **kwargs)` and returns its result once it has run.
+
+        `chat_id` is the chat the call acts on (None if it isn't tied to one).
+        """
+        return await self._call(priority, chat_id, func, args, kwargs, priority != PRIORITY_MODERATION)
+
+    async def call_unpaced(self, priority, chat_id, func, /, *args, **kwargs):
+        """Like `call`, but the call doesn't take from the chat's message budget."""
+        return await self._call(priority, chat_id, func, args, kwargs, False)
+
+    async def _call(self, priority, chat_id, func, args, kwargs, paced):
+        self.start()
+        future = asyncio.get_event_loop().create_future()
+        self._enqueue(_Job(priority, chat_id, func, args, kwargs, future, paced))
+        return await future
+
+    def pending(self) -> int:
+        return sum(len(jobs) for queue in self._queues for jobs in queue.values())
+
+    def _enqueue(self, job, front=False):
+        jobs = self._queues[job.priority].setdefault(job.chat_id, deque())
+        if front:
+            jobs.appendleft(job)
+        else:
+            jobs.append(job)
+        self._wakeup.set()
+
+    def _chat_bucket(self, job):
+        if job.chat_id is None:
+            return None
+        bucket = self._chat_buckets.get(job.chat_id)
+        if bucket is None:
+            bucket = TokenBucket(PER_CHAT_RATE, PER_CHAT_BURST)
+            self._chat_buckets.set(job.chat_id, bucket)
+        return bucket
+
+    def _next_job(self, now):
+        """Pops the next runnable job, or returns (None, seconds until one may be runnable)."""
+        soonest = None
+        for queue in self._queues:
+            for chat_id in list(queue):
+                jobs = queue[chat_id]
+                bucket = self._chat_bucket(jobs[0])
+                if bucket is None:
+                    wait = 0.0
+                elif not jobs[0].paced:
+                    # Moderation and unpaced calls only honour a FloodWait on the chat, not its message budget
+                    wait = bucket.blocked_time(now)
+                else:
+                    wait = bucket.wait_time(now)
+                if wait > 0:
+                    soonest = wait if soonest is None else min(soonest, wait)
+                    continue
+                job = jobs.popleft()
+                # Move the chat to the back so other chats get their turn
+                del queue[chat_id]
+                if jobs:
+                    queue[chat_id] = jobs
+                if bucket is not None and job.paced:
+                    bucket.take(now)
+                return job, 0.0
+        return None, soonest
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            global_wait = self.global_bucket.wait_time(now)
+            if global_wait > 0:
+                await asyncio.sleep(global_wait)
+                continue
+
+            job, wait = self._next_job(now)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self.global_bucket.take(now)
+            await self._slots.acquire()
+            asyncio.ensure_future(self._execute(job))
+
+    async def _execute(self, job):
+        if job.future.done():
+            # The caller gave up (e.g. its handler was cancelled) while the call was queued
+            self._slots.release()
+            return
+        try:
+            result = await job.func(*job.args, **job.kwargs)
+        except FloodWait as e:
+            job.attempts += 1
+            self.global_bucket.block(e.value)
+            chat_bucket = self._chat_bucket(job)
+            if chat_bucket is not None:
+                chat_bucket.block(e.value)
+            logger.warning(f"FloodWait of {e.value}s for chat {job.chat_id}, call {job.func.__name__} (attempt {job.attempts}).")
+            if job.attempts > MAX_FLOOD_RETRIES:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                self._enqueue(job, front=True)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._slots.release()
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+
+from pyrogram import Client
+from pyrogram.errors import RPCError
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from dispatcher import OutboundDispatcher, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# Every collection that holds per-chat data, keyed by chat_id
+CHAT_COLLECTIONS = (
+    "groups", "settings", "warn_settings", "notification_settings", "reminder_settings",
+    "whitelist", "warnings", "biolink_exceptions", "config", "link_rules",
+)
+# Number of get_chat probes in flight at once
+SWEEP_CONCURRENCY = 10
+# Dead chat ids are removed in chunks of this size
+DELETE_BATCH_SIZE = 500
+# get_chat errors that mean the group is gone or the bot is out of it for good. Others,
+# such as PEER_ID_INVALID (this session hasn't met the peer yet), say nothing about the group.
+DEAD_CHAT_ERRORS = {"CHANNEL_PRIVATE", "CHAT_ID_INVALID", "CHANNEL_INVALID", "USER_NOT_PARTICIPANT", "CHAT_FORBIDDEN"}
+
+
+async def find_stale_groups(client: Client, db: AsyncIOMotorDatabase, dispatcher: OutboundDispatcher, on_progress=None):
+    """Probes every known group with get_chat and returns (total, stale chat ids).
+
+    A group is stale only when Telegram answers with one of DEAD_CHAT_ERRORS (the
+    bot was removed or the group is gone). FloodWaits are absorbed by the
+    dispatcher. Any other error, including an unknown peer after a session reset
+    or a move to another host, leaves the group alone, so the sweep never deletes
+    data of a group it merely couldn't resolve.
+    `on_progress(done, total)` is awaited now and then if given.
+    """
+    group_ids = [doc["chat_id"] async for doc in db.groups.find({}, {"chat_id": 1})]
+    total = len(group_ids)
+    stale = []
+    done = 0
+    semaphore = asyncio.Semaphore(SWEEP_CONCURRENCY)
+
+    async def probe(chat_id):
+        nonlocal done
+        async with semaphore:
+            try:
+                await dispatcher.call(PRIORITY_BACKGROUND, None, client.get_chat, chat_id)
+            except RPCError as e:
+                if getattr(e, "ID", None) in DEAD_CHAT_ERRORS:
+                    logger.warning(f"Bot is no longer in chat {chat_id} or cannot access it ({e.ID}).")
+                    stale.append(chat_id)
+                else:
+                    logger.warning(f"Could not check chat {chat_id}, keeping its data: {e}")
+            except Exception as e:
+                logger.error(f"Could not check chat {chat_id}, keeping its data: {e}")
+        done += 1
+        if on_progress is not None and done % 50 == 0:
+            await on_progress(done, total)
+
+    await asyncio.gather(*[probe(chat_id) for chat_id in group_ids])
+    return total, stale
+
+
+async def delete_group_data(db: AsyncIOMotorDatabase, chat_ids: list):
+    """Removes all data of `chat_ids` from every per-chat collection with `$in` deletes."""
+    for i in range(0, len(chat_ids), DELETE_BATCH_SIZE):
+        chunk = chat_ids[i:i + DELETE_BATCH_SIZE]
+        await asyncio.gather(*[
+            db[collection_name].delete_many({"chat_id": {"$in": chunk}})
+            for collection_name in CHAT_COLLECTIONS
+        ])
+
+
+async def sweep_stale_groups(client: Client, db: AsyncIOMotorDatabase, dispatcher: OutboundDispatcher, on_removed=None, on_progress=None):
+    """Finds stale groups and deletes their data. Returns (total groups, removed chat ids).
+
+    `on_removed(chat_ids)` is called afterwards so in-memory caches can drop them.
+    """
+    total, stale = await find_stale_groups(client, db, dispatcher, on_progress)
+    if stale:
+        await delete_group_data(db, stale)
+        if on_removed is not None:
+            on_removed(stale)
+    logger.info(f"Stale group sweep complete. Checked {total} groups, removed {len(stale)}.")
+    return total, stale
+
+
+async def periodic_group_sweeper(client: Client, db: AsyncIOMotorDatabase, dispatcher: OutboundDispatcher, interval_hours: float, on_removed=None):
+    """Runs sweep_stale_groups every `interval_hours` in the background."""
+    if db is None or interval_hours <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        try:
+            await sweep_stale_groups(client, db, dispatcher, on_removed=on_removed)
+        except Exception as e:
+            logger.error(f"Error in periodic stale group sweep: {e}")
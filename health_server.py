@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# How often event-loop lag and MongoDB latency are measured
+PROBE_INTERVAL_SECONDS = 15
+# Above this the loop is considered stuck and the health check fails
+MAX_LOOP_LAG_SECONDS = 5
+MONGO_PING_TIMEOUT_SECONDS = 5
+REQUEST_TIMEOUT_SECONDS = 10
+
+
+class HealthMonitor:
+    """Liveness data for the health check and the Prometheus `/metrics` page.
+
+    A background task measures event-loop lag (how late a timed sleep wakes up)
+    and MongoDB ping latency. Handlers call `record_update` for every incoming
+    update. Other components register gauges, such as queue depths, with
+    `add_gauge`.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.loop_lag = 0.0
+        self.last_update_at = None
+        self.updates_total = 0
+        self.mongo_ping_seconds = None
+        self.mongo_ok = None
+        self._gauges = {}
+
+    def record_update(self):
+        self.last_update_at = time.time()
+        self.updates_total += 1
+
+    def add_gauge(self, name: str, help_text: str, func, label: str = None):
+        """Registers a gauge; with `label`, `func` returns a {label value: value} dict."""
+        self._gauges[name] = (help_text, func, label)
+
+    async def run_probes(self, db=None):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + PROBE_INTERVAL_SECONDS
+            await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+            self.loop_lag = max(0.0, loop.time() - expected)
+
+            if db is not None:
+                started = loop.time()
+                try:
+                    await asyncio.wait_for(db.command("ping"), timeout=MONGO_PING_TIMEOUT_SECONDS)
+                    self.mongo_ping_seconds = loop.time() - started
+                    self.mongo_ok = True
+                except Exception as e:
+                    logger.warning(f"MongoDB ping failed: {e}")
+                    self.mongo_ping_seconds = None
+                    self.mongo_ok = False
+
+    def is_healthy(self) -> bool:
+        return self.loop_lag <= MAX_LOOP_LAG_SECONDS and self.mongo_ok is not False
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        return {
+            "status": "healthy" if self.is_healthy() else "unhealthy",
+            "uptime_seconds": round(now - self.started_at),
+            "event_loop_lag_seconds": round(self.loop_lag, 4),
+            "seconds_since_last_update": round(now - self.last_update_at, 1) if self.last_update_at else None,
+            "updates_total": self.updates_total,
+            "mongodb_connected": self.mongo_ok,
+            "mongodb_ping_ms": round(self.mongo_ping_seconds * 1000, 2) if self.mongo_ping_seconds is not None else None,
+            **{name: func() for name, (_, func, _) in self._gauges.items()},
+        }
+
+    def render_metrics(self) -> str:
+        metrics = [
+            ("bot_up", "gauge", "1 if the health check passes.", int(self.is_healthy())),
+            ("bot_uptime_seconds", "gauge", "Seconds since the process started.", time.time() - self.started_at),
+            ("bot_event_loop_lag_seconds", "gauge", "How late the last timed probe woke up.", self.loop_lag),
+            ("bot_updates_total", "counter", "Telegram updates received.", self.updates_total),
+            ("bot_last_update_timestamp_seconds", "gauge", "Unix time of the last update received.", self.last_update_at or 0),
+        ]
+        if self.mongo_ok is not None:
+            metrics.append(("bot_mongodb_up", "gauge", "1 if the last MongoDB ping succeeded.", int(self.mongo_ok)))
+        if self.mongo_ping_seconds is not None:
+            metrics.append(("bot_mongodb_ping_seconds", "gauge", "Latency of the last MongoDB ping.", self.mongo_ping_seconds))
+        for name, (help_text, func, label) in self._gauges.items():
+            value = func()
+            if label is not None:
+                value = {f'{label}="{key}"': item for key, item in value.items()}
+            metrics.append((f"bot_{name}", "gauge", help_text, value))
+
+        lines = []
+        for name, metric_type, help_text, value in metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if isinstance(value, dict):
+                lines.extend(f"{name}{{{labels}}} {item}" for labels, item in value.items())
+            else:
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+async def _handle_request(monitor: HealthMonitor, reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=REQUEST_TIMEOUT_SECONDS)
+        # Drain the headers; nothing in them matters here
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=REQUEST_TIMEOUT_SECONDS)
+            if line in (b"\r\n", b"\n", b""):
+                break
+
+        parts = request_line.decode("latin-1").split()
+        path = parts[1].split("?")[0] if len(parts) >= 2 else "/"
+        if path == "/metrics":
+            status, content_type, body = "200 OK", "text/plain; version=0.0.4", monitor.render_metrics()
+        elif path in ("/", "/health"):
+            status = "200 OK" if monitor.is_healthy() else "503 Service Unavailable"
+            content_type, body = "application/json", json.dumps(monitor.snapshot())
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", "Not Found\n"
+
+        payload = body.encode()
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.debug(f"Health request failed: {e}")
+    finally:
+        writer.close()
+
+
+async def start_health_server(monitor: HealthMonitor, host: str, port: int):
+    """Serves `/` (JSON health) and `/metrics` (Prometheus) on the running event loop."""
+    server = await asyncio.start_server(lambda reader, writer: _handle_request(monitor, reader, writer), host, port)
+    logger.info(f"Health server listening on {host}:{port}.")
+    return server
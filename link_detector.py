@@ -0,0 +1,245 @@
+import logging
+import re
+from urllib.parse import urlsplit
+
+from pyrogram import enums
+from pyrogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+# Used only when a text carries no entities (bios, or messages from old clients)
+URL_FALLBACK_PATTERN = re.compile(r'\b(?:https?://|www\.|t\.me/|telegra\.ph/)[^\s]+', re.IGNORECASE)
+# "@name" not glued to a preceding word, so "someone@gmail.com" is not a mention
+MENTION_FALLBACK_PATTERN = re.compile(r'(?<![\w@.])@(\w{4,32})\b')
+DOMAIN_PATTERN = re.compile(r'[a-z0-9-]+(?:\.[a-z0-9-]+)+')
+# t.me/<this> is an invite or a Telegram page rather than a chat username
+TELEGRAM_LINK_HOSTS = {"t.me", "telegram.me", "telegram.dog"}
+TELEGRAM_RESERVED_PATHS = {"joinchat", "addstickers", "addemoji", "share", "proxy", "socks", "setlanguage", "login", "c", "s"}
+
+ALLOW = "allow"
+DENY = "deny"
+
+
+def host_of(url: str):
+    """Returns the lowercased host of a URL written with or without a scheme, or None."""
+    if "://" not in url:
+        url = "http://" + url
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    return host.rstrip(".") if host else None
+
+
+def _classify_url(url: str, hosts: list, usernames: list):
+    host = host_of(url)
+    if not host:
+        return
+    if host in TELEGRAM_LINK_HOSTS:
+        path = urlsplit(url if "://" in url else "http://" + url).path.strip("/").split("/")[0]
+        if path and not path.startswith("+") and path.lower() not in TELEGRAM_RESERVED_PATHS:
+            # t.me/name points at a chat, so it is judged like @name
+            usernames.append(path.lower())
+            return
+    hosts.append(host)
+
+
+def _utf16_slice(text: str, offset: int, length: int) -> str:
+    # Entity offsets count UTF-16 code units, not Python characters
+    encoded = text.encode("utf-16-le")
+    return encoded[offset * 2:(offset + length) * 2].decode("utf-16-le", errors="ignore")
+
+
+def extract_links_from_text(text: str):
+    """Regex fallback of extract_links for plain text; returns (hosts, usernames)."""
+    hosts, usernames = [], []
+    if not text:
+        return hosts, usernames
+    for match in URL_FALLBACK_PATTERN.finditer(text):
+        _classify_url(match.group().rstrip(".,;:!?)]}'\""), hosts, usernames)
+    usernames.extend(name.lower() for name in MENTION_FALLBACK_PATTERN.findall(text))
+    return hosts, usernames
+
+
+def extract_links(message: Message):
+    """Returns the (hosts, usernames) a message links to or mentions.
+
+    Reads Telegram's own url, text_link and mention entities, which already tell
+    emails, commands and plain text apart from links. Only a text without any
+    entities is scanned with the regex fallback.
+    """
+    text = message.text or message.caption or ""
+    entities = message.entities or message.caption_entities
+    if not entities:
+        return extract_links_from_text(text)
+
+    hosts, usernames = [], []
+    for entity in entities:
+        if entity.type == enums.MessageEntityType.URL:
+            _classify_url(_utf16_slice(text, entity.offset, entity.length), hosts, usernames)
+        elif entity.type == enums.MessageEntityType.TEXT_LINK and entity.url:
+            _classify_url(entity.url, hosts, usernames)
+        elif entity.type == enums.MessageEntityType.MENTION:
+            usernames.append(_utf16_slice(text, entity.offset, entity.length).lstrip("@").lower())
+    return hosts, usernames
+
+
+def text_has_link(text: str) -> bool:
+    hosts, usernames = extract_links_from_text(text)
+    return bool(hosts or usernames)
+
+
+def parse_rule_target(value: str):
+    """Turns "@name", "t.me/name", "https://example.com/x" or "example.com" into (kind, value)."""
+    value = value.strip()
+    if value.startswith("@"):
+        name = value[1:].lower()
+        return ("username", name) if re.fullmatch(r'\w{4,32}', name) else (None, None)
+    hosts, usernames = [], []
+    _classify_url(value, hosts, usernames)
+    if usernames:
+        return "username", usernames[0]
+    if hosts and DOMAIN_PATTERN.fullmatch(hosts[0]):
+        return "domain", hosts[0]
+    return None, None
+
+
+class DomainTrie:
+    """Domain rules stored by reversed labels, so a rule for example.com also covers
+    m.example.com. A lookup walks the host's labels once and returns the action of
+    the most specific rule on the way.
+    """
+
+    # Key under which a node stores its rule; labels are never empty
+    _ACTION = ""
+
+    def __init__(self):
+        self._root = {}
+
+    def add(self, domain: str, action: str):
+        node = self._root
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(label, {})
+        node[self._ACTION] = action
+
+    def remove(self, domain: str):
+        path = [self._root]
+        for label in reversed(domain.split(".")):
+            node = path[-1].get(label)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].pop(self._ACTION, None)
+        # Prune the branch back up to the first node still in use
+        labels = list(reversed(domain.split(".")))
+        for depth in range(len(labels), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][labels[depth - 1]]
+
+    def lookup(self, host: str):
+        node = self._root
+        action = None
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            action = node.get(self._ACTION, action)
+        return action
+
+    def __bool__(self):
+        return bool(self._root)
+
+
+class LinkRuleIndex:
+    """In-memory copy of the `link_rules` collection: per-chat allow/deny rules for
+    domains (in a DomainTrie) and usernames (in a dict).
+
+    Like WhitelistIndex, chats without rules have no entry, `set_rule` /
+    `remove_rule` must be called alongside the matching MongoDB writes, and calling
+    `load` again picks up rules written by other replicas.
+    """
+
+    def __init__(self):
+        self._chats = {}
+        self._changes_during_load = None
+        self.loaded = False
+
+    async def load(self, db):
+        chats = {}
+        count = 0
+        self._changes_during_load = []
+        try:
+            async for doc in db.link_rules.find({}, {"_id": 0}):
+                self._add(chats, doc["chat_id"], doc["kind"], doc["value"], doc["action"])
+                count += 1
+        finally:
+            changes, self._changes_during_load = self._changes_during_load, None
+        self._chats = chats
+        for change, args in changes:
+            change(*args)
+        log = logger.debug if self.loaded else logger.info
+        self.loaded = True
+        log(f"Loaded link rule index: {count} rules across {len(chats)} chats.")
+
+    def _record(self, change, *args):
+        if self._changes_during_load is not None:
+            self._changes_during_load.append((change, args))
+
+    @staticmethod
+    def _add(chats, chat_id, kind, value, action):
+        rules = chats.setdefault(chat_id, {"domains": DomainTrie(), "usernames": {}, "list": {}})
+        if kind == "domain":
+            rules["domains"].add(value, action)
+        else:
+            rules["usernames"][value] = action
+        rules["list"][(kind, value)] = action
+
+    def set_rule(self, chat_id, kind: str, value: str, action: str):
+        self._record(self.set_rule, chat_id, kind, value, action)
+        self._add(self._chats, chat_id, kind, value, action)
+
+    def remove_rule(self, chat_id, kind: str, value: str):
+        self._record(self.remove_rule, chat_id, kind, value)
+        rules = self._chats.get(chat_id)
+        if rules is None:
+            return
+        if kind == "domain":
+            rules["domains"].remove(value)
+        else:
+            rules["usernames"].pop(value, None)
+        rules["list"].pop((kind, value), None)
+        if not rules["list"]:
+            del self._chats[chat_id]
+
+    def drop_chat(self, chat_id):
+        self._record(self.drop_chat, chat_id)
+        self._chats.pop(chat_id, None)
+
+    def rules(self, chat_id) -> list:
+        """Returns the chat's rules as (kind, value, action) tuples."""
+        rules = self._chats.get(chat_id)
+        if rules is None:
+            return []
+        return sorted((kind, value, action) for (kind, value), action in rules["list"].items())
+
+    def first_blocked(self, chat_id, hosts, usernames, block_unlisted: bool, is_known_username=None):
+        """Returns the first host or "@username" the chat doesn't allow, or None.
+
+        A deny rule always blocks. Anything without a rule is blocked only when
+        `block_unlisted` is set (the group's link/username deletion switch), and a
+        username without a rule not even then if `is_known_username(name)` says
+        it belongs to the chat's own people.
+        """
+        rules = self._chats.get(chat_id)
+        for host in hosts:
+            action = rules["domains"].lookup(host) if rules is not None else None
+            if action == DENY or (action is None and block_unlisted):
+                return host
+        for name in usernames:
+            action = rules["usernames"].get(name) if rules is not None else None
+            if action is None and block_unlisted and is_known_username is not None and is_known_username(name):
+                continue
+            if action == DENY or (action is None and block_unlisted):
+                return f"@{name}"
+        return None
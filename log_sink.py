@@ -0,0 +1,77 @@
+import asyncio
+import html
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Telegram's limit for one text message
+MAX_MESSAGE_CHARS = 4096
+# Events arriving within this many seconds of the first one share a digest
+DIGEST_WINDOW_SECONDS = 3
+# Events waiting beyond this are dropped and only counted
+MAX_PENDING_EVENTS = 1000
+
+
+class LogSink:
+    """Queue that turns log-channel events into few, multi-line digest messages.
+
+    `emit` only appends to the queue, so the handler that produced the event never
+    waits on Telegram. A background task collects events for DIGEST_WINDOW_SECONDS,
+    packs as many as fit into one HTML message and hands it to `send`. When more
+    than MAX_PENDING_EVENTS are waiting the newest are dropped, and the next digest
+    says how many were lost.
+    """
+
+    def __init__(self, send):
+        self.send = send
+        self._events = deque()
+        self._dropped = 0
+        self._wakeup = asyncio.Event()
+
+    def emit(self, text: str, html_text: bool = True):
+        """Queues one event; `html_text` False means `text` is plain and gets escaped."""
+        if len(self._events) >= MAX_PENDING_EVENTS:
+            self._dropped += 1
+            return
+        if not html_text:
+            text = html.escape(text)
+        self._events.append(text)
+        self._wakeup.set()
+
+    def pending(self) -> int:
+        return len(self._events)
+
+    def _next_digest(self) -> str:
+        parts = []
+        size = 0
+        if self._dropped:
+            parts.append(f"<i>⚠️ {self._dropped} log events were dropped during a burst.</i>")
+            size = len(parts[0])
+            self._dropped = 0
+        while self._events:
+            text = self._events[0]
+            if len(text) > MAX_MESSAGE_CHARS:
+                # Longer than a message on its own; send it as plain text so the cut can't break a tag
+                text = html.escape(text[:MAX_MESSAGE_CHARS // 2]) + "…"
+            added = len(text) + (2 if parts else 0)
+            if parts and size + added > MAX_MESSAGE_CHARS:
+                break
+            self._events.popleft()
+            parts.append(text)
+            size += added
+        return "\n\n".join(parts)
+
+    async def run(self):
+        while True:
+            if not self._events and not self._dropped:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            # Let the burst that woke us up accumulate into one digest
+            await asyncio.sleep(DIGEST_WINDOW_SECONDS)
+            while self._events or self._dropped:
+                digest = self._next_digest()
+                try:
+                    await self.send(digest)
+                except Exception as e:
+                    logger.error(f"Error sending log digest: {e}")
@@ -1,19 +1,20 @@
 import os
+import html
 import time
 from datetime import datetime, timedelta
-import threading
 import asyncio
 import logging
-import re
 import random
-from pymongo import MongoClient, ReturnDocument
+import signal
+from collections import namedtuple
+from pymongo import ReturnDocument
+from motor.motor_asyncio import AsyncIOMotorClient
 from pyrogram import Client, filters, enums, errors
 from pyrogram.types import (
     Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton,
-    ChatPermissions, BotCommand
+    ChatPermissions, BotCommand, ChatMemberUpdated
 )
-from pyrogram.errors import BadRequest, Forbidden, MessageNotModified, FloodWait, UserIsBlocked, ChatAdminRequired
-from flask import Flask, request, jsonify
+from pyrogram.errors import BadRequest, Forbidden, MessageNotModified, FloodWait, UserIsBlocked
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -23,7 +24,21 @@ load_dotenv()
 from profanity_filter import ProfanityFilter
 
 # --- New import for the reminder feature ---
-from reminder_scheduler import reminder_scheduler
+from reminder_scheduler import reminder_scheduler, next_due_time
+from cache import TTLCache
+from chat_config import ChatConfigCache
+from whitelist_index import WhitelistIndex
+from deletion_scheduler import DeletionScheduler
+from dispatcher import OutboundDispatcher, PRIORITY_MODERATION, PRIORITY_INTERACTIVE, PRIORITY_NOTIFICATION, PRIORITY_BACKGROUND
+from broadcast import BroadcastEngine
+from group_sweeper import sweep_stale_groups, periodic_group_sweeper
+from member_sampler import RecentMembers
+from log_sink import LogSink
+from raid_guard import JoinRaidGuard
+from health_server import HealthMonitor, start_health_server
+from chat_shards import ChatShardPipeline
+from link_detector import LinkRuleIndex, extract_links, text_has_link, parse_rule_target, ALLOW, DENY
+from state_store import MemoryStateStore, ensure_state_indexes, open_state_store, LeaderLease
 
 # --- Configuration ---
 API_ID = int(os.getenv("API_ID"))
@@ -37,18 +52,57 @@ LOG_CHANNEL_ID = -1002717243409
 ADMIN_USER_IDS = [7315805581]
 
 MONGO_DB_URI = os.getenv("MONGO_DB_URI")
+# One shared Motor connection pool for the handlers, the reminder scheduler and the profanity filter
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+# "mongo" keeps shared state in MongoDB so several instances can run one bot (clustered mode)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
 
 bot_start_time = datetime.now()
-BROADCAST_MESSAGE = {}
+# admin_id -> "waiting_for_message" or the {"chat_id", "message_id"} of the message to broadcast
+BROADCAST_MESSAGE = MemoryStateStore("broadcast_drafts", ttl=3600)
 
-# Corrected regex pattern to catch all links and usernames
-URL_PATTERN = re.compile(r'\b(?:https?://|www\.|t\.me/|telegra\.ph/)[^\s]+\b|@\w+', re.IGNORECASE)
+# Mentions that are never treated as advertising ("@admin" is how members call the admins)
+ALWAYS_ALLOWED_MENTIONS = {"admin", "admins"}
 
 # --- New Constants from your first snippet ---
 DEFAULT_WARNING_LIMIT = 3
 DEFAULT_PUNISHMENT = "mute"
 DEFAULT_CONFIG = ("warn", DEFAULT_WARNING_LIMIT, DEFAULT_PUNISHMENT)
 DEFAULT_DELETE_TIME = 0 # 0 means no auto-delete
+DEFAULT_GROUP_SETTINGS = {
+    "delete_biolink": True,
+    "delete_abuse": True,
+    "delete_edited": True,
+    "delete_links_usernames": True
+}
+
+# --- Admin Cache Constants ---
+ADMIN_CACHE_TTL = int(os.getenv("ADMIN_CACHE_TTL", 600)) # seconds
+ADMIN_CACHE_MAX_CHATS = 20000
+
+# --- Bio Cache Constants ---
+BIO_CACHE_TTL = int(os.getenv("BIO_CACHE_TTL", 900)) # seconds
+BIO_CACHE_MAX_USERS = int(os.getenv("BIO_CACHE_MAX_USERS", 50000))
+
+# --- Update Pipeline Constants ---
+CHAT_SHARDS = int(os.getenv("CHAT_SHARDS", 8))
+SHARD_MAX_PENDING = int(os.getenv("SHARD_MAX_PENDING", 1000)) # queued updates per shard before load shedding
+SHARD_CONCURRENCY = int(os.getenv("SHARD_CONCURRENCY", 8)) # chats handled at once per shard
+
+# --- Join Raid Constants ---
+RAID_BIO_FETCH_CONCURRENCY = 10 # bio fetches in flight while handling a batch of raid joins
+
+# --- Chat Config Cache Constants ---
+CHAT_CONFIG_CACHE_SIZE = int(os.getenv("CHAT_CONFIG_CACHE_SIZE", 10000))
+CHAT_CONFIG_CACHE_TTL = int(os.getenv("CHAT_CONFIG_CACHE_TTL", 300)) # seconds
+SHARED_INDEX_REFRESH_INTERVAL = int(os.getenv("SHARED_INDEX_REFRESH_INTERVAL", 30)) # seconds, clustered mode only
+
+# --- Stale Group Sweep Constants ---
+STALE_GROUP_SWEEP_HOURS = float(os.getenv("STALE_GROUP_SWEEP_HOURS", 24)) # 0 disables the periodic sweep
+
+# --- Shared State Constants ---
+LOCKED_MESSAGE_TTL = 7 * 24 * 3600 # unopened lock/secret messages are forgotten after a week
+TIC_TAC_TOE_STATE_TTL = 3600 # seconds; games end after 5 minutes of inactivity anyway
 
 # --- Reminder Constants ---
 DEFAULT_REMINDER_ENABLED = True
@@ -61,8 +115,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-
 # --- Pyrogram Client Initialization ---
 client = Client(
     "my_bot_session",
@@ -74,53 +126,200 @@ client = Client(
 mongo_client = None
 db = None
 profanity_filter = None
-
-# --- Lock Message & Tic Tac Toe Game State ---
-LOCKED_MESSAGES = {}
-SECRET_CHATS = {}
-TIC_TAC_TOE_GAMES = {}
+chat_configs = None
+broadcast_engine = None
+leader_lease = None
+
+# --- Lock Message & Tic Tac Toe Game State (moved to MongoDB when STATE_BACKEND is "mongo") ---
+LOCKED_MESSAGES = MemoryStateStore("locked_messages", ttl=LOCKED_MESSAGE_TTL)
+SECRET_CHATS = MemoryStateStore("secret_chats", ttl=LOCKED_MESSAGE_TTL)
+TIC_TAC_TOE_GAMES = MemoryStateStore("tictactoe_games", ttl=TIC_TAC_TOE_STATE_TTL)
+# Inactivity timers stay local; they re-read the shared game before ending it
 TIC_TAC_TOE_TASK = {}
 
+# --- Admin Roster Cache (chat_id -> frozenset of admin user ids) ---
+ADMIN_ROSTERS = TTLCache(max_size=ADMIN_CACHE_MAX_CHATS, ttl=ADMIN_CACHE_TTL)
+# Fetches in progress (chat_id -> task); concurrent callers await the same one
+ADMIN_ROSTER_FETCHES = {}
+
+# --- Bio Cache (user_id -> (bio, bio has link)), shared by all groups ---
+USER_BIOS = TTLCache(max_size=BIO_CACHE_MAX_USERS, ttl=BIO_CACHE_TTL)
+USER_BIO_FETCHES = {}
+
+# --- Whitelist Index (chat_id -> set of whitelisted user ids) ---
+WHITELIST_INDEX = WhitelistIndex()
+
+# --- Per-chat link allow/deny rules (see link_detector.py) ---
+LINK_RULES = LinkRuleIndex()
+
+# --- The bot's own identity, resolved once (see get_bot_profile) ---
+BotProfile = namedtuple("BotProfile", ["id", "first_name", "username"])
+BOT_PROFILE = None
+
+# --- Group updates are handled through per-chat shards (see chat_shards.py) ---
+PIPELINE = ChatShardPipeline(num_shards=CHAT_SHARDS, max_pending=SHARD_MAX_PENDING, concurrency=SHARD_CONCURRENCY)
+
+# --- Liveness data for the health check and /metrics ---
+HEALTH = HealthMonitor()
+
+# --- Recently active users per chat, used to pick whom reminders tag ---
+RECENT_MEMBERS = RecentMembers()
+
+# --- Outbound Telegram calls, paced and prioritised ---
+DISPATCHER = OutboundDispatcher()
+
+# --- Timed deletion of incident notifications ---
+DELETION_SCHEDULER = DeletionScheduler(client, DISPATCHER)
+
 
 # --- MongoDB Initialization ---
-def init_mongodb():
-    global mongo_client, db, profanity_filter
+async def init_mongodb():
+    global mongo_client, db, chat_configs, broadcast_engine, leader_lease
+    global BROADCAST_MESSAGE, LOCKED_MESSAGES, SECRET_CHATS, TIC_TAC_TOE_GAMES
     if MONGO_DB_URI is None:
         logger.error("MONGO_DB_URI environment variable is not set. Cannot connect to MongoDB.")
-        profanity_filter = ProfanityFilter(mongo_uri=None)
+        leader_lease = LeaderLease(None, "scheduler")
         return
 
     try:
-        mongo_client = MongoClient(MONGO_DB_URI)
+        mongo_client = AsyncIOMotorClient(MONGO_DB_URI, maxPoolSize=MONGO_MAX_POOL_SIZE)
         db = mongo_client.get_database("asfilter")
-
-        db.groups.create_index("chat_id", unique=True)
-        db.users.create_index("user_id", unique=True)
-        db.warnings.create_index([("user_id", 1), ("chat_id", 1)], unique=True)
-        db.config.create_index("chat_id", unique=True)
-        db.whitelist.create_index([("chat_id", 1), ("user_id", 1)], unique=True)
-        db.biolink_exceptions.create_index([("chat_id", 1), ("user_id", 1)], unique=True)
-        db.settings.create_index("chat_id", unique=True)
-        db.warn_settings.create_index("chat_id", unique=True)
+        chat_configs = ChatConfigCache(db, max_size=CHAT_CONFIG_CACHE_SIZE, ttl=CHAT_CONFIG_CACHE_TTL)
+
+        await db.groups.create_index("chat_id", unique=True)
+        await db.users.create_index("user_id", unique=True)
+        await db.warnings.create_index([("user_id", 1), ("chat_id", 1)], unique=True)
+        await db.config.create_index("chat_id", unique=True)
+        await db.whitelist.create_index([("chat_id", 1), ("user_id", 1)], unique=True)
+        await db.biolink_exceptions.create_index([("chat_id", 1), ("user_id", 1)], unique=True)
+        await db.settings.create_index("chat_id", unique=True)
+        await db.warn_settings.create_index("chat_id", unique=True)
         # New index for notification delete time
-        db.notification_settings.create_index("chat_id", unique=True)
+        await db.notification_settings.create_index("chat_id", unique=True)
         # New index for reminder settings
-        db.reminder_settings.create_index("chat_id", unique=True)
-
-        profanity_filter = ProfanityFilter(mongo_uri=MONGO_DB_URI)
+        await db.reminder_settings.create_index("chat_id", unique=True)
+        await db.reminder_settings.create_index("next_due_at")
+
+        if STATE_BACKEND == "mongo":
+            await ensure_state_indexes(db)
+            BROADCAST_MESSAGE = open_state_store("broadcast_drafts", ttl=3600, db=db)
+            LOCKED_MESSAGES = open_state_store("locked_messages", ttl=LOCKED_MESSAGE_TTL, db=db)
+            SECRET_CHATS = open_state_store("secret_chats", ttl=LOCKED_MESSAGE_TTL, db=db)
+            TIC_TAC_TOE_GAMES = open_state_store("tictactoe_games", ttl=TIC_TAC_TOE_STATE_TTL, db=db)
+            logger.info("Clustered mode: shared state is kept in MongoDB.")
+        leader_lease = LeaderLease(db if STATE_BACKEND == "mongo" else None, "scheduler")
+
+        await db.link_rules.create_index([("chat_id", 1), ("kind", 1), ("value", 1)], unique=True)
+
+        await WHITELIST_INDEX.load(db)
+        await LINK_RULES.load(db)
+        await DELETION_SCHEDULER.load(db)
+        broadcast_engine = BroadcastEngine(client, db, DISPATCHER, leader_lease)
+
+        # The filter was created before the client (see the entry point); share its pool
+        profanity_filter.mongo_client = mongo_client
         logger.info("MongoDB connection and collections initialized successfully. Profanity filter is ready.")
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB or initialize collections: {e}.")
-        profanity_filter = ProfanityFilter(mongo_uri=None)
+        profanity_filter.mongo_uri = None
+        leader_lease = LeaderLease(None, "scheduler")
         logger.warning("Falling back to default profanity list due to MongoDB connection error.")
 
+async def init_profanity_filter():
+    """Loads MongoDB bad words into the filter and keeps it in sync with other replicas."""
+    if profanity_filter is None:
+        return
+    await profanity_filter.init_async_db()
+    await profanity_filter.watch_bad_words()
+
+async def refresh_shared_indexes(interval: int = SHARED_INDEX_REFRESH_INTERVAL):
+    """Reloads the whitelist and link rule indexes so /free, /unfree, /allowlink and
+    /denylink run on another replica reach this one within `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        for index in (WHITELIST_INDEX, LINK_RULES):
+            try:
+                await index.load(db)
+            except Exception as e:
+                logger.error(f"Failed to refresh {type(index).__name__}: {e}")
+
 # --- Helper Functions ---
 def is_admin(user_id: int) -> bool:
     """Checks if the given user_id is a bot admin."""
     return user_id in ADMIN_USER_IDS
 
+async def fetch_once(in_flight: dict, key, fetch):
+    """Awaits `fetch()` for `key`, sharing one call among everyone who asks while it runs.
+
+    The task stays in `in_flight` until it finishes, so a caller arriving at any point
+    before that awaits it instead of starting a second API call. It is shielded, so
+    one caller being cancelled doesn't cancel the fetch for the others.
+    """
+    task = in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        in_flight[key] = task
+        task.add_done_callback(lambda _: in_flight.pop(key, None))
+    return await asyncio.shield(task)
+
+async def get_admin_roster(chat_id: int) -> frozenset:
+    """Returns the ids of all admins in a chat, fetched with one API call and cached."""
+    roster = ADMIN_ROSTERS.get(chat_id)
+    if roster is not None:
+        return roster
+
+    async def fetch():
+        roster = frozenset([
+            member.user.id
+            async for member in client.get_chat_members(chat_id, filter=enums.ChatMembersFilter.ADMINISTRATORS)
+            if member.user
+        ])
+        ADMIN_ROSTERS.set(chat_id, roster)
+        return roster
+
+    return await fetch_once(ADMIN_ROSTER_FETCHES, chat_id, fetch)
+
+async def get_bot_profile() -> BotProfile:
+    """Returns the bot's id, name and username, resolved once per process.
+
+    `client.me` is filled in when the client starts, so this normally costs no API
+    call at all. Send the process SIGHUP (see refresh_bot_profile) after renaming
+    the bot to pick up the new name.
+    """
+    global BOT_PROFILE
+    if BOT_PROFILE is None:
+        me = client.me or await client.get_me()
+        BOT_PROFILE = BotProfile(me.id, me.first_name, me.username)
+    return BOT_PROFILE
+
+async def refresh_bot_profile() -> None:
+    global BOT_PROFILE
+    me = await client.get_me()
+    BOT_PROFILE = BotProfile(me.id, me.first_name, me.username)
+    logger.info(f"Bot profile refreshed: @{me.username} ({me.id}).")
+
+async def get_user_bio(user_id: int) -> tuple:
+    """Returns (bio, has_link) for a user, fetched with get_chat and cached with the link verdict."""
+    entry = USER_BIOS.get(user_id)
+    if entry is not None:
+        return entry
+
+    async def fetch():
+        user_profile = await client.get_chat(user_id)
+        bio = user_profile.bio or ""
+        entry = (bio, text_has_link(bio))
+        USER_BIOS.set(user_id, entry)
+        return entry
+
+    return await fetch_once(USER_BIO_FETCHES, user_id, fetch)
+
 async def is_group_admin(chat_id: int, user_id: int) -> bool:
     """Checks if the given user_id is an admin in the specified chat."""
+    try:
+        return user_id in await get_admin_roster(chat_id)
+    except Exception as e:
+        logger.warning(f"Could not fetch admin roster for chat {chat_id}: {e}. Checking member directly.")
+
     try:
         member = await client.get_chat_member(chat_id, user_id)
         return member.status in [enums.ChatMemberStatus.OWNER, enums.ChatMemberStatus.ADMINISTRATOR]
@@ -130,15 +329,41 @@ async def is_group_admin(chat_id: int, user_id: int) -> bool:
         logger.error(f"Error checking admin status for user {user_id} in chat {chat_id}: {e}")
         return False
 
-# FIX: Log function updated to handle cases where LOG_CHANNEL_ID is not set.
-async def log_to_channel(text: str, parse_mode: enums.ParseMode = None) -> None:
-    """Sends a log message to the predefined LOG_CHANNEL_ID with better error handling."""
-    if not LOG_CHANNEL_ID or LOG_CHANNEL_ID == -1: # Added -1 check as a safety
-        logger.warning("LOG_CHANNEL_ID is not set or invalid, cannot log to channel.")
-        return
+@client.on_chat_member_updated()
+async def chat_member_updated_handler(client: Client, update: ChatMemberUpdated) -> None:
+    """Drops the cached admin roster when someone is promoted, demoted or an admin leaves."""
+    admin_statuses = (enums.ChatMemberStatus.OWNER, enums.ChatMemberStatus.ADMINISTRATOR)
+    old_status = update.old_chat_member.status if update.old_chat_member else None
+    new_status = update.new_chat_member.status if update.new_chat_member else None
+    if old_status in admin_statuses or new_status in admin_statuses:
+        ADMIN_ROSTERS.pop(update.chat.id)
+        logger.info(f"Admin roster cache invalidated for chat {update.chat.id}.")
+
+# --- Replies to commands and buttons, paced by the dispatcher like every other send ---
+# They are served ahead of warnings, so a burst of warnings in a group doesn't hold up
+# its /settings menu. Edits don't count towards the chat's message budget at all.
+# Only callback query answers (shown to one user, not sent to the chat) and read-only
+# calls such as get_users or get_chat_member go to the client directly.
+async def send_message(chat_id, *args, **kwargs):
+    return await DISPATCHER.call(PRIORITY_INTERACTIVE, chat_id, client.send_message, chat_id, *args, **kwargs)
+
+async def reply_text(message: Message, *args, **kwargs):
+    return await DISPATCHER.call(PRIORITY_INTERACTIVE, message.chat.id, message.reply_text, *args, **kwargs)
+
+async def edit_text(message: Message, *args, **kwargs):
+    return await DISPATCHER.call_unpaced(PRIORITY_INTERACTIVE, message.chat.id, message.edit_text, *args, **kwargs)
+
+async def delete_message(message: Message):
+    return await DISPATCHER.call(PRIORITY_MODERATION, message.chat.id, message.delete)
 
+# FIX: Log function updated to handle cases where LOG_CHANNEL_ID is not set.
+async def send_log_digest(text: str) -> None:
+    """Sends one digest of log events to the predefined LOG_CHANNEL_ID with better error handling."""
     try:
-        await client.send_message(chat_id=LOG_CHANNEL_ID, text=text, parse_mode=parse_mode)
+        await DISPATCHER.call(
+            PRIORITY_BACKGROUND, LOG_CHANNEL_ID, client.send_message,
+            chat_id=LOG_CHANNEL_ID, text=text, parse_mode=enums.ParseMode.HTML
+        )
     except Forbidden:
         logger.error(f"Bot does not have permissions to send messages to log channel {LOG_CHANNEL_ID}.")
     except BadRequest as e:
@@ -146,84 +371,94 @@ async def log_to_channel(text: str, parse_mode: enums.ParseMode = None) -> None:
     except Exception as e:
         logger.error(f"Error logging to channel: {e}")
 
-def get_warn_settings(chat_id, category):
+LOG_SINK = LogSink(send_log_digest)
+
+def log_to_channel(text: str, parse_mode: enums.ParseMode = None) -> None:
+    """Queues a log message for the log channel; it is sent with others in a digest."""
+    if not LOG_CHANNEL_ID or LOG_CHANNEL_ID == -1: # Added -1 check as a safety
+        logger.warning("LOG_CHANNEL_ID is not set or invalid, cannot log to channel.")
+        return
+    LOG_SINK.emit(text, html_text=parse_mode == enums.ParseMode.HTML)
+
+async def get_warn_settings(chat_id, category):
     if db is None: return DEFAULT_WARNING_LIMIT, DEFAULT_PUNISHMENT
-    settings = db.warn_settings.find_one({"chat_id": chat_id})
+    settings = (await chat_configs.get(chat_id)).warn_settings
     if not settings or category not in settings:
         return DEFAULT_WARNING_LIMIT, DEFAULT_PUNISHMENT
     return settings[category].get("limit", DEFAULT_WARNING_LIMIT), settings[category].get("punishment", DEFAULT_PUNISHMENT)
 
-def update_warn_settings(chat_id, category, limit=None, punishment=None):
+async def update_warn_settings(chat_id, category, limit=None, punishment=None):
     if db is None: return
     update_doc = {}
     if limit is not None: update_doc[f"{category}.limit"] = limit
     if punishment: update_doc[f"{category}.punishment"] = punishment
-    db.warn_settings.update_one({"chat_id": chat_id}, {"$set": update_doc}, upsert=True)
+    await chat_configs.update("warn_settings", chat_id, update_doc)
 
-def get_group_settings(chat_id):
+async def get_group_settings(chat_id):
     if db is None:
-        return {
-            "delete_biolink": True,
-            "delete_abuse": True,
-            "delete_edited": True,
-            "delete_links_usernames": True
-        }
-    settings = db.settings.find_one({"chat_id": chat_id})
-    if not settings:
-        default_settings = {
-            "chat_id": chat_id,
-            "delete_biolink": True,
-            "delete_abuse": True,
-            "delete_edited": True,
-            "delete_links_usernames": True
-        }
-        db.settings.insert_one(default_settings)
-        return default_settings
-    return settings
+        return dict(DEFAULT_GROUP_SETTINGS)
+    return await chat_configs.ensure_defaults("settings", chat_id, DEFAULT_GROUP_SETTINGS)
 
-def update_group_setting(chat_id, setting_key, setting_value):
+async def update_group_setting(chat_id, setting_key, setting_value):
     if db is None: return
-    db.settings.update_one(
-        {"chat_id": chat_id},
-        {"$set": {setting_key: setting_value}},
-        upsert=True
-    )
+    await chat_configs.update("settings", chat_id, {setting_key: setting_value})
 
-def get_notification_delete_time(chat_id):
+async def get_notification_delete_time(chat_id):
     if db is None: return DEFAULT_DELETE_TIME
-    settings = db.notification_settings.find_one({"chat_id": chat_id})
+    settings = (await chat_configs.get(chat_id)).notification_settings
     return settings.get("delete_time", DEFAULT_DELETE_TIME) if settings else DEFAULT_DELETE_TIME
 
-def update_notification_delete_time(chat_id, time_in_minutes):
+async def update_notification_delete_time(chat_id, time_in_minutes):
     if db is None: return
-    db.notification_settings.update_one({"chat_id": chat_id}, {"$set": {"delete_time": time_in_minutes}}, upsert=True)
+    await chat_configs.update("notification_settings", chat_id, {"delete_time": time_in_minutes})
 
-def is_whitelisted_sync(chat_id, user_id):
+async def is_whitelisted(chat_id, user_id):
     if db is None: return False
-    return db.whitelist.find_one({"chat_id": chat_id, "user_id": user_id}) is not None
+    if WHITELIST_INDEX.loaded:
+        return WHITELIST_INDEX.contains(chat_id, user_id)
+    return await db.whitelist.find_one({"chat_id": chat_id, "user_id": user_id}) is not None
 
-def add_whitelist_sync(chat_id, user_id):
+async def add_whitelist(chat_id, user_id):
     if db is None: return
-    db.whitelist.update_one({"chat_id": chat_id, "user_id": user_id}, {"$set": {"timestamp": datetime.now()}}, upsert=True)
+    await db.whitelist.update_one({"chat_id": chat_id, "user_id": user_id}, {"$set": {"timestamp": datetime.now()}}, upsert=True)
+    WHITELIST_INDEX.add(chat_id, user_id)
 
-def remove_whitelist_sync(chat_id, user_id):
+async def remove_whitelist(chat_id, user_id):
     if db is None: return
-    db.whitelist.delete_one({"chat_id": chat_id, "user_id": user_id})
+    await db.whitelist.delete_one({"chat_id": chat_id, "user_id": user_id})
+    WHITELIST_INDEX.remove(chat_id, user_id)
 
-def get_whitelist_sync(chat_id):
+async def get_whitelist(chat_id):
     if db is None: return []
-    return [doc["user_id"] for doc in db.whitelist.find({"chat_id": chat_id})]
+    if WHITELIST_INDEX.loaded:
+        return WHITELIST_INDEX.users(chat_id)
+    return [doc["user_id"] async for doc in db.whitelist.find({"chat_id": chat_id})]
+
+async def set_link_rule(chat_id, kind, value, action):
+    if db is None: return
+    await db.link_rules.update_one(
+        {"chat_id": chat_id, "kind": kind, "value": value},
+        {"$set": {"action": action, "timestamp": datetime.now()}},
+        upsert=True
+    )
+    LINK_RULES.set_rule(chat_id, kind, value, action)
+
+async def remove_link_rule(chat_id, kind, value) -> bool:
+    if db is None: return False
+    result = await db.link_rules.delete_one({"chat_id": chat_id, "kind": kind, "value": value})
+    LINK_RULES.remove_rule(chat_id, kind, value)
+    return result.deleted_count > 0
 
-def get_warnings_sync(user_id: int, chat_id: int, category: str):
+async def get_warnings(user_id: int, chat_id: int, category: str):
     if db is None: return 0
-    warnings_doc = db.warnings.find_one({"user_id": user_id, "chat_id": chat_id})
+    warnings_doc = await db.warnings.find_one({"user_id": user_id, "chat_id": chat_id})
     if warnings_doc and "counts" in warnings_doc and category in warnings_doc["counts"]:
         return warnings_doc["counts"][category]
     return 0
 
-def increment_warning_sync(chat_id, user_id, category):
+async def increment_warning(chat_id, user_id, category):
     if db is None: return 1
-    warnings_doc = db.warnings.find_one_and_update(
+    warnings_doc = await db.warnings.find_one_and_update(
         {"chat_id": chat_id, "user_id": user_id},
         {"$inc": {f"counts.{category}": 1}},
         upsert=True,
@@ -231,46 +466,45 @@ def increment_warning_sync(chat_id, user_id, category):
     )
     return warnings_doc["counts"][category]
 
-def reset_warnings_sync(chat_id, user_id, category):
+async def reset_warnings(chat_id, user_id, category):
     if db is None: return
-    db.warnings.update_one(
+    await db.warnings.update_one(
         {"chat_id": chat_id, "user_id": user_id},
         {"$set": {f"counts.{category}": 0}}
     )
 
 # --- New Functions for Reminder Settings ---
-def get_reminder_settings(chat_id):
+async def get_reminder_settings(chat_id):
     if db is None:
         return {
             "enabled": DEFAULT_REMINDER_ENABLED,
             "interval_hours": DEFAULT_REMINDER_INTERVAL_HOURS
         }
-    settings = db.reminder_settings.find_one({"chat_id": chat_id})
-    if not settings:
-        default_settings = {
-            "chat_id": chat_id,
-            "enabled": DEFAULT_REMINDER_ENABLED,
-            "interval_hours": DEFAULT_REMINDER_INTERVAL_HOURS
-        }
-        db.reminder_settings.insert_one(default_settings)
-        return default_settings
-    return settings
+    return await chat_configs.ensure_defaults("reminder_settings", chat_id, {
+        "enabled": DEFAULT_REMINDER_ENABLED,
+        "interval_hours": DEFAULT_REMINDER_INTERVAL_HOURS,
+        "next_due_at": next_due_time(DEFAULT_REMINDER_INTERVAL_HOURS)
+    })
 
-def update_reminder_setting(chat_id, key, value):
+async def update_reminder_setting(chat_id, key, value):
     if db is None: return
-    db.reminder_settings.update_one(
-        {"chat_id": chat_id},
-        {"$set": {key: value}},
-        upsert=True
-    )
+    fields = {key: value}
+    if key in ("enabled", "interval_hours"):
+        # Restart the reminder cycle from now so the scheduler uses the new settings
+        if key == "interval_hours":
+            interval_hours = value
+        else:
+            interval_hours = (await get_reminder_settings(chat_id)).get("interval_hours", DEFAULT_REMINDER_INTERVAL_HOURS)
+        fields["next_due_at"] = next_due_time(interval_hours)
+    await chat_configs.update("reminder_settings", chat_id, fields)
 
-async def handle_incident(client: Client, chat_id, user, reason, original_message: Message, case_type, category=None):
+async def handle_incident(client: Client, chat_id, user, reason, original_message: Message, case_type, category=None, matched_terms=None):
     original_message_id = original_message.id
     full_name = f"{user.first_name}{(' ' + user.last_name) if user.last_name else ''}"
     user_mention_text = f"<a href='tg://user?id={user.id}'>{full_name}</a>"
 
     try:
-        await client.delete_messages(chat_id=chat_id, message_ids=original_message_id)
+        await DISPATCHER.call(PRIORITY_MODERATION, chat_id, client.delete_messages, chat_id=chat_id, message_ids=original_message_id)
         logger.info(f"Deleted {reason} message from {user.username or user.mention} ({user.id}) in {chat_id}.")
     except Exception as e:
         logger.error(f"Error deleting message in {chat_id}: {e}. Make sure the bot has 'Delete Messages' admin permission.")
@@ -278,7 +512,7 @@ async def handle_incident(client: Client, chat_id, user, reason, original_messag
     notification_text = ""
     keyboard = []
     
-    warn_limit, punishment = get_warn_settings(chat_id, category) if category else (DEFAULT_WARNING_LIMIT, DEFAULT_PUNISHMENT)
+    warn_limit, punishment = await get_warn_settings(chat_id, category) if category else (DEFAULT_WARNING_LIMIT, DEFAULT_PUNISHMENT)
 
     if case_type == "edited_message_deleted":
         notification_text = (
@@ -289,7 +523,7 @@ async def handle_incident(client: Client, chat_id, user, reason, original_messag
         keyboard = [[InlineKeyboardButton("🗑️ Close", callback_data="close")]]
 
     elif case_type == "warn":
-        count = increment_warning_sync(chat_id, user.id, category)
+        count = await increment_warning(chat_id, user.id, category)
         notification_text = (
             f"<b>🚫 Hey {user_mention_text}, your message was removed!</b>\n\n"
             f"Reason: {reason}\n"
@@ -299,7 +533,7 @@ async def handle_incident(client: Client, chat_id, user, reason, original_messag
         
     elif case_type == "punished":
         if punishment == "mute":
-             await client.restrict_chat_member(chat_id, user.id, ChatPermissions())
+             await DISPATCHER.call(PRIORITY_MODERATION, chat_id, client.restrict_chat_member, chat_id, user.id, ChatPermissions())
              notification_text = (
                 f"<b>🚫 Hey {user_mention_text}, you have been muted!</b>\n\n"
                 f"You reached the maximum warning limit ({warn_limit}) for violating rules.\n"
@@ -307,7 +541,7 @@ async def handle_incident(client: Client, chat_id, user, reason, original_messag
             )
              keyboard = [[InlineKeyboardButton("Unmute ✅", callback_data=f"unmute_{user.id}_{chat_id}"), InlineKeyboardButton("🗑️ Close", callback_data="close")]]
         else: # punishment == "ban"
-            await client.ban_chat_member(chat_id, user.id)
+            await DISPATCHER.call(PRIORITY_MODERATION, chat_id, client.ban_chat_member, chat_id, user.id)
             notification_text = (
                 f"<b>🚫 Hey {user_mention_text}, you have been banned!</b>\n\n"
                 f"You reached the maximum warning limit ({warn_limit}) for violating rules.\n"
@@ -315,33 +549,70 @@ async def handle_incident(client: Client, chat_id, user, reason, original_messag
             )
             keyboard = [[InlineKeyboardButton("🗑️ Close", callback_data="close")]]
 
+    if notification_text and matched_terms:
+        # Hidden behind a spoiler so the notification doesn't repeat the abuse in plain sight
+        terms = ", ".join(html.escape(term) for term in matched_terms[:3])
+        notification_text += f"\nMatched: <spoiler>{terms}</spoiler>"
+
     if notification_text:
-        try:
-            sent_notification = await client.send_message(
-                chat_id=chat_id,
-                text=notification_text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode=enums.ParseMode.HTML
-            )
-            logger.info(f"Incident notification sent for user {user.id} in chat {chat_id}.")
+        # Sent in the background: the chat's next update shouldn't wait for this
+        # notification to pass the chat's message budget before it can be moderated
+        asyncio.ensure_future(send_incident_notification(client, chat_id, user, notification_text, keyboard))
 
-            delete_time_minutes = get_notification_delete_time(chat_id)
-            if delete_time_minutes > 0:
-                await asyncio.sleep(delete_time_minutes * 60)
-                try:
-                    await client.delete_messages(chat_id=chat_id, message_ids=sent_notification.id)
-                except Exception as e:
-                    logger.error(f"Error deleting timed notification: {e}")
+async def send_incident_notification(client: Client, chat_id, user, notification_text, keyboard):
+    """Sends an incident notification and schedules its timed deletion."""
+    try:
+        sent_notification = await DISPATCHER.call(
+            PRIORITY_NOTIFICATION, chat_id, client.send_message,
+            chat_id=chat_id,
+            text=notification_text,
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode=enums.ParseMode.HTML
+        )
+        logger.info(f"Incident notification sent for user {user.id} in chat {chat_id}.")
 
-        except Exception as e:
-            logger.error(f"Error sending notification in chat {chat_id}: {e}. Make sure bot has 'Post Messages' permission.")
+        delete_time_minutes = await get_notification_delete_time(chat_id)
+        if delete_time_minutes > 0:
+            await DELETION_SCHEDULER.schedule(chat_id, sent_notification.id, delete_time_minutes * 60)
+
+    except Exception as e:
+        logger.error(f"Error sending notification in chat {chat_id}: {e}. Make sure bot has 'Post Messages' permission.")
+
+def log_abuse_match(chat, user, matches) -> None:
+    """Records which vocabulary entries a deleted message matched, for moderators to audit."""
+    if not matches:
+        return
+    terms = ", ".join(f"<code>{html.escape(match.word)}</code> ({match.category})" for match in matches[:5])
+    log_message = (
+        f"<b>🤬 Abusive Word Removed:</b>\n"
+        f"Group: <code>{html.escape(chat.title or '')}</code>\n"
+        f"Group ID: <code>{chat.id}</code>\n"
+        f"User: {html.escape(user.first_name or '')} (<code>{user.id}</code>)\n"
+        f"Matched: {terms}\n"
+        f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}"
+    )
+    log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
+
+async def find_blocked_link(chat, message: Message, block_unlisted: bool):
+    """Returns the first host or @username in a message that the chat's link rules block, or None."""
+    hosts, usernames = extract_links(message)
+    if not hosts and not usernames:
+        return None
+    bot_info = await get_bot_profile()
+    own_names = {(chat.username or "").lower(), (bot_info.username or "").lower()} | ALWAYS_ALLOWED_MENTIONS
+
+    def is_known_username(name):
+        # Mentioning the group itself, the bot or a recently active member is conversation, not advertising
+        return name in own_names or RECENT_MEMBERS.has_username(chat.id, name)
+
+    return LINK_RULES.first_blocked(chat.id, hosts, usernames, block_unlisted, is_known_username)
 
 # --- Bot Commands Handlers ---
 @client.on_message(filters.command("start"))
 async def start(client: Client, message: Message) -> None:
     user = message.from_user
     chat = message.chat
-    bot_info = await client.get_me()
+    bot_info = await get_bot_profile()
     bot_name = bot_info.first_name
     bot_username = bot_info.username
     add_to_group_url = f"https://t.me/{bot_username}?startgroup=true"
@@ -361,7 +632,7 @@ async def start(client: Client, message: Message) -> None:
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await message.reply_text(
+        await reply_text(message, 
             text=welcome_message,
             reply_markup=reply_markup,
             parse_mode=enums.ParseMode.HTML,
@@ -371,7 +642,7 @@ async def start(client: Client, message: Message) -> None:
 
         if db is not None and db.users is not None:
             try:
-                db.users.update_one(
+                await db.users.update_one(
                     {"user_id": user.id},
                     {"$set": {"first_name": user.first_name, "username": user.username, "last_interaction": datetime.now()}},
                     upsert=True
@@ -385,11 +656,11 @@ async def start(client: Client, message: Message) -> None:
             f"Username: @{user.username if user.username else 'N/A'}\n"
             f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}"
         )
-        await log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
+        log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
 
     elif chat.type in [enums.ChatType.GROUP, enums.ChatType.SUPERGROUP]:
         try:
-            bot_info = await client.get_me()
+            bot_info = await get_bot_profile()
             bot_username = bot_info.username
             add_to_group_url = f"https://t.me/{bot_username}?startgroup=true"
 
@@ -409,7 +680,7 @@ async def start(client: Client, message: Message) -> None:
 
             reply_markup = InlineKeyboardMarkup(group_keyboard)
 
-            await message.reply_text(
+            await reply_text(message, 
                 text=group_start_message,
                 reply_markup=reply_markup,
                 parse_mode=enums.ParseMode.HTML
@@ -417,7 +688,7 @@ async def start(client: Client, message: Message) -> None:
             logger.info(f"Bot received /start in group: {chat.title} ({chat.id}).")
             if db is not None and db.groups is not None:
                 try:
-                    db.groups.update_one(
+                    await db.groups.update_one(
                         {"chat_id": chat.id},
                         {"$set": {"title": chat.title, "type": chat.type.value, "last_active": datetime.now()}},
                         upsert=True
@@ -442,6 +713,11 @@ async def help_handler(client: Client, message: Message):
         "`/free` – whitelist a user (reply or user/id)\n"
         "`/unfree` – remove from whitelist\n"
         "`/freelist` – list all whitelisted users\n\n"
+        "<b>Link Rules (Group Admins):</b>\n"
+        "`/allowlink &lt;domain|@username&gt;` – is domain/username ko kabhi delete na karein\n"
+        "`/denylink &lt;domain|@username&gt;` – is domain/username ko hamesha delete karein\n"
+        "`/removelink &lt;domain|@username&gt;` – rule hatayein\n"
+        "`/linkrules` – group ke saare link rules dekhein\n\n"
         "<b>General Moderation Commands:</b>\n"
         "• <code>/settings</code>: Bot ki settings kholen (Group Admins only).\n"
         "• <code>/stats</code>: Bot usage stats dekhein (sirf bot admins ke liye).\n"
@@ -456,24 +732,24 @@ async def help_handler(client: Client, message: Message):
         "<b>Use the inline buttons on warnings to cancel or whitelist</b>"
     )
     kb = InlineKeyboardMarkup([[InlineKeyboardButton("🗑️ Close", callback_data="close")]])
-    await client.send_message(chat_id, help_text, reply_markup=kb, parse_mode=enums.ParseMode.HTML)
+    await send_message(chat_id, help_text, reply_markup=kb, parse_mode=enums.ParseMode.HTML)
 
 @client.on_message(filters.group & filters.command("lock"))
 async def lock_message_handler(client: Client, message: Message):
     # Check for arguments
     if len(message.command) < 3:
-        await message.reply_text("Kripya user ko mention karein aur message likhein. Upyog: `/lock <@username> <message>`")
+        await reply_text(message, "Kripya user ko mention karein aur message likhein. Upyog: `/lock <@username> <message>`")
         return
         
     target_mention = message.command[1]
     message_content = " ".join(message.command[2:])
 
     if not target_mention.startswith('@'):
-        await message.reply_text("Kripya us user ko mention karein jise aap message dikhana chahte hain.")
+        await reply_text(message, "Kripya us user ko mention karein jise aap message dikhana chahte hain.")
         return
 
     if not message_content:
-        await message.reply_text("Kripya lock karne ke liye message bhi likhein.")
+        await reply_text(message, "Kripya lock karne ke liye message bhi likhein.")
         return
 
     sender_user = message.from_user
@@ -482,21 +758,21 @@ async def lock_message_handler(client: Client, message: Message):
     try:
         target_user = await client.get_users(target_mention)
     except Exception:
-        await message.reply_text("Invalid username. Please mention a valid user.")
+        await reply_text(message, "Invalid username. Please mention a valid user.")
         return
 
     # Store the locked message
     lock_id = f"{message.chat.id}_{sender_user.id}_{target_user.id}_{int(time.time())}"
-    LOCKED_MESSAGES[lock_id] = {
+    await LOCKED_MESSAGES.set(lock_id, {
         'text': message_content,
         'sender_id': sender_user.id,
         'target_id': target_user.id,
         'chat_id': message.chat.id
-    }
+    })
     
     # Delete the original command message
     try:
-        await message.delete()
+        await delete_message(message)
     except Exception as e:
         logger.error(f"Error deleting lock command message: {e}")
 
@@ -507,7 +783,7 @@ async def lock_message_handler(client: Client, message: Message):
     # Send the lock message as per your request
     unlock_button = InlineKeyboardMarkup([[InlineKeyboardButton("Show Message", callback_data=f"show_lock_{lock_id}")]])
     
-    await client.send_message(
+    await send_message(
         chat_id=message.chat.id,
         text=f"Hey <a href='tg://user?id={target_user.id}'>{target_name}</a>, aapko is <a href='tg://user?id={sender_user.id}'>{sender_name}</a> ne ek lock message bheja hai. Message dekhne ke liye niche button par click kare.",
         reply_markup=unlock_button,
@@ -517,7 +793,7 @@ async def lock_message_handler(client: Client, message: Message):
 @client.on_callback_query(filters.regex("^show_lock_"))
 async def show_lock_callback_handler(client: Client, query: CallbackQuery):
     lock_id = query.data.split('_', 2)[2]
-    locked_message_data = LOCKED_MESSAGES.get(lock_id)
+    locked_message_data = await LOCKED_MESSAGES.get(lock_id)
 
     if not locked_message_data:
         await query.answer("This message has been unlocked or is no longer available.", show_alert=True)
@@ -538,8 +814,13 @@ async def show_lock_callback_handler(client: Client, query: CallbackQuery):
     target_user = query.from_user
     target_name = f"{target_user.first_name}{(' ' + target_user.last_name) if target_user.last_name else ''}"
 
+    # Claim the message first so two taps (or two instances) can't both unlock it
+    if await LOCKED_MESSAGES.pop(lock_id) is None:
+        await query.answer("This message has been unlocked or is no longer available.", show_alert=True)
+        return
+
     # Edit the message to show the content
-    await query.message.edit_text(
+    await edit_text(query.message, 
         f"**🔓 Unlocked Message:**\n\n"
         f"**From:** <a href='tg://user?id={locked_message_data['sender_id']}'>{sender_name}</a>\n"
         f"**To:** <a href='tg://user?id={target_user.id}'>{target_name}</a>\n\n"
@@ -548,45 +829,40 @@ async def show_lock_callback_handler(client: Client, query: CallbackQuery):
         f"This message will self-destruct in 1 minute."
     )
 
-    # Remove the message from memory and delete it after a timeout
-    LOCKED_MESSAGES.pop(lock_id)
-    await asyncio.sleep(60)
-    try:
-        await query.message.delete()
-    except Exception:
-        pass
+    # Delete the unlocked message after a timeout
+    await DELETION_SCHEDULER.schedule(query.message.chat.id, query.message.id, 60)
 
 @client.on_message(filters.group & filters.command("secretchat"))
 async def secret_chat_command(client: Client, message: Message):
     if len(message.command) < 3:
-        await message.reply_text("Kripya user ko mention karein aur message likhein. Upyog: `/secretchat <@username> <message>`")
+        await reply_text(message, "Kripya user ko mention karein aur message likhein. Upyog: `/secretchat <@username> <message>`")
         return
 
     target_mention = message.command[1]
     secret_message = " ".join(message.command[2:])
 
     if not target_mention.startswith('@'):
-        await message.reply_text("Kripya us user ko mention karein jise aap secret message bhejna chahte hain.")
+        await reply_text(message, "Kripya us user ko mention karein jise aap secret message bhejna chahte hain.")
         return
         
     try:
         target_user = await client.get_users(target_mention)
     except Exception:
-        await message.reply_text("Invalid username. Please mention a valid user.")
+        await reply_text(message, "Invalid username. Please mention a valid user.")
         return
 
     sender_user = message.from_user
     
     secret_chat_id = f"{message.chat.id}_{sender_user.id}_{target_user.id}_{int(time.time())}"
-    SECRET_CHATS[secret_chat_id] = {
+    await SECRET_CHATS.set(secret_chat_id, {
         'message': secret_message,
         'sender_id': sender_user.id,
         'target_id': target_user.id,
         'chat_id': message.chat.id
-    }
+    })
     
     try:
-        await message.delete()
+        await delete_message(message)
     except Exception as e:
         logger.error(f"Error deleting secretchat command message: {e}")
         
@@ -602,7 +878,7 @@ async def secret_chat_command(client: Client, message: Message):
         [InlineKeyboardButton("Show Message", callback_data=f"show_secret_{secret_chat_id}")]
     ])
     
-    await client.send_message(
+    await send_message(
         chat_id=message.chat.id,
         text=notification_text,
         reply_markup=keyboard,
@@ -612,7 +888,7 @@ async def secret_chat_command(client: Client, message: Message):
 @client.on_callback_query(filters.regex("^show_secret_"))
 async def show_secret_callback(client: Client, query: CallbackQuery):
     secret_chat_id = query.data.split('_', 2)[2]
-    secret_chat_data = SECRET_CHATS.get(secret_chat_id)
+    secret_chat_data = await SECRET_CHATS.get(secret_chat_id)
     
     if not secret_chat_data:
         await query.answer("This secret message is no longer available.", show_alert=True)
@@ -630,10 +906,11 @@ async def show_secret_callback(client: Client, query: CallbackQuery):
         
     secret_message_text = f"From: {sender_name}\n\nMessage: {secret_chat_data['message']}"
     
+    if await SECRET_CHATS.pop(secret_chat_id) is None:
+        await query.answer("This secret message is no longer available.", show_alert=True)
+        return
     await query.answer(secret_message_text, show_alert=True)
     
-    SECRET_CHATS.pop(secret_chat_id)
-    
 # --- Tic Tac Toe Game Logic (CORRECTED) ---
 TIC_TAC_TOE_BUTTONS = [
     [InlineKeyboardButton("➖", callback_data="tictac_0"), InlineKeyboardButton("➖", callback_data="tictac_1"), InlineKeyboardButton("➖", callback_data="tictac_2")],
@@ -648,11 +925,12 @@ WINNING_COMBINATIONS = [
 
 async def end_tictactoe_game(client: Client, chat_id: int):
     """Ends an ongoing game gracefully and cleans up state."""
-    if chat_id in TIC_TAC_TOE_GAMES:
-        game = TIC_TAC_TOE_GAMES.pop(chat_id)
+    game = await TIC_TAC_TOE_GAMES.pop(chat_id)
+    if game:
         if game.get("message_id"):
             try:
-                await client.edit_message_text(
+                await DISPATCHER.call_unpaced(
+                    PRIORITY_NOTIFICATION, chat_id, client.edit_message_text,
                     chat_id=chat_id,
                     message_id=game['message_id'],
                     text="😔 <b>Game has been cancelled due to inactivity.</b>",
@@ -664,6 +942,20 @@ async def end_tictactoe_game(client: Client, chat_id: int):
         task = TIC_TAC_TOE_TASK.pop(chat_id)
         task.cancel()
 
+def restart_tictactoe_timer(client: Client, chat_id: int):
+    """(Re)starts the 5 minute inactivity timer of a chat's game on this instance."""
+    if chat_id in TIC_TAC_TOE_TASK:
+        TIC_TAC_TOE_TASK[chat_id].cancel()
+
+    async def inactivity_check():
+        await asyncio.sleep(300) # 5 minutes
+        # The game may have been played on another instance meanwhile
+        game = await TIC_TAC_TOE_GAMES.get(chat_id)
+        if game and (datetime.now() - game['last_active']).total_seconds() >= 300:
+            await end_tictactoe_game(client, chat_id)
+
+    TIC_TAC_TOE_TASK[chat_id] = asyncio.create_task(inactivity_check())
+
 def check_win(board):
     for combo in WINNING_COMBINATIONS:
         if board[combo[0]] == board[combo[1]] == board[combo[2]] and board[combo[0]] != "➖":
@@ -686,8 +978,8 @@ def get_tictac_keyboard(board, end_game=False):
 @client.on_message(filters.group & filters.command("tictac"))
 async def tictac_game_start_command(client: Client, message: Message):
     chat_id = message.chat.id
-    if chat_id in TIC_TAC_TOE_GAMES:
-        await message.reply_text("Ek Tic Tac Toe game pehle se hi chal raha hai. Kripya uske khatam hone ka intezaar karein.")
+    if await TIC_TAC_TOE_GAMES.contains(chat_id):
+        await reply_text(message, "Ek Tic Tac Toe game pehle se hi chal raha hai. Kripya uske khatam hone ka intezaar karein.")
         return
     
     sender = message.from_user
@@ -695,14 +987,14 @@ async def tictac_game_start_command(client: Client, message: Message):
     if len(message.command) > 1 and message.command[1].startswith('@'):
         mentions = [mention for mention in message.command[1:] if mention.startswith('@')]
         if len(mentions) != 2:
-            await message.reply_text("Game shuru karne ke liye do users ko mention karein.\nUpyog: `/tictac @user1 @user2`")
+            await reply_text(message, "Game shuru karne ke liye do users ko mention karein.\nUpyog: `/tictac @user1 @user2`")
             return
         
         try:
             user1 = await client.get_users(mentions[0])
             user2 = await client.get_users(mentions[1])
         except Exception:
-            await message.reply_text("Invalid users. Please mention valid users.")
+            await reply_text(message, "Invalid users. Please mention valid users.")
             return
 
         players = [user1, user2]
@@ -710,40 +1002,40 @@ async def tictac_game_start_command(client: Client, message: Message):
         
         board = ["➖"] * 9
         
-        TIC_TAC_TOE_GAMES[chat_id] = {
-            'players': {players[0].id: '❌', players[1].id: '⭕'},
-            'player_names': {players[0].id: players[0].first_name, players[1].id: players[1].first_name},
+        # Player ids are string keys so the game can be stored in MongoDB
+        game = {
+            'players': {str(players[0].id): '❌', str(players[1].id): '⭕'},
+            'player_names': {str(players[0].id): players[0].first_name, str(players[1].id): players[1].first_name},
             'board': board,
             'current_turn_id': players[0].id,
             'message_id': None,
             'last_active': datetime.now()
         }
+        if not await TIC_TAC_TOE_GAMES.add(chat_id, game):
+            await reply_text(message, "Ek Tic Tac Toe game pehle se hi chal raha hai. Kripya uske khatam hone ka intezaar karein.")
+            return
 
-        async def inactivity_check():
-            await asyncio.sleep(300) # 5 minutes
-            if chat_id in TIC_TAC_TOE_GAMES and (datetime.now() - TIC_TAC_TOE_GAMES[chat_id]['last_active']).total_seconds() >= 300:
-                await end_tictactoe_game(client, chat_id)
-                
-        TIC_TAC_TOE_TASK[chat_id] = asyncio.create_task(inactivity_check())
+        restart_tictactoe_timer(client, chat_id)
 
         initial_text = f"**Tic Tac Toe (Zero Katte) Game!**\n\n" \
-                       f"**Player 1:** {TIC_TAC_TOE_GAMES[chat_id]['player_names'][players[0].id]} (❌)\n" \
-                       f"**Player 2:** {TIC_TAC_TOE_GAMES[chat_id]['player_names'][players[1].id]} (⭕)\n\n" \
-                       f"**Current Turn:** {TIC_TAC_TOE_GAMES[chat_id]['player_names'][players[0].id]}"
+                       f"**Player 1:** {players[0].first_name} (❌)\n" \
+                       f"**Player 2:** {players[1].first_name} (⭕)\n\n" \
+                       f"**Current Turn:** {players[0].first_name}"
         
-        sent_message = await message.reply_text(
+        sent_message = await reply_text(message, 
             initial_text,
             reply_markup=get_tictac_keyboard(board),
             parse_mode=enums.ParseMode.MARKDOWN
         )
         
-        TIC_TAC_TOE_GAMES[chat_id]['message_id'] = sent_message.id
+        game['message_id'] = sent_message.id
+        await TIC_TAC_TOE_GAMES.set(chat_id, game)
     else:
         keyboard = InlineKeyboardMarkup([
             [InlineKeyboardButton(f"Join Game", callback_data=f"tictac_join_game_{sender.id}")]
         ])
         
-        await message.reply_text(
+        await reply_text(message, 
             f"<b>Tic Tac Toe Game Start</b>\n\n"
             f"<a href='tg://user?id={sender.id}'>{sender.first_name}</a> ne ek Tic Tac Toe game shuru kiya hai!\n"
             f"Ek aur player ke join karne ka intezaar hai.",
@@ -757,7 +1049,7 @@ async def tictac_join_game(client: Client, query: CallbackQuery):
     joiner_id = query.from_user.id
     starter_id = int(query.data.split("_")[-1])
 
-    if chat_id in TIC_TAC_TOE_GAMES:
+    if await TIC_TAC_TOE_GAMES.contains(chat_id):
         await query.answer("Ek game pehle hi chal raha hai.", show_alert=True)
         return
 
@@ -777,29 +1069,28 @@ async def tictac_join_game(client: Client, query: CallbackQuery):
     
     board = ["➖"] * 9
 
-    TIC_TAC_TOE_GAMES[chat_id] = {
-        'players': {players[0].id: '❌', players[1].id: '⭕'},
-        'player_names': {players[0].id: players[0].first_name, players[1].id: players[1].first_name},
+    game = {
+        'players': {str(players[0].id): '❌', str(players[1].id): '⭕'},
+        'player_names': {str(players[0].id): players[0].first_name, str(players[1].id): players[1].first_name},
         'board': board,
         'current_turn_id': players[0].id,
         'message_id': query.message.id,
         'last_active': datetime.now()
     }
+    # Two people tapping "Join" at once must not both start a game
+    if not await TIC_TAC_TOE_GAMES.add(chat_id, game):
+        await query.answer("Ek game pehle hi chal raha hai.", show_alert=True)
+        return
     
-    async def inactivity_check():
-        await asyncio.sleep(300)
-        if chat_id in TIC_TAC_TOE_GAMES and (datetime.now() - TIC_TAC_TOE_GAMES[chat_id]['last_active']).total_seconds() >= 300:
-            await end_tictactoe_game(client, chat_id)
-    
-    TIC_TAC_TOE_TASK[chat_id] = asyncio.create_task(inactivity_check())
+    restart_tictactoe_timer(client, chat_id)
     
     initial_text = f"**Tic Tac Toe (Zero Katte) Game!**\n\n" \
-                   f"**Player 1:** {TIC_TAC_TOE_GAMES[chat_id]['player_names'][players[0].id]} (❌)\n" \
-                   f"**Player 2:** {TIC_TAC_TOE_GAMES[chat_id]['player_names'][players[1].id]} (⭕)\n\n" \
-                   f"**Current Turn:** {TIC_TAC_TOE_GAMES[chat_id]['player_names'][players[0].id]}"
+                   f"**Player 1:** {players[0].first_name} (❌)\n" \
+                   f"**Player 2:** {players[1].first_name} (⭕)\n\n" \
+                   f"**Current Turn:** {players[0].first_name}"
 
     try:
-        await query.message.edit_text(
+        await edit_text(query.message, 
             initial_text,
             reply_markup=get_tictac_keyboard(board),
             parse_mode=enums.ParseMode.MARKDOWN
@@ -811,11 +1102,11 @@ async def tictac_join_game(client: Client, query: CallbackQuery):
 @client.on_callback_query(filters.regex("^tictac_"))
 async def tictac_game_play(client: Client, query: CallbackQuery):
     chat_id = query.message.chat.id
-    game_state = TIC_TAC_TOE_GAMES.get(chat_id)
+    game_state = await TIC_TAC_TOE_GAMES.get(chat_id)
     
     if not game_state:
         user = query.from_user
-        await client.send_message(
+        await send_message(
             chat_id,
             f"**Yeh game abhi active nahi hai.**\n\n"
             f"<a href='tg://user?id={user.id}'>{user.first_name}</a> ne ek naya game shuru kiya hai!\n"
@@ -829,7 +1120,8 @@ async def tictac_game_play(client: Client, query: CallbackQuery):
         return
     
     user_id = query.from_user.id
-    if user_id not in game_state['players']:
+    player_key = str(user_id)
+    if player_key not in game_state['players']:
         await query.answer("Aap is game ke player nahi hain.", show_alert=True)
         return
 
@@ -850,23 +1142,15 @@ async def tictac_game_play(client: Client, query: CallbackQuery):
         await query.answer("Yeh jagah pehle se hi bhari hui hai.", show_alert=True)
         return
 
-    player_mark = game_state['players'][user_id]
+    player_mark = game_state['players'][player_key]
     board[button_index] = player_mark
 
     game_state['last_active'] = datetime.now()
-    if chat_id in TIC_TAC_TOE_TASK:
-        TIC_TAC_TOE_TASK[chat_id].cancel()
-
-    async def inactivity_check():
-        await asyncio.sleep(300)
-        if chat_id in TIC_TAC_TOE_GAMES and (datetime.now() - TIC_TAC_TOE_GAMES[chat_id]['last_active']).total_seconds() >= 300:
-            await end_tictactoe_game(client, chat_id)
-    
-    TIC_TAC_TOE_TASK[chat_id] = asyncio.create_task(inactivity_check())
+    restart_tictactoe_timer(client, chat_id)
     
     winner = check_win(board)
     if winner:
-        winner_name = game_state['player_names'][user_id]
+        winner_name = game_state['player_names'][player_key]
         final_text = f"🎉 **{winner_name} wins the game!** 🎉\n\n"
         
         keyboard = InlineKeyboardMarkup([
@@ -874,12 +1158,12 @@ async def tictac_game_play(client: Client, query: CallbackQuery):
             [InlineKeyboardButton("🗑️ Close", callback_data="close")]
         ])
         
-        await query.message.edit_text(
+        await edit_text(query.message, 
             final_text,
             reply_markup=keyboard,
             parse_mode=enums.ParseMode.MARKDOWN
         )
-        del TIC_TAC_TOE_GAMES[chat_id]
+        await TIC_TAC_TOE_GAMES.pop(chat_id)
         return
     
     if check_draw(board):
@@ -890,18 +1174,19 @@ async def tictac_game_play(client: Client, query: CallbackQuery):
             [InlineKeyboardButton("🗑️ Close", callback_data="close")]
         ])
         
-        await query.message.edit_text(
+        await edit_text(query.message, 
             final_text,
             reply_markup=keyboard,
             parse_mode=enums.ParseMode.MARKDOWN
         )
-        del TIC_TAC_TOE_GAMES[chat_id]
+        await TIC_TAC_TOE_GAMES.pop(chat_id)
         return
 
-    other_player_id = [p for p in game_state['players'] if p != user_id][0]
-    game_state['current_turn_id'] = other_player_id
+    other_player_key = [p for p in game_state['players'] if p != player_key][0]
+    game_state['current_turn_id'] = int(other_player_key)
+    await TIC_TAC_TOE_GAMES.set(chat_id, game_state)
     
-    current_player_name = game_state['player_names'][other_player_id]
+    current_player_name = game_state['player_names'][other_player_key]
 
     updated_text = f"**Tic Tac Toe (Zero Katte) Game!**\n\n" \
                    f"**Player 1:** {game_state['player_names'][list(game_state['players'].keys())[0]]} (❌)\n" \
@@ -909,7 +1194,7 @@ async def tictac_game_play(client: Client, query: CallbackQuery):
                    f"**Current Turn:** {current_player_name}"
 
     try:
-        await query.message.edit_text(
+        await edit_text(query.message, 
             updated_text,
             reply_markup=get_tictac_keyboard(board),
             parse_mode=enums.ParseMode.MARKDOWN
@@ -922,7 +1207,7 @@ async def tictac_new_game_starter(client: Client, query: CallbackQuery):
     chat_id = query.message.chat.id
     starter_id = int(query.data.split('_')[-1])
     
-    if chat_id in TIC_TAC_TOE_GAMES:
+    if await TIC_TAC_TOE_GAMES.contains(chat_id):
         await query.answer("Ek game pehle hi chal raha hai.", show_alert=True)
         return
 
@@ -935,7 +1220,7 @@ async def tictac_new_game_starter(client: Client, query: CallbackQuery):
         [InlineKeyboardButton("Join Game", callback_data=f"tictac_join_game_{starter_id}")]
     ])
     
-    await client.send_message(
+    await send_message(
         chat_id,
         f"<b>Tic Tac Toe Game Start</b>\n\n"
         f"<a href='tg://user?id={starter_user.id}'>{starter_user.first_name}</a> ne ek Tic Tac Toe game shuru kiya hai!\n"
@@ -943,7 +1228,7 @@ async def tictac_new_game_starter(client: Client, query: CallbackQuery):
         reply_markup=keyboard,
         parse_mode=enums.ParseMode.HTML
     )
-    await query.message.delete()
+    await delete_message(query.message)
 
 
 @client.on_message(filters.group & filters.command("settings"))
@@ -952,7 +1237,7 @@ async def settings_command_handler(client: Client, message: Message):
     chat_id = message.chat.id
     # FIX: Check if the user is a group admin before showing settings
     if not await is_group_admin(chat_id, user_id):
-        await message.reply_text("Aap group admin nahi hain, is command ka upyog nahi kar sakte.")
+        await reply_text(message, "Aap group admin nahi hain, is command ka upyog nahi kar sakte.")
         return
 
     await show_settings_main_menu(client, message)
@@ -985,9 +1270,9 @@ async def show_settings_main_menu(client, message):
     ])
 
     if isinstance(message, CallbackQuery):
-        await message.message.edit_text(settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await edit_text(message.message, settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
     else:
-        await message.reply_text(settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await reply_text(message, settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
 
 
 async def show_on_off_settings(client, message):
@@ -996,7 +1281,7 @@ async def show_on_off_settings(client, message):
     else:
         chat_id = message.chat.id
 
-    settings = get_group_settings(chat_id)
+    settings = await get_group_settings(chat_id)
     
     biolink_status = "✅ On" if settings.get("delete_biolink", True) else "❌ Off"
     abuse_status = "✅ On" if settings.get("delete_abuse", True) else "❌ Off"
@@ -1017,9 +1302,9 @@ async def show_on_off_settings(client, message):
     ])
 
     if isinstance(message, CallbackQuery):
-        await message.message.edit_text(settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await edit_text(message.message, settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
     else:
-        await message.reply_text(settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await reply_text(message, settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
 
 
 async def show_warn_punishment_settings(client, message):
@@ -1028,8 +1313,8 @@ async def show_warn_punishment_settings(client, message):
     else:
         chat_id = message.chat.id
     
-    biolink_limit, biolink_punishment = get_warn_settings(chat_id, "biolink")
-    abuse_limit, abuse_punishment = get_warn_settings(chat_id, "abuse")
+    biolink_limit, biolink_punishment = await get_warn_settings(chat_id, "biolink")
+    abuse_limit, abuse_punishment = await get_warn_settings(chat_id, "abuse")
     
     settings_text = (
         "<b>📋 Warn & Punishment Settings:</b>\n\n"
@@ -1045,9 +1330,9 @@ async def show_warn_punishment_settings(client, message):
     ])
     
     if isinstance(message, CallbackQuery):
-        await message.message.edit_text(settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await edit_text(message.message, settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
     else:
-        await message.reply_text(settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await reply_text(message, settings_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
 
 async def show_notification_delete_time_menu(client, message):
     if isinstance(message, CallbackQuery):
@@ -1055,7 +1340,7 @@ async def show_notification_delete_time_menu(client, message):
     else:
         chat_id = message.chat.id
         
-    delete_time = get_notification_delete_time(chat_id)
+    delete_time = await get_notification_delete_time(chat_id)
     
     status_text = (
         f"<b>⏱️ Notification Delete Time:</b>\n\n"
@@ -1073,9 +1358,9 @@ async def show_notification_delete_time_menu(client, message):
     ])
     
     if isinstance(message, CallbackQuery):
-        await message.message.edit_text(status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await edit_text(message.message, status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
     else:
-        await message.reply_text(status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await reply_text(message, status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
 
 async def show_scheduled_message_settings(client, message):
     if isinstance(message, CallbackQuery):
@@ -1083,7 +1368,7 @@ async def show_scheduled_message_settings(client, message):
     else:
         chat_id = message.chat.id
         
-    settings = get_reminder_settings(chat_id)
+    settings = await get_reminder_settings(chat_id)
     reminder_status = "✅ On" if settings.get("enabled", DEFAULT_REMINDER_ENABLED) else "❌ Off"
     
     status_text = (
@@ -1100,9 +1385,9 @@ async def show_scheduled_message_settings(client, message):
     ])
     
     if isinstance(message, CallbackQuery):
-        await message.message.edit_text(status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await edit_text(message.message, status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
     else:
-        await message.reply_text(status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await reply_text(message, status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
 
 async def show_interval_settings(client, message):
     if isinstance(message, CallbackQuery):
@@ -1110,7 +1395,7 @@ async def show_interval_settings(client, message):
     else:
         chat_id = message.chat.id
     
-    settings = get_reminder_settings(chat_id)
+    settings = await get_reminder_settings(chat_id)
     current_interval = settings.get("interval_hours", DEFAULT_REMINDER_INTERVAL_HOURS)
     
     status_text = (
@@ -1133,9 +1418,9 @@ async def show_interval_settings(client, message):
     ])
     
     if isinstance(message, CallbackQuery):
-        await message.message.edit_text(status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await edit_text(message.message, status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
     else:
-        await message.reply_text(status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await reply_text(message, status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
 
 async def show_game_settings(client, message):
     if isinstance(message, CallbackQuery):
@@ -1152,9 +1437,9 @@ async def show_game_settings(client, message):
     ])
     
     if isinstance(message, CallbackQuery):
-        await message.message.edit_text(game_status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await edit_text(message.message, game_status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
     else:
-        await message.reply_text(game_status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await reply_text(message, game_status_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
 
 
 @client.on_message(filters.group & filters.command("free"))
@@ -1162,7 +1447,7 @@ async def command_free(client: Client, message: Message):
     chat_id = message.chat.id
     user_id = message.from_user.id
     if not await is_group_admin(chat_id, user_id):
-        return await message.reply_text("Aap group admin nahi hain.")
+        return await reply_text(message, "Aap group admin nahi hain.")
 
     if message.reply_to_message:
         target = message.reply_to_message.from_user
@@ -1171,16 +1456,16 @@ async def command_free(client: Client, message: Message):
         try:
             target = await client.get_users(int(arg) if arg.isdigit() else arg)
         except Exception:
-            return await client.send_message(chat_id, "<b>Invalid user or id provided.</b>", parse_mode=enums.ParseMode.HTML)
+            return await send_message(chat_id, "<b>Invalid user or id provided.</b>", parse_mode=enums.ParseMode.HTML)
     else:
-        return await client.send_message(chat_id, "<b>Reply or use /free user or id to whitelist someone.</b>", parse_mode=enums.ParseMode.HTML)
+        return await send_message(chat_id, "<b>Reply or use /free user or id to whitelist someone.</b>", parse_mode=enums.ParseMode.HTML)
 
     if not target:
-        return await client.send_message(chat_id, "<b>User not found.</b>", parse_mode=enums.ParseMode.HTML)
+        return await send_message(chat_id, "<b>User not found.</b>", parse_mode=enums.ParseMode.HTML)
 
-    add_whitelist_sync(chat_id, target.id)
-    reset_warnings_sync(chat_id, target.id, "biolink")
-    reset_warnings_sync(chat_id, target.id, "abuse")
+    await add_whitelist(chat_id, target.id)
+    await reset_warnings(chat_id, target.id, "biolink")
+    await reset_warnings(chat_id, target.id, "abuse")
 
     full_name = f"{target.first_name}{(' ' + target.last_name) if target.last_name else ''}"
     mention = f"{full_name}"
@@ -1192,14 +1477,14 @@ async def command_free(client: Client, message: Message):
             InlineKeyboardButton("🗑️ Close", callback_data="close")
         ]
     ])
-    await client.send_message(chat_id, text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+    await send_message(chat_id, text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
 
 @client.on_message(filters.group & filters.command("unfree"))
 async def command_unfree(client: Client, message: Message):
     chat_id = message.chat.id
     user_id = message.from_user.id
     if not await is_group_admin(chat_id, user_id):
-        return await message.reply_text("Aap group admin nahi hain.")
+        return await reply_text(message, "Aap group admin nahi hain.")
 
     if message.reply_to_message:
         target = message.reply_to_message.from_user
@@ -1208,18 +1493,18 @@ async def command_unfree(client: Client, message: Message):
         try:
             target = await client.get_users(int(arg) if arg.isdigit() else arg)
         except Exception:
-            return await client.send_message(chat_id, "<b>Invalid user or id provided.</b>", parse_mode=enums.ParseMode.HTML)
+            return await send_message(chat_id, "<b>Invalid user or id provided.</b>", parse_mode=enums.ParseMode.HTML)
     else:
-        return await client.send_message(chat_id, "<b>Reply or use /unfree user or id to unwhitelist someone.</b>", parse_mode=enums.ParseMode.HTML)
+        return await send_message(chat_id, "<b>Reply or use /unfree user or id to unwhitelist someone.</b>", parse_mode=enums.ParseMode.HTML)
 
     if not target:
-        return await client.send_message(chat_id, "<b>User not found.</b>", parse_mode=enums.ParseMode.HTML)
+        return await send_message(chat_id, "<b>User not found.</b>", parse_mode=enums.ParseMode.HTML)
 
     full_name = f"{target.first_name}{(' ' + target.last_name) if target.last_name else ''}"
     mention = f"{full_name}"
 
-    if is_whitelisted_sync(chat_id, target.id):
-        remove_whitelist_sync(chat_id, target.id)
+    if await is_whitelisted(chat_id, target.id):
+        await remove_whitelist(chat_id, target.id)
         text = f"<b>🚫 {mention} has been removed from the whitelist</b>"
     else:
         text = f"<b>ℹ️ {mention} is not whitelisted.</b>"
@@ -1230,18 +1515,18 @@ async def command_unfree(client: Client, message: Message):
             InlineKeyboardButton("🗑️ Close", callback_data="close")
         ]
     ])
-    await client.send_message(chat_id, text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+    await send_message(chat_id, text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
 
 @client.on_message(filters.group & filters.command("freelist"))
 async def command_freelist(client: Client, message: Message):
     chat_id = message.chat.id
     user_id = message.from_user.id
     if not await is_group_admin(chat_id, user_id):
-        return await message.reply_text("Aap group admin nahi hain.")
+        return await reply_text(message, "Aap group admin nahi hain.")
 
-    ids = get_whitelist_sync(chat_id)
+    ids = await get_whitelist(chat_id)
     if not ids:
-        await client.send_message(chat_id, "<b>⚠️ No users are whitelisted in this group.</b>", parse_mode=enums.ParseMode.HTML)
+        await send_message(chat_id, "<b>⚠️ No users are whitelisted in this group.</b>", parse_mode=enums.ParseMode.HTML)
         return
 
     text = "<b>📋 Whitelisted Users:</b>\n\n"
@@ -1254,12 +1539,81 @@ async def command_freelist(client: Client, message: Message):
             text += f"{i}: [User not found] [`{uid}`]\n"
 
     keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("🗑️ Close", callback_data="close")]])
-    await client.send_message(chat_id, text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+    await send_message(chat_id, text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+
+def format_link_target(kind, value):
+    return f"@{value}" if kind == "username" else value
+
+@client.on_message(filters.group & filters.command(["allowlink", "denylink"]))
+async def command_link_rule(client: Client, message: Message):
+    chat_id = message.chat.id
+    if not await is_group_admin(chat_id, message.from_user.id):
+        return await reply_text(message, "Aap group admin nahi hain.")
+
+    command = message.command[0].lower()
+    if len(message.command) < 2:
+        return await reply_text(message, 
+            f"<b>Use: /{command} &lt;domain ya @username&gt;</b>\nJaise: <code>/{command} youtube.com</code> ya <code>/{command} @mychannel</code>",
+            parse_mode=enums.ParseMode.HTML
+        )
+    if db is None:
+        return await reply_text(message, "Database connect nahi hai, rule save nahi ho sakta.")
+
+    kind, value = parse_rule_target(message.command[1])
+    if kind is None:
+        return await reply_text(message, "<b>Yeh sahi domain ya @username nahi hai.</b>", parse_mode=enums.ParseMode.HTML)
+
+    action = ALLOW if command == "allowlink" else DENY
+    await set_link_rule(chat_id, kind, value, action)
+    target = html.escape(format_link_target(kind, value))
+    if action == ALLOW:
+        text = f"<b>✅ <code>{target}</code> ab is group mein allowed hai.</b>"
+    else:
+        text = f"<b>🚫 <code>{target}</code> ab is group mein hamesha delete hoga.</b>"
+    await reply_text(message, text, parse_mode=enums.ParseMode.HTML)
+
+@client.on_message(filters.group & filters.command("removelink"))
+async def command_removelink(client: Client, message: Message):
+    chat_id = message.chat.id
+    if not await is_group_admin(chat_id, message.from_user.id):
+        return await reply_text(message, "Aap group admin nahi hain.")
+
+    if len(message.command) < 2:
+        return await reply_text(message, "<b>Use: /removelink &lt;domain ya @username&gt;</b>", parse_mode=enums.ParseMode.HTML)
+
+    kind, value = parse_rule_target(message.command[1])
+    if kind is None:
+        return await reply_text(message, "<b>Yeh sahi domain ya @username nahi hai.</b>", parse_mode=enums.ParseMode.HTML)
+
+    target = html.escape(format_link_target(kind, value))
+    if await remove_link_rule(chat_id, kind, value):
+        text = f"<b>🗑️ <code>{target}</code> ka rule hata diya gaya.</b>"
+    else:
+        text = f"<b>ℹ️ <code>{target}</code> ke liye koi rule nahi hai.</b>"
+    await reply_text(message, text, parse_mode=enums.ParseMode.HTML)
+
+@client.on_message(filters.group & filters.command("linkrules"))
+async def command_linkrules(client: Client, message: Message):
+    chat_id = message.chat.id
+    if not await is_group_admin(chat_id, message.from_user.id):
+        return await reply_text(message, "Aap group admin nahi hain.")
+
+    rules = LINK_RULES.rules(chat_id)
+    if not rules:
+        return await reply_text(message, "<b>⚠️ Is group mein koi link rule nahi hai.</b>", parse_mode=enums.ParseMode.HTML)
+
+    text = "<b>🔗 Link Rules:</b>\n\n"
+    for i, (kind, value, action) in enumerate(rules, start=1):
+        icon = "✅" if action == ALLOW else "🚫"
+        text += f"{i}: {icon} <code>{html.escape(format_link_target(kind, value))}</code>\n"
+
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("🗑️ Close", callback_data="close")]])
+    await reply_text(message, text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
 
 @client.on_message(filters.command("stats") & filters.user(ADMIN_USER_IDS))
 async def stats(client: Client, message: Message) -> None:
     if not is_admin(message.from_user.id):
-        await message.reply_text("Aapke paas is command ko use karne ki permission nahi hai.")
+        await reply_text(message, "Aapke paas is command ko use karne ki permission nahi hai.")
         return
 
     total_groups = 0
@@ -1267,12 +1621,12 @@ async def stats(client: Client, message: Message) -> None:
     if db is not None:
         try:
             if db.groups is not None:
-                total_groups = db.groups.count_documents({})
+                total_groups = await db.groups.count_documents({})
             if db.users is not None:
-                total_users = db.users.count_documents({})
+                total_users = await db.users.count_documents({})
         except Exception as e:
             logger.error(f"Error fetching stats from DB: {e}")
-            await message.reply_text(f"Stats fetch karte samay error hui: {e}")
+            await reply_text(message, f"Stats fetch karte samay error hui: {e}")
             return
 
     stats_message = (
@@ -1282,27 +1636,28 @@ async def stats(client: Client, message: Message) -> None:
         f"• Uptime: {str(datetime.now() - bot_start_time).split('.')[0]} \n"
         f"• Last Check: {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}"
     )
-    await message.reply_text(stats_message, parse_mode=enums.ParseMode.HTML)
+    await reply_text(message, stats_message, parse_mode=enums.ParseMode.HTML)
     logger.info(f"Admin {message.from_user.id} requested stats.")
 
 @client.on_message(filters.command("broadcast") & filters.user(ADMIN_USER_IDS) & filters.private)
 async def broadcast_command(client: Client, message: Message) -> None:
     if not is_admin(message.from_user.id):
-        await message.reply_text("Aapke paas is command ko use karne ki permission nahi hai.")
+        await reply_text(message, "Aapke paas is command ko use karne ki permission nahi hai.")
         return
 
-    await message.reply_text("📢 Broadcast shuru karne ke liye, kripya apna message bhejein:")
-    BROADCAST_MESSAGE[message.from_user.id] = "waiting_for_message"
+    await reply_text(message, "📢 Broadcast shuru karne ke liye, kripya apna message bhejein:")
+    await BROADCAST_MESSAGE.set(message.from_user.id, "waiting_for_message")
     logger.info(f"Admin {message.from_user.id} initiated broadcast.")
 
 @client.on_message(filters.private & filters.user(ADMIN_USER_IDS) & ~filters.command([]))
 async def handle_broadcast_message(client: Client, message: Message) -> None:
     user = message.from_user
 
-    if BROADCAST_MESSAGE.get(user.id) != "waiting_for_message":
+    if await BROADCAST_MESSAGE.get(user.id) != "waiting_for_message":
         return
 
-    BROADCAST_MESSAGE[user.id] = message
+    # Only the message's address is kept, so any instance can pick up the confirmation
+    await BROADCAST_MESSAGE.set(user.id, {"chat_id": message.chat.id, "message_id": message.id})
 
     keyboard = [
         [InlineKeyboardButton("✅ Yes, Broadcast Now", callback_data="confirm_broadcast")],
@@ -1311,39 +1666,39 @@ async def handle_broadcast_message(client: Client, message: Message) -> None:
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     try:
-        await message.reply_text(
+        await reply_text(message, 
             "Kya aap is message ko sabhi groups aur users ko bhejna chahte hain?",
             reply_markup=reply_markup
         )
     except Exception as e:
         logger.error(f"Error sending broadcast confirmation message to {user.id}: {e}")
-        await message.reply_text("Broadcast confirmation message bhejne mein error aaya.")
-        BROADCAST_MESSAGE.pop(user.id, None)
+        await reply_text(message, "Broadcast confirmation message bhejne mein error aaya.")
+        await BROADCAST_MESSAGE.pop(user.id)
 
 @client.on_message(filters.command("addabuse") & filters.user(ADMIN_USER_IDS))
 async def add_abuse_word(client: Client, message: Message) -> None:
     if not is_admin(message.from_user.id):
-        await message.reply_text("Aapke paas is command ko use karne ki permission nahi hai.")
+        await reply_text(message, "Aapke paas is command ko use karne ki permission nahi hai.")
         return
     if len(message.command) < 2:
-        await message.reply_text("Kripya woh shabd dein jise aap add karna chahte hain. Upyog: <code>/addabuse &lt;shabd&gt;</code>", parse_mode=enums.ParseMode.HTML)
+        await reply_text(message, "Kripya woh shabd dein jise aap add karna chahte hain. Upyog: <code>/addabuse &lt;shabd&gt;</code>", parse_mode=enums.ParseMode.HTML)
         return
     word_to_add = " ".join(message.command[1:]).lower().strip()
     if not word_to_add:
-        await message.reply_text("Kripya ek valid shabd dein.")
+        await reply_text(message, "Kripya ek valid shabd dein.")
         return
     if profanity_filter is not None:
         try:
             if await profanity_filter.add_bad_word(word_to_add):
-                await message.reply_text(f"✅ Shabd <code>{word_to_add}</code> safaltapoorvak jod diya gaya hai.", parse_mode=enums.ParseMode.HTML)
+                await reply_text(message, f"✅ Shabd <code>{word_to_add}</code> safaltapoorvak jod diya gaya hai.", parse_mode=enums.ParseMode.HTML)
                 logger.info(f"Admin {message.from_user.id} added abuse word: {word_to_add}.")
             else:
-                await message.reply_text(f"Shabd <code>{word_to_add}</code> pehle se hi list mein maujood hai.", parse_mode=enums.ParseMode.HTML)
+                await reply_text(message, f"Shabd <code>{word_to_add}</code> pehle se hi list mein maujood hai.", parse_mode=enums.ParseMode.HTML)
         except Exception as e:
-            await message.reply_text(f"Shabd jodte samay error hui: {e}")
+            await reply_text(message, f"Shabd jodte samay error hui: {e}")
             logger.error(f"Error adding abuse word {word_to_add}: {e}")
     else:
-        await message.reply_text("Profanity filter initialize nahi hua hai. MongoDB connection mein problem ho sakti hai.")
+        await reply_text(message, "Profanity filter initialize nahi hua hai. MongoDB connection mein problem ho sakti hai.")
         logger.error("Profanity filter not initialized, cannot add abuse word.")
 
 
@@ -1354,17 +1709,14 @@ async def clear_temp_data(client: Client, message: Message):
     if not is_admin(message.from_user.id):
         return
 
-    status_msg = await message.reply_text("🧹 Safai shuru ho rahi hai... Kripya intezaar karein.")
+    status_msg = await reply_text(message, "🧹 Safai shuru ho rahi hai... Kripya intezaar karein.")
     
     # 1. Clear in-memory data
     in_memory_cleared = {
-        "Tic Tac Toe Games": len(TIC_TAC_TOE_GAMES),
-        "Locked Messages": len(LOCKED_MESSAGES),
-        "Secret Chats": len(SECRET_CHATS),
+        "Tic Tac Toe Games": await TIC_TAC_TOE_GAMES.clear(),
+        "Locked Messages": await LOCKED_MESSAGES.clear(),
+        "Secret Chats": await SECRET_CHATS.clear(),
     }
-    TIC_TAC_TOE_GAMES.clear()
-    LOCKED_MESSAGES.clear()
-    SECRET_CHATS.clear()
 
     report_text = "<b>📊 Safai Report</b>\n\n"
     report_text += "<b>In-Memory Data Cleared:</b>\n"
@@ -1377,57 +1729,53 @@ async def clear_temp_data(client: Client, message: Message):
     # 2. Clean database
     if db is None:
         report_text += "\n⚠️ MongoDB se connect nahi ho paya, isliye database saaf nahi hua."
-        await status_msg.edit_text(report_text, parse_mode=enums.ParseMode.HTML)
+        await edit_text(status_msg, report_text, parse_mode=enums.ParseMode.HTML)
         return
 
-    await status_msg.edit_text("🧠 In-memory data saaf ho gaya hai. Ab database check kiya jaa raha hai...")
+    await edit_text(status_msg, "🧠 In-memory data saaf ho gaya hai. Ab database check kiya jaa raha hai...")
+
+    async def show_progress(done, total):
+        try:
+            await edit_text(status_msg, f"🔍 Database check ho raha hai... [{done}/{total}]")
+        except Exception as e:
+            # A failed progress edit must not abort the sweep
+            logger.debug(f"Could not update cleanup progress: {e}")
 
-    inactive_groups = 0
-    total_groups = 0
     try:
-        group_ids = [g["chat_id"] for g in db.groups.find({}, {"chat_id": 1})]
-        total_groups = len(group_ids)
-        
-        for i, chat_id in enumerate(group_ids):
-            if i % 20 == 0: # Update status every 20 checks
-                await status_msg.edit_text(f"🔍 Database check ho raha hai... [{i}/{total_groups}]")
-            
-            try:
-                # This call will fail if the bot is not in the chat
-                await client.get_chat(chat_id)
-                await asyncio.sleep(0.1) # Be gentle with the API
-            except (Forbidden, BadRequest, ChatAdminRequired, ValueError) as e:
-                # ValueError can happen for invalid chat_id format, good to catch
-                logger.warning(f"Bot is no longer in chat {chat_id} or cannot access it ({type(e).__name__}). Deleting related data.")
-                
-                # Delete all data associated with this chat_id
-                db.groups.delete_one({"chat_id": chat_id})
-                db.settings.delete_one({"chat_id": chat_id})
-                db.warn_settings.delete_one({"chat_id": chat_id})
-                db.whitelist.delete_many({"chat_id": chat_id})
-                db.warnings.delete_many({"chat_id": chat_id})
-                
-                inactive_groups += 1
-                
+        total_groups, removed = await sweep_stale_groups(
+            client, db, DISPATCHER, on_removed=forget_removed_groups, on_progress=show_progress
+        )
+        inactive_groups = len(removed)
+
         report_text += "\n<b>Database Data Cleared:</b>\n"
         report_text += f"• Kul groups check kiye gaye: {total_groups}\n"
         report_text += f"• Inactive groups ka data hataya gaya: {inactive_groups}\n"
         
-        logger.info(f"Database cleanup complete. Removed {inactive_groups} inactive groups.")
-
     except Exception as e:
         logger.error(f"Error during database cleanup: {e}")
         report_text += f"\n❌ Database saaf karte samay ek error aayi: `{e}`"
 
     report_text += "\n\n✅ Safai poori hui!"
-    await status_msg.edit_text(report_text, parse_mode=enums.ParseMode.HTML)
+    await edit_text(status_msg, report_text, parse_mode=enums.ParseMode.HTML)
+
+
+def forget_removed_groups(chat_ids):
+    """Drops in-memory state of groups whose data was deleted by the stale group sweep."""
+    for chat_id in chat_ids:
+        chat_configs.invalidate(chat_id)
+        WHITELIST_INDEX.drop_chat(chat_id)
+        LINK_RULES.drop_chat(chat_id)
+        ADMIN_ROSTERS.pop(chat_id)
+        RECENT_MEMBERS.forget(chat_id)
 
 
 @client.on_message(filters.new_chat_members)
+@PIPELINE.sharded
 async def welcome_new_member(client: Client, message: Message) -> None:
     new_members = message.new_chat_members
     chat = message.chat
-    bot_info = await client.get_me()
+    bot_info = await get_bot_profile()
+    new_joins = []
 
     for member in new_members:
         if member.id == bot_info.id:
@@ -1439,12 +1787,12 @@ async def welcome_new_member(client: Client, message: Message) -> None:
                 f"Added by: {message.from_user.first_name} (`{message.from_user.id}`)\n"
                 f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}"
             )
-            await log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
+            log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
             logger.info(f"Bot joined group: {chat.title} ({chat.id}) added by {message.from_user.id}.")
 
             if db is not None and db.groups is not None:
                 try:
-                    db.groups.update_one(
+                    await db.groups.update_one(
                         {"chat_id": chat.id},
                         {"$set": {"title": chat.title, "type": chat.type.value, "last_active": datetime.now(), "last_reminder": datetime.now()}},
                         upsert=True
@@ -1463,7 +1811,7 @@ async def welcome_new_member(client: Client, message: Message) -> None:
                     keyboard = InlineKeyboardMarkup([
                         [InlineKeyboardButton("🔧 Bot Settings", callback_data="show_settings_main_menu")]
                     ])
-                    await message.reply_text(welcome_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+                    await reply_text(message, welcome_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
                     logger.info(f"Bot confirmed admin status in {chat.title} ({chat.id}).")
                 else:
                     # FIX: New non-admin join message with warning
@@ -1473,45 +1821,137 @@ async def welcome_new_member(client: Client, message: Message) -> None:
                         "Admin banne se main aapke group ko sahi se manage kar paunga aur bina wajah ke messages delete nahi honge.\n"
                         "Mujhe admin banane ke liye, group settings mein jaakar mujhe <b>'Delete Messages'</b>, <b>'Restrict Users'</b> aur <b>'Post Messages'</b> ki permissions dein."
                     )
-                    await message.reply_text(welcome_text, parse_mode=enums.ParseMode.HTML)
+                    await reply_text(message, welcome_text, parse_mode=enums.ParseMode.HTML)
                     logger.warning(f"Bot is not admin in {chat.title} ({chat.id}). Functionality will be limited.")
             except Exception as e:
                 logger.error(f"Error during bot's self-introduction in {chat.title} ({chat.id}): {e}")
         else:
-            log_message = (
-                f"<b>🆕 New Member Joined:</b>\n"
-                f"Group: <code>{chat.title}</code>\n"
-                f"Group ID: <code>{chat.id}</code>\n"
-                f"User: {member.first_name} (`{member.id}`)\n"
-                f"Username: @{member.username if member.username else 'N/A'}\n"
-                f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}"
+            new_joins.append(member)
+
+    if not new_joins:
+        return
+    if JOIN_RAID_GUARD.record_joins(chat.id, len(new_joins)):
+        # Handled together with the rest of the raid by process_join_batch
+        for member in new_joins:
+            JOIN_RAID_GUARD.enqueue(chat.id, (member, message))
+        return
+
+    for member in new_joins:
+        log_message = (
+            f"<b>🆕 New Member Joined:</b>\n"
+            f"Group: <code>{chat.title}</code>\n"
+            f"Group ID: <code>{chat.id}</code>\n"
+            f"User: {member.first_name} (`{member.id}`)\n"
+            f"Username: @{member.username if member.username else 'N/A'}\n"
+            f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}"
+        )
+        log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
+        logger.info(f"New member {member.id} joined group {chat.id}.")
+
+        try:
+            # A fresh join re-reads the bio; the member may have just changed it
+            USER_BIOS.pop(member.id)
+            _, bio_has_link = await get_user_bio(member.id)
+            settings = await get_group_settings(chat.id)
+            
+            whitelisted = await is_whitelisted(chat.id, member.id)
+            
+            if settings.get("delete_biolink", True) and not whitelisted and bio_has_link:
+                warn_limit, punishment = await get_warn_settings(chat.id, "biolink")
+
+                if punishment:
+                    count = await increment_warning(chat.id, member.id, "biolink")
+                    if count >= warn_limit:
+                        await handle_incident(client, chat.id, member, "bio-link", message, "punished", category="biolink")
+                    else:
+                        await handle_incident(client, chat.id, member, "bio-link", message, "warn", category="biolink")
+        except Exception as e:
+            logger.error(f"Error checking bio for new member {member.id}: {e}")
+
+async def process_join_batch(chat_id, joins):
+    """Handles joins collected during a raid: one settings read, concurrent bio fetches and bulk punishment."""
+    chat = joins[0][1].chat
+    members = {member.id: (member, message) for member, message in joins}
+    settings = await get_group_settings(chat_id)
+
+    flagged = []
+    if settings.get("delete_biolink", True):
+        semaphore = asyncio.Semaphore(RAID_BIO_FETCH_CONCURRENCY)
+
+        async def has_bio_link(member):
+            async with semaphore:
+                USER_BIOS.pop(member.id)
+                try:
+                    _, bio_has_link = await get_user_bio(member.id)
+                    return bio_has_link
+                except Exception as e:
+                    logger.error(f"Error checking bio for new member {member.id}: {e}")
+                    return False
+
+        candidates = [
+            (member, message) for member, message in members.values()
+            if not await is_whitelisted(chat_id, member.id)
+        ]
+        verdicts = await asyncio.gather(*[has_bio_link(member) for member, _ in candidates])
+        flagged = [candidate for candidate, verdict in zip(candidates, verdicts) if verdict]
+
+    punished, warned = [], []
+    warn_limit, punishment = await get_warn_settings(chat_id, "biolink")
+    if flagged and punishment:
+        counts = await asyncio.gather(*[increment_warning(chat_id, member.id, "biolink") for member, _ in flagged])
+        for (member, _), count in zip(flagged, counts):
+            (punished if count >= warn_limit else warned).append(member)
+
+        try:
+            message_ids = sorted({message.id for _, message in flagged})
+            await DISPATCHER.call(PRIORITY_MODERATION, chat_id, client.delete_messages, chat_id=chat_id, message_ids=message_ids)
+        except Exception as e:
+            logger.error(f"Error deleting join messages in {chat_id}: {e}")
+
+        if punishment == "mute":
+            actions = [DISPATCHER.call(PRIORITY_MODERATION, chat_id, client.restrict_chat_member, chat_id, member.id, ChatPermissions()) for member in punished]
+        else: # punishment == "ban"
+            actions = [DISPATCHER.call(PRIORITY_MODERATION, chat_id, client.ban_chat_member, chat_id, member.id) for member in punished]
+        for member, result in zip(punished, await asyncio.gather(*actions, return_exceptions=True)):
+            if isinstance(result, Exception):
+                logger.error(f"Error applying {punishment} to {member.id} in {chat_id}: {result}")
+
+    if flagged:
+        action_text = "muted" if punishment == "mute" else "banned"
+        notification_text = (
+            f"<b>🚨 Join raid detected!</b>\n\n"
+            f"{len(members)} new members checked in one go.\n"
+            f"🚫 {len(punished)} {action_text} for a link in their bio.\n"
+            f"⚠️ {len(warned)} warned for a link in their bio."
+        )
+        try:
+            sent_notification = await DISPATCHER.call(
+                PRIORITY_NOTIFICATION, chat_id, client.send_message,
+                chat_id=chat_id, text=notification_text, parse_mode=enums.ParseMode.HTML
             )
-            await log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
-            logger.info(f"New member {member.id} joined group {chat.id}.")
+            delete_time_minutes = await get_notification_delete_time(chat_id)
+            if delete_time_minutes > 0:
+                await DELETION_SCHEDULER.schedule(chat_id, sent_notification.id, delete_time_minutes * 60)
+        except Exception as e:
+            logger.error(f"Error sending raid notification in chat {chat_id}: {e}")
+
+    log_message = (
+        f"<b>🚨 Join Raid Batch:</b>\n"
+        f"Group: <code>{chat.title}</code>\n"
+        f"Group ID: <code>{chat_id}</code>\n"
+        f"New members: {len(members)}, bio links: {len(flagged)}, punished: {len(punished)}, warned: {len(warned)}\n"
+        f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}"
+    )
+    log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
+    logger.info(f"Processed {len(members)} raid joins in {chat_id}: {len(punished)} punished, {len(warned)} warned.")
 
-            try:
-                user_profile = await client.get_chat(member.id)
-                bio = user_profile.bio or ""
-                settings = get_group_settings(chat.id)
-                
-                is_whitelisted = is_whitelisted_sync(chat.id, member.id)
-                
-                if settings.get("delete_biolink", True) and not is_whitelisted and URL_PATTERN.search(bio):
-                    warn_limit, punishment = get_warn_settings(chat.id, "biolink")
-
-                    if punishment:
-                        count = increment_warning_sync(chat.id, member.id, "biolink")
-                        if count >= warn_limit:
-                            await handle_incident(client, chat.id, member, "bio-link", message, "punished", category="biolink")
-                        else:
-                            await handle_incident(client, chat.id, member, "bio-link", message, "warn", category="biolink")
-            except Exception as e:
-                logger.error(f"Error checking bio for new member {member.id}: {e}")
+JOIN_RAID_GUARD = JoinRaidGuard(process_join_batch)
 
 @client.on_message(filters.left_chat_member)
+@PIPELINE.sharded
 async def left_member_handler(client: Client, message: Message) -> None:
     left_member = message.left_chat_member
-    bot_info = await client.get_me()
+    bot_info = await get_bot_profile()
     chat = message.chat
 
     if left_member and left_member.id == bot_info.id:
@@ -1522,7 +1962,7 @@ async def left_member_handler(client: Client, message: Message) -> None:
             f"Removed by: {message.from_user.first_name} (`{message.from_user.id}`)\n"
             f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}"
         )
-        await log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
+        log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
         logger.info(f"Bot was removed from group: {chat.title} ({chat.id}) by {message.from_user.id}.")
         # No need to delete from DB here, /cleartempdata will handle it.
     else:
@@ -1534,12 +1974,13 @@ async def left_member_handler(client: Client, message: Message) -> None:
             f"Username: @{left_member.username if left_member.username else 'N/A'}\n"
             f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}"
         )
-        await log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
+        log_to_channel(log_message, parse_mode=enums.ParseMode.HTML)
         logger.info(f"Member {left_member.id} left group {chat.id}.")
 
 
 # --- Core Message Handler (Profanity, URL in message) ---
 @client.on_message(filters.group & filters.text & ~filters.via_bot)
+@PIPELINE.sharded
 async def handle_all_messages(client: Client, message: Message) -> None:
     user = message.from_user
     chat = message.chat
@@ -1547,35 +1988,40 @@ async def handle_all_messages(client: Client, message: Message) -> None:
 
     if not user:
         return
-    if await is_group_admin(chat.id, user.id) or is_whitelisted_sync(chat.id, user.id):
+    RECENT_MEMBERS.record(chat.id, user)
+    if await is_group_admin(chat.id, user.id) or await is_whitelisted(chat.id, user.id):
         return
 
-    settings = get_group_settings(chat.id)
+    settings = await get_group_settings(chat.id)
 
     # First, check for abuse words
-    if settings.get("delete_abuse", True) and profanity_filter is not None and profanity_filter.contains_profanity(message_text):
-        warn_limit, punishment = get_warn_settings(chat.id, "abuse")
-        count = get_warnings_sync(user.id, chat.id, "abuse") + 1
+    matches = await profanity_filter.classify_async(message_text) if settings.get("delete_abuse", True) and profanity_filter is not None else []
+    if matches:
+        warn_limit, punishment = await get_warn_settings(chat.id, "abuse")
+        count = await get_warnings(user.id, chat.id, "abuse") + 1
+        log_abuse_match(chat, user, matches)
+        matched_terms = list(dict.fromkeys(match.word for match in matches))
         
         if count >= warn_limit:
-            await handle_incident(client, chat.id, user, "Abusive word", message, "punished", category="abuse")
+            await handle_incident(client, chat.id, user, "Abusive word", message, "punished", category="abuse", matched_terms=matched_terms)
         else:
-            await handle_incident(client, chat.id, user, "Abusive word", message, "warn", category="abuse")
+            await handle_incident(client, chat.id, user, "Abusive word", message, "warn", category="abuse", matched_terms=matched_terms)
         return
 
     # Check for links/usernames
-    if settings.get("delete_links_usernames", True) and URL_PATTERN.search(message_text):
+    blocked_link = await find_blocked_link(chat, message, settings.get("delete_links_usernames", True))
+    if blocked_link:
+        logger.info(f"Blocked link/username {blocked_link} from {user.id} in {chat.id}.")
         await handle_incident(client, chat.id, user, "Link or Username in Message", message, "link_or_username")
         return
 
     # Check for biolink
     if settings.get("delete_biolink", True):
         try:
-            user_profile = await client.get_chat(user.id)
-            user_bio = user_profile.bio or ""
-            if URL_PATTERN.search(user_bio):
-                warn_limit, punishment = get_warn_settings(chat.id, "biolink")
-                count = get_warnings_sync(user.id, chat.id, "biolink") + 1
+            _, bio_has_link = await get_user_bio(user.id)
+            if bio_has_link:
+                warn_limit, punishment = await get_warn_settings(chat.id, "biolink")
+                count = await get_warnings(user.id, chat.id, "biolink") + 1
                 
                 if count >= warn_limit:
                     await handle_incident(client, chat.id, user, "bio-link", message, "punished", category="biolink")
@@ -1588,6 +2034,7 @@ async def handle_all_messages(client: Client, message: Message) -> None:
             
 # --- Handler for Edited Messages ---
 @client.on_edited_message(filters.text & filters.group & ~filters.via_bot)
+@PIPELINE.sharded
 async def handle_edited_messages(client: Client, edited_message: Message) -> None:
     if not edited_message or not edited_message.text or not edited_message.edit_date:
         return
@@ -1599,10 +2046,10 @@ async def handle_edited_messages(client: Client, edited_message: Message) -> Non
         return
 
     is_sender_admin = await is_group_admin(chat.id, user.id)
-    if is_sender_admin or is_whitelisted_sync(chat.id, user.id):
+    if is_sender_admin or await is_whitelisted(chat.id, user.id):
         return
     
-    settings = get_group_settings(chat.id)
+    settings = await get_group_settings(chat.id)
     if settings.get("delete_edited", True):
         # The edit_date check confirms it's an actual edit, not a forward or other message type that might trigger this.
         await handle_incident(client, chat.id, user, "Edited message deleted", edited_message, "edited_message_deleted")
@@ -1610,7 +2057,7 @@ async def handle_edited_messages(client: Client, edited_message: Message) -> Non
 # --- Global Callback functions ---
 async def command_freelist_callback(client, query):
     chat_id = query.message.chat.id
-    ids = get_whitelist_sync(chat_id)
+    ids = await get_whitelist(chat_id)
     if not ids:
         text = "<b>⚠️ No users are whitelisted in this group.</b>"
     else:
@@ -1627,51 +2074,15 @@ async def command_freelist_callback(client, query):
         [InlineKeyboardButton("⬅️ Back", callback_data="show_settings_main_menu")],
         [InlineKeyboardButton("🗑️ Close", callback_data="close")]
     ])
-    await query.message.edit_text(text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML, disable_web_page_preview=True)
+    await edit_text(query.message, text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML, disable_web_page_preview=True)
 
-async def broadcast_to_all(client: Client, message: Message):
-    if db is None:
+async def broadcast_to_all(client: Client, message: Message, status_message: Message):
+    """Starts a background broadcast job; progress is shown by editing `status_message`."""
+    await BROADCAST_MESSAGE.pop(message.from_user.id)
+    if broadcast_engine is None:
         return
-    
-    success_count = 0
-    fail_count = 0
-    
-    # Send to all users
-    try:
-        users = db.users.find({}, {"user_id": 1})
-        for user_doc in users:
-            try:
-                await message.copy(user_doc["user_id"])
-                success_count += 1
-                await asyncio.sleep(0.1) # Be gentle
-            except Exception as e:
-                logger.error(f"Failed to send broadcast to user {user_doc['user_id']}: {e}")
-                fail_count += 1
-    except Exception as e:
-        logger.error(f"Error fetching users for broadcast: {e}")
-
-    # Send to all groups
-    try:
-        groups = db.groups.find({}, {"chat_id": 1})
-        for group_doc in groups:
-            try:
-                await message.copy(group_doc["chat_id"])
-                success_count += 1
-                await asyncio.sleep(0.1) # Be gentle
-            except Exception as e:
-                logger.error(f"Failed to send broadcast to group {group_doc['chat_id']}: {e}")
-                fail_count += 1
-    except Exception as e:
-        logger.error(f"Error fetching groups for broadcast: {e}")
-
-    broadcast_report = (
-        f"<b>📢 Broadcast Complete!</b>\n\n"
-        f"✅ Sent to: {success_count} chats.\n"
-        f"❌ Failed to send to: {fail_count} chats."
-    )
-    await client.send_message(message.from_user.id, broadcast_report, parse_mode=enums.ParseMode.HTML)
-    logger.info(f"Broadcast finished. Success: {success_count}, Fail: {fail_count}")
-    BROADCAST_MESSAGE.pop(message.from_user.id, None)
+    job_id = await broadcast_engine.start(message, status_message)
+    logger.info(f"Broadcast {job_id} started by admin {message.from_user.id}.")
 
 
 # --- Callback Query Handlers ---
@@ -1690,23 +2101,24 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
     # Handle general callbacks without admin check
     if data == "close":
         try:
-            await query.message.delete()
+            await delete_message(query.message)
         except MessageNotModified:
             pass
         return
 
-    if data == "confirm_broadcast" and user_id in BROADCAST_MESSAGE:
-        broadcast_message = BROADCAST_MESSAGE[user_id]
-        if broadcast_message != "waiting_for_message":
-            await query.message.edit_text("📢 Broadcast shuru ho raha hai...", reply_markup=None)
-            await broadcast_to_all(client, broadcast_message)
+    if data == "confirm_broadcast" and await BROADCAST_MESSAGE.contains(user_id):
+        draft = await BROADCAST_MESSAGE.get(user_id)
+        if isinstance(draft, dict):
+            await edit_text(query.message, "📢 Broadcast shuru ho raha hai...", reply_markup=None)
+            broadcast_message = await client.get_messages(draft["chat_id"], draft["message_id"])
+            await broadcast_to_all(client, broadcast_message, query.message)
         else:
             await query.answer("Invalid broadcast state. Please try /broadcast again.", show_alert=True)
         return
 
-    if data == "cancel_broadcast" and user_id in BROADCAST_MESSAGE:
-        BROADCAST_MESSAGE.pop(user_id, None)
-        await query.message.edit_text("❌ Broadcast cancel kar diya gaya hai.")
+    if data == "cancel_broadcast" and await BROADCAST_MESSAGE.contains(user_id):
+        await BROADCAST_MESSAGE.pop(user_id)
+        await edit_text(query.message, "❌ Broadcast cancel kar diya gaya hai.")
         return
 
     if data == "help_menu":
@@ -1721,6 +2133,11 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
             "• <code>/free</code> – whitelist a user (reply or user/id)\n"
             "• <code>/unfree</code> – remove from whitelist\n"
             "• <code>/freelist</code> – list all whitelisted users\n\n"
+            "<b>Link Rules (Group Admins):</b>\n"
+            "• <code>/allowlink &lt;domain|@username&gt;</code> – is domain/username ko kabhi delete na karein\n"
+            "• <code>/denylink &lt;domain|@username&gt;</code> – is domain/username ko hamesha delete karein\n"
+            "• <code>/removelink &lt;domain|@username&gt;</code> – rule hatayein\n"
+            "• <code>/linkrules</code> – group ke saare link rules dekhein\n\n"
             "<b>General Moderation Commands:</b>\n"
             "• <code>/settings</code>: Bot ki settings kholen (Group Admins only).\n"
             "• <code>/stats</code>: Bot usage stats dekhein (sirf bot admins ke liye).\n"
@@ -1735,7 +2152,7 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
             "<b>Use the inline buttons on warnings to cancel or whitelist</b>"
         )
         keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="back_to_main_menu")], [InlineKeyboardButton("🗑️ Close", callback_data="close")]])
-        await query.message.edit_text(help_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await edit_text(query.message, help_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
         return
 
     if data == "other_bots":
@@ -1747,7 +2164,7 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
             "➡️ @askiangelbot"
         )
         keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="back_to_main_menu")], [InlineKeyboardButton("🗑️ Close", callback_data="close")]])
-        await query.message.edit_text(other_bots_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML, disable_web_page_preview=True)
+        await edit_text(query.message, other_bots_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML, disable_web_page_preview=True)
         return
         
     if data == "donate_info":
@@ -1758,11 +2175,11 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
             "<b>Thank you for your support!</b>"
         )
         keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data="back_to_main_menu")], [InlineKeyboardButton("🗑️ Close", callback_data="close")]])
-        await query.message.edit_text(donate_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
+        await edit_text(query.message, donate_text, reply_markup=keyboard, parse_mode=enums.ParseMode.HTML)
         return
 
     if data == "back_to_main_menu":
-        bot_info = await client.get_me()
+        bot_info = await get_bot_profile()
         bot_name = bot_info.first_name
         bot_username = bot_info.username
         add_to_group_url = f"https://t.me/{bot_username}?startgroup=true"
@@ -1781,7 +2198,7 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
 
-        await query.message.edit_text(
+        await edit_text(query.message, 
             text=welcome_message,
             reply_markup=reply_markup,
             parse_mode=enums.ParseMode.HTML,
@@ -1821,24 +2238,24 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
     if data.startswith("set_reminder_interval_"):
         try:
             interval_hours = int(data.split('_')[-1])
-            update_reminder_setting(chat_id, "interval_hours", interval_hours)
+            await update_reminder_setting(chat_id, "interval_hours", interval_hours)
             await show_interval_settings(client, query)
         except ValueError:
             await query.answer("Invalid interval selected.")
         return
     
     if data == "toggle_reminders":
-        settings = get_reminder_settings(chat_id)
+        settings = await get_reminder_settings(chat_id)
         current_status = settings.get("enabled", DEFAULT_REMINDER_ENABLED)
         new_status = not current_status
-        update_reminder_setting(chat_id, "enabled", new_status)
+        await update_reminder_setting(chat_id, "enabled", new_status)
         await show_scheduled_message_settings(client, query)
         return
     
     if data.startswith("set_notif_time_"):
         try:
             time_in_minutes = int(data.split('_')[-1])
-            update_notification_delete_time(chat_id, time_in_minutes)
+            await update_notification_delete_time(chat_id, time_in_minutes)
             await show_notification_delete_time_menu(client, query)
         except ValueError:
             await query.answer("Invalid time selected.")
@@ -1850,16 +2267,16 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
 
     if data.startswith("toggle_"):
         setting_key = data.split('toggle_', 1)[1]
-        settings = get_group_settings(chat_id)
+        settings = await get_group_settings(chat_id)
         current_status = settings.get(setting_key, True)
         new_status = not current_status
-        update_group_setting(chat_id, setting_key, new_status)
+        await update_group_setting(chat_id, setting_key, new_status)
         await show_on_off_settings(client, query)
         return
         
     if data.startswith("config_"):
         category = data.split('_')[1]
-        warn_limit, punishment = get_warn_settings(chat_id, category)
+        warn_limit, punishment = await get_warn_settings(chat_id, category)
         kb = InlineKeyboardMarkup([
             [InlineKeyboardButton(f"Set Warn Limit ({warn_limit})", callback_data=f"set_warn_limit_{category}")],
             [
@@ -1868,19 +2285,19 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
             ],
             [InlineKeyboardButton("⬅️ Back", callback_data="show_warn_punishment_settings")]
         ])
-        await query.message.edit_text(f"<b>⚙️ Configure {category.capitalize()} Warnings:</b>", reply_markup=kb, parse_mode=enums.ParseMode.HTML)
+        await edit_text(query.message, f"<b>⚙️ Configure {category.capitalize()} Warnings:</b>", reply_markup=kb, parse_mode=enums.ParseMode.HTML)
         return
 
     if data.startswith("set_warn_limit_"):
         category = data.split('_')[-1]
-        warn_limit, _ = get_warn_settings(chat_id, category)
+        warn_limit, _ = await get_warn_settings(chat_id, category)
         kb = InlineKeyboardMarkup([
             [InlineKeyboardButton(f"3 {'✅' if warn_limit == 3 else ''}", callback_data=f"set_limit_{category}_3"),
              InlineKeyboardButton(f"4 {'✅' if warn_limit == 4 else ''}", callback_data=f"set_limit_{category}_4"),
              InlineKeyboardButton(f"5 {'✅' if warn_limit == 5 else ''}", callback_data=f"set_limit_{category}_5")],
             [InlineKeyboardButton("⬅️ Back", callback_data=f"config_{category}")]
         ])
-        await query.message.edit_text(f"<b>{category.capitalize()} Warn Limit:</b>\n"
+        await edit_text(query.message, f"<b>{category.capitalize()} Warn Limit:</b>\n"
                                      f"Select the number of warnings before a user is punished.",
                                      reply_markup=kb, parse_mode=enums.ParseMode.HTML)
         return
@@ -1889,8 +2306,8 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
         parts = data.split('_')
         category = parts[2]
         limit = int(parts[3])
-        update_warn_settings(chat_id, category, limit=limit)
-        await query.message.edit_text(f"✅ {category.capitalize()} warning limit set to {limit}.",
+        await update_warn_settings(chat_id, category, limit=limit)
+        await edit_text(query.message, f"✅ {category.capitalize()} warning limit set to {limit}.",
                                      reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=f"config_{category}")]])
                                      , parse_mode=enums.ParseMode.HTML)
         return
@@ -1899,8 +2316,8 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
         parts = data.split('_')
         punishment = parts[2]
         category = parts[3]
-        update_warn_settings(chat_id, category, punishment=punishment)
-        await query.message.edit_text(f"✅ {category.capitalize()} punishment set to {punishment.capitalize()}.",
+        await update_warn_settings(chat_id, category, punishment=punishment)
+        await edit_text(query.message, f"✅ {category.capitalize()} punishment set to {punishment.capitalize()}.",
                                      reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Back", callback_data=f"config_{category}")]])
                                      , parse_mode=enums.ParseMode.HTML)
         return
@@ -1913,7 +2330,7 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
         user_id = query.from_user.id
         user = query.from_user
         
-        if chat_id in TIC_TAC_TOE_GAMES:
+        if await TIC_TAC_TOE_GAMES.contains(chat_id):
             await query.answer("Ek game pehle se hi chal raha hai.", show_alert=True)
             return
 
@@ -1921,7 +2338,7 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
             [InlineKeyboardButton(f"Join Game", callback_data=f"tictac_join_game_{user.id}")]
         ])
         
-        await query.message.edit_text(
+        await edit_text(query.message, 
             f"<b>Tic Tac Toe Game Start</b>\n\n"
             f"<a href='tg://user?id={user.id}'>{user.first_name}</a> ne ek Tic Tac Toe game shuru kiya hai!\n"
             f"Ek aur player ke join karne ka intezaar hai.",
@@ -1935,27 +2352,30 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
         target_id = int(parts[1])
         group_chat_id = int(parts[2])
         try:
-            await client.restrict_chat_member(group_chat_id, target_id, ChatPermissions(can_send_messages=True))
-            reset_warnings_sync(group_chat_id, target_id, "abuse")
-            reset_warnings_sync(group_chat_id, target_id, "biolink")
+            await DISPATCHER.call(
+                PRIORITY_MODERATION, group_chat_id, client.restrict_chat_member,
+                group_chat_id, target_id, ChatPermissions(can_send_messages=True)
+            )
+            await reset_warnings(group_chat_id, target_id, "abuse")
+            await reset_warnings(group_chat_id, target_id, "biolink")
             user_obj = await client.get_chat_member(group_chat_id, target_id)
             user_mention = f"<a href='tg://user?id={target_id}'>{user_obj.user.first_name}</a>"
             kb = InlineKeyboardMarkup([[InlineKeyboardButton("Whitelist ✅", callback_data=f"whitelist_{target_id}_{group_chat_id}"), InlineKeyboardButton("🗑️ Close", callback_data="close")]])
             try:
-                await query.message.edit_text(f"<b>✅ {user_mention} unmuted!</b>", reply_markup=kb, parse_mode=enums.ParseMode.HTML)
+                await edit_text(query.message, f"<b>✅ {user_mention} unmuted!</b>", reply_markup=kb, parse_mode=enums.ParseMode.HTML)
             except MessageNotModified:
                 pass
         except errors.ChatAdminRequired:
             try:
-                await query.message.edit_text("<b>I don't have permission to unmute users.</b>", parse_mode=enums.ParseMode.HTML)
+                await edit_text(query.message, "<b>I don't have permission to unmute users.</b>", parse_mode=enums.ParseMode.HTML)
             except MessageNotModified:
                 pass
         return
 
     if data.startswith("cancel_warn_"):
         target_id = int(data.split("_")[-1])
-        reset_warnings_sync(chat_id, target_id, "biolink")
-        reset_warnings_sync(chat_id, target_id, "abuse")
+        await reset_warnings(chat_id, target_id, "biolink")
+        await reset_warnings(chat_id, target_id, "abuse")
         user_obj = await client.get_chat_member(chat_id, target_id)
         full_name = f"{user_obj.user.first_name}{(' ' + user_obj.user.last_name) if user_obj.user.last_name else ''}"
         mention = f"<a href='tg://user?id={target_id}'>{full_name}</a>"
@@ -1964,16 +2384,16 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
              InlineKeyboardButton("🗑️ Close", callback_data="close")]
         ])
         try:
-            await query.message.edit_text(f"<b>✅ {mention} (`{target_id}`) has no more warnings!</b>", reply_markup=kb, parse_mode=enums.ParseMode.HTML)
+            await edit_text(query.message, f"<b>✅ {mention} (`{target_id}`) has no more warnings!</b>", reply_markup=kb, parse_mode=enums.ParseMode.HTML)
         except MessageNotModified:
             pass
         return
         
     if data.startswith("whitelist_"):
         target_id = int(data.split("_")[1])
-        add_whitelist_sync(chat_id, target_id)
-        reset_warnings_sync(chat_id, target_id, "biolink")
-        reset_warnings_sync(chat_id, target_id, "abuse")
+        await add_whitelist(chat_id, target_id)
+        await reset_warnings(chat_id, target_id, "biolink")
+        await reset_warnings(chat_id, target_id, "abuse")
         try:
             user = await client.get_chat_member(chat_id, target_id)
             full_name = f"{user.first_name}{(' ' + user.last_name) if user.last_name else ''}"
@@ -1985,14 +2405,14 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
              InlineKeyboardButton("🗑️ Close", callback_data="close")]
         ])
         try:
-            await query.message.edit_text(f"<b>✅ {mention} has been whitelisted!</b>", reply_markup=kb, parse_mode=enums.ParseMode.HTML)
+            await edit_text(query.message, f"<b>✅ {mention} has been whitelisted!</b>", reply_markup=kb, parse_mode=enums.ParseMode.HTML)
         except MessageNotModified:
             pass
         return
 
     if data.startswith("unwhitelist_"):
         target_id = int(data.split("_")[1])
-        remove_whitelist_sync(chat_id, target_id)
+        await remove_whitelist(chat_id, target_id)
         try:
             user = await client.get_chat_member(chat_id, target_id)
             full_name = f"{user.first_name}{(' ' + user.last_name) if user.last_name else ''}"
@@ -2004,7 +2424,7 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
              InlineKeyboardButton("🗑️ Close", callback_data="close")]
         ])
         try:
-            await query.message.edit_text(f"<b>❌ {mention} has been removed from whitelist.</b>", reply_markup=kb, parse_mode=enums.ParseMode.HTML)
+            await edit_text(query.message, f"<b>❌ {mention} has been removed from whitelist.</b>", reply_markup=kb, parse_mode=enums.ParseMode.HTML)
         except MessageNotModified:
             pass
         return
@@ -2012,16 +2432,16 @@ async def callback_handler(client: Client, query: CallbackQuery) -> None:
 @client.on_message(filters.command("checkperms") & filters.group)
 async def check_permissions(client: Client, message: Message):
     chat = message.chat
-    bot_id = client.me.id
+    bot_id = (await get_bot_profile()).id
     
     if not await is_group_admin(chat.id, message.from_user.id):
-        await message.reply_text("Aap group admin nahi hain, isliye aap yeh command ka upyog nahi kar sakte.")
+        await reply_text(message, "Aap group admin nahi hain, isliye aap yeh command ka upyog nahi kar sakte.")
         return
 
     try:
         bot_member = await client.get_chat_member(chat.id, bot_id)
         if bot_member.status != enums.ChatMemberStatus.ADMINISTRATOR:
-            await message.reply_text("Bot is not an admin in this group. Please make the bot an admin.")
+            await reply_text(message, "Bot is not an admin in this group. Please make the bot an admin.")
             return
 
         perms = bot_member.privileges
@@ -2033,36 +2453,57 @@ async def check_permissions(client: Client, message: Message):
             f"<b>Can Post Messages:</b> {'✅ Yes' if perms.can_post_messages else '❌ No'}\n"
         )
 
-        await message.reply_text(message_text, parse_mode=enums.ParseMode.HTML)
+        await reply_text(message, message_text, parse_mode=enums.ParseMode.HTML)
         logger.info(f"Admin {message.from_user.id} requested permissions check in chat {chat.id}.")
     except Exception as e:
         logger.error(f"Anumatiyan jaanchte samay ek error hui: {e}")
-        await message.reply_text(f"Anumatiyan jaanchte samay ek error hui: {e}")
+        await reply_text(message, f"Anumatiyan jaanchte samay ek error hui: {e}")
 
 
-# --- Flask App for Health Check ---
-@app.route('/')
-def health_check():
-    """Simple health check endpoint for Koyeb."""
-    return jsonify({"status": "healthy", "bot_running": True, "mongodb_connected": db is not None}), 200
+# --- Health Check & Metrics ---
+@client.on_raw_update(group=-1)
+async def record_update(client: Client, update, users, chats) -> None:
+    """Runs before every other handler; only notes that an update arrived."""
+    HEALTH.record_update()
 
-def run_flask_app():
-    """Runs the Flask application."""
-    port = int(os.environ.get("PORT", 8000))
-    app.run(host="0.0.0.0", port=port)
+HEALTH.add_gauge("outbound_queue_depth", "Outbound Telegram calls waiting in the dispatcher.", DISPATCHER.pending)
+HEALTH.add_gauge("log_queue_depth", "Log channel events waiting to be sent.", LOG_SINK.pending)
+HEALTH.add_gauge("scheduled_deletions", "Messages waiting for their timed deletion.", DELETION_SCHEDULER.pending)
+HEALTH.add_gauge("shard_queue_depth", "Group updates waiting in each chat shard.", PIPELINE.queue_depths, label="shard")
+HEALTH.add_gauge("shard_dropped_updates", "Group updates dropped by each chat shard under load.", PIPELINE.dropped, label="shard")
 
 # --- Entry Point ---
 if __name__ == "__main__":
-    init_mongodb()
+    # Long messages are scanned for abuse in worker processes, started from a fork
+    # server (see ScanPool) before the MongoDB client or any thread exists
+    profanity_filter = ProfanityFilter(mongo_uri=MONGO_DB_URI)
+    profanity_filter.start_scan_pool()
+    client.loop.run_until_complete(init_mongodb())
 
-    flask_thread = threading.Thread(target=run_flask_app)
-    flask_thread.daemon = True
-    flask_thread.start()
+    # Health check for Koyeb, served on the bot's own event loop
+    client.loop.run_until_complete(start_health_server(HEALTH, "0.0.0.0", int(os.environ.get("PORT", 8000))))
+    client.loop.create_task(HEALTH.run_probes(db))
 
     logger.info("Bot is starting...")
     
-    # --- New line added to start the reminder scheduler ---
-    client.loop.create_task(reminder_scheduler(client, db))
+    client.loop.create_task(init_profanity_filter())
+    if STATE_BACKEND == "mongo" and db is not None:
+        client.loop.create_task(refresh_shared_indexes())
+    client.loop.create_task(DELETION_SCHEDULER.run())
+    client.loop.create_task(LOG_SINK.run())
+    try:
+        client.loop.add_signal_handler(signal.SIGHUP, lambda: client.loop.create_task(refresh_bot_profile()))
+    except (NotImplementedError, AttributeError):
+        logger.warning("SIGHUP is not available on this platform; the bot profile can't be refreshed at runtime.")
+
+    # Reminders, broadcasts and the stale group sweep run on one instance only (the lease holder)
+    leader_jobs = [
+        lambda: reminder_scheduler(client, db, DISPATCHER, RECENT_MEMBERS),
+        lambda: periodic_group_sweeper(client, db, DISPATCHER, STALE_GROUP_SWEEP_HOURS, on_removed=forget_removed_groups),
+    ]
+    if broadcast_engine is not None:
+        leader_jobs.append(broadcast_engine.run)
+    client.loop.create_task(leader_lease.run(leader_jobs))
 
     client.run()
     logger.info("Bot stopped")
@@ -0,0 +1,87 @@
+import random
+import time
+from collections import OrderedDict
+
+from pyrogram import Client, enums
+
+from cache import TTLCache
+
+# Most recently active users remembered per chat
+RECENT_USERS_PER_CHAT = 200
+# Chats whose recent activity is kept in memory
+RECENT_MAX_CHATS = 20000
+# Activity older than this no longer counts as recent
+RECENT_WINDOW_SECONDS = 24 * 3600
+# Members read from the API when a chat has too little recent activity (one page)
+FALLBACK_SCAN_LIMIT = 200
+
+
+class RecentMembers:
+    """Rolling set of recently active users per chat, fed by incoming messages.
+
+    Each chat keeps its RECENT_USERS_PER_CHAT most recent senders as
+    user_id -> (first_name, last seen, username), so picking people to tag in a
+    reminder costs no API calls however large the group is, and an @mention can
+    be recognised as one of the chat's own members.
+    """
+
+    def __init__(self):
+        self._chats = TTLCache(max_size=RECENT_MAX_CHATS, ttl=RECENT_WINDOW_SECONDS)
+
+    def record(self, chat_id: int, user):
+        if user.is_bot:
+            return
+        users = self._chats.get(chat_id)
+        if users is None:
+            users = OrderedDict()
+        users[user.id] = (user.first_name, time.monotonic(), (user.username or "").lower())
+        users.move_to_end(user.id)
+        while len(users) > RECENT_USERS_PER_CHAT:
+            users.popitem(last=False)
+        # Re-set on every message so a chat's entry expires only after a quiet window
+        self._chats.set(chat_id, users)
+
+    def sample(self, chat_id: int, k: int) -> list:
+        """Returns up to `k` random (user_id, first_name) pairs active within the window."""
+        users = self._chats.get(chat_id)
+        if not users:
+            return []
+        cutoff = time.monotonic() - RECENT_WINDOW_SECONDS
+        active = [(user_id, first_name) for user_id, (first_name, seen, _) in users.items() if seen >= cutoff]
+        return random.sample(active, min(k, len(active)))
+
+    def has_username(self, chat_id: int, username: str) -> bool:
+        """True if `username` (lowercase, without "@") belongs to a recently active member."""
+        users = self._chats.get(chat_id)
+        return bool(users) and any(name == username for _, _, name in users.values())
+
+    def forget(self, chat_id: int):
+        self._chats.pop(chat_id)
+
+
+async def sample_members(client: Client, chat_id: int, k: int, recent_members: RecentMembers = None) -> list:
+    """Picks up to `k` random non-bot members of a chat as (user_id, first_name) pairs.
+
+    Recently active users are preferred. If there are fewer than `k` of them, the
+    rest come from reservoir sampling over one page of the chat's recent members,
+    so the cost is at most one API call regardless of member count.
+    """
+    picked = recent_members.sample(chat_id, k) if recent_members is not None else []
+    if len(picked) >= k:
+        return picked
+
+    seen_ids = {user_id for user_id, _ in picked}
+    reservoir = []
+    count = 0
+    async for member in client.get_chat_members(chat_id, limit=FALLBACK_SCAN_LIMIT, filter=enums.ChatMembersFilter.RECENT):
+        user = member.user
+        if user.is_bot or user.id in seen_ids:
+            continue
+        count += 1
+        if len(reservoir) < k - len(picked):
+            reservoir.append((user.id, user.first_name))
+        else:
+            j = random.randrange(count)
+            if j < len(reservoir):
+                reservoir[j] = (user.id, user.first_name)
+    return picked + reservoir
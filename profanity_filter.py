@@ -1,26 +1,787 @@
+import os
 import re
+import pickle
+import hashlib
 import logging
 import asyncio
+import time
+import unicodedata
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from bisect import bisect_left, bisect_right
+from collections import deque, namedtuple
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure, OperationFailure
 
 logger = logging.getLogger(__name__)
 
+# --- Persisted index ---
+# Bump this whenever the normalization rules or the matcher layout change, so stale
+# artifacts on disk are rebuilt instead of loaded.
+INDEX_FORMAT_VERSION = 5
+DEFAULT_INDEX_PATH = os.getenv("PROFANITY_INDEX_PATH", "profanity_index.pickle")
+# Changes arriving within this many seconds share one write of the index
+INDEX_SAVE_DELAY = 5
+# Used when the MongoDB deployment does not support change streams (standalone server)
+BAD_WORDS_POLL_INTERVAL = int(os.getenv("BAD_WORDS_POLL_INTERVAL", 60))
+
+# --- Offloading scans to worker processes ---
+SCAN_WORKERS = int(os.getenv("PROFANITY_SCAN_WORKERS", min(2, os.cpu_count() or 1))) # 0 scans everything inline
+# Texts at least this long are scanned in a worker instead of on the event loop
+OFFLOAD_MIN_CHARS = int(os.getenv("PROFANITY_OFFLOAD_MIN_CHARS", 1000))
+# Characters scanned inline per second before the rest of a burst goes to the workers
+INLINE_CHARS_PER_SECOND = 50000
+# Vocabulary additions sent along with each task before the workers are restarted from a fresh copy
+MAX_PENDING_DELTAS = 50
+
+# Category of words that don't come from the built-in list (added with /addabuse or in MongoDB)
+CUSTOM_CATEGORY = "custom"
+# One bad word found by classify_many; start/end index the original text
+ProfanityMatch = namedtuple("ProfanityMatch", ["start", "end", "word", "category"])
+
+# A single-token bad word matches `\b<word>\b` exactly when it equals one of these runs
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# --- Normalization pipeline ---
+# Look-alike letters that NFKC leaves alone: Cyrillic/Greek homoglyphs and the small caps
+# used by "fancy font" generators (reminder_scheduler.py sends these itself).
+CONFUSABLES = str.maketrans({
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'һ': 'h', 'н': 'h', 'і': 'i', 'ї': 'i', 'ј': 'j',
+    'к': 'k', 'м': 'm', 'о': 'o', 'р': 'p', 'с': 'c', 'ѕ': 's', 'т': 't', 'у': 'y', 'х': 'x',
+    'ԁ': 'd', 'α': 'a', 'β': 'b', 'ε': 'e', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p',
+    'τ': 't', 'υ': 'u', 'χ': 'x',
+    'ᴀ': 'a', 'ʙ': 'b', 'ᴄ': 'c', 'ᴅ': 'd', 'ᴇ': 'e', 'ꜰ': 'f', 'ɢ': 'g', 'ʜ': 'h', 'ɪ': 'i',
+    'ᴊ': 'j', 'ᴋ': 'k', 'ʟ': 'l', 'ᴍ': 'm', 'ɴ': 'n', 'ᴏ': 'o', 'ᴘ': 'p', 'ʀ': 'r', 'ꜱ': 's',
+    'ᴛ': 't', 'ᴜ': 'u', 'ᴠ': 'v', 'ᴡ': 'w', 'ʏ': 'y', 'ᴢ': 'z',
+})
+# '1' also stands for 'l'; tokens that contain one are looked up again with fold_i_and_l
+LEET_FOLD = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's', '!': 'i',
+})
+# How the old word list spelled an entry in leet. Masked patterns ("bi*ch") are stored
+# as written and in this spelling ("b1*ch"), and are never matched leet-folded, so a
+# rating like "4**" is not read as "a**".
+MASK_LEET = str.maketrans("aeiostl", "@310$71")
+# Characters people put between letters to dodge the filter (f_u_c_k, f.u.c.k, f-u-c-k)
+SEPARATORS = "_.-'`~"
+STRIP_SEPARATORS = str.maketrans('', '', SEPARATORS)
+# A run of word characters plus leet symbols and separators, e.g. "m@d4rch0d" or "f.u.c.k"
+OBFUSCATED_TOKEN_PATTERN = re.compile(r"[\w@$!.\-'`~]+")
+# Three or more of the same character collapse to one ("fuuuuck" -> "fuck"); doubles are
+# kept so that words like "ass" do not fold into innocent ones like "as".
+REPEAT_PATTERN = re.compile(r'(.)\1{2,}')
+# Vocabulary entries built only from these characters are stored in canonical form
+CANONICAL_WORD_PATTERN = re.compile(r"[\w@$!.\-'`~ ]+")
+# Characters the old word list put between the words of a phrase. Canonical phrases
+# don't need them (they split tokens), but masked ones like "( . Y . )" are stored
+# once per separator.
+PHRASE_SEPARATORS = ("", "_", "-", ".", "*", "0", "o", "@", "#", "$", "%", "&", "+", "=", "!", "?", "~",
+                     "`", "|", "\\", "/", ":", ";", "<", ">", '"', "'", "(", ")", "[", "]", "{", "}")
+
+
+def normalize_text(text: str) -> str:
+    """Applies NFKC, lowercasing and the confusables table."""
+    if not text.isascii():
+        text = unicodedata.normalize('NFKC', text)
+    return text.lower().translate(CONFUSABLES)
+
+
+@lru_cache(maxsize=65536)
+def canonicalize_token(token: str) -> str:
+    """Folds one normalized token: leet fold, separator strip, repeat collapse.
+
+    Leet folding is only applied to tokens that contain a letter, '@' or '$', so plain
+    numbers like "455" are never read as words.
+    """
+    token = token.strip(SEPARATORS + '!')
+    if any(char.isalpha() or char in '@$' for char in token):
+        token = token.translate(LEET_FOLD)
+    return REPEAT_PATTERN.sub(r'\1', token.translate(STRIP_SEPARATORS))
+
+
+def is_disguised(token: str) -> bool:
+    """True if canonicalize_token changes a normalized token beyond its edge punctuation
+    (leet, separators or repeats), so "sh00t" and "c_nt" are disguised but "shoot" isn't."""
+    return canonicalize_token(token) != token.strip(SEPARATORS + '!')
+
+
+def fold_i_and_l(token: str) -> str:
+    """Makes 'i' and 'l' one letter, so a canonical token read with '1' -> 'i' also matches words with an 'l'."""
+    return REPEAT_PATTERN.sub(r'\1', token.replace('l', 'i'))
+
+
+def _phrase_token(token: str) -> str:
+    # Next to other words a number is leet too ("g0 70 hell"); on its own it is left alone
+    return token.translate(LEET_FOLD) if token.isdigit() else token
+
+
+def _token_sequence(runs, transform):
+    """Joins token runs into the text phrases are matched against, one run per line.
+
+    Runs hold (token, start, end, ...) tuples. Returns the text and, for every token,
+    (start, end) of `transform(token)` in it followed by the token's own start and end.
+    """
+    lines, positions = [], []
+    offset = 0
+    for tokens in runs:
+        words = []
+        for token, start, end, *_ in tokens:
+            word = transform(token)
+            positions.append((offset, offset + len(word), start, end))
+            words.append(word)
+            offset += len(word) + 1
+        if not tokens:
+            offset += 1
+        lines.append(" ".join(words))
+    return "\n".join(lines), positions
+
+
+def normalize_with_sources(text: str):
+    """normalize_text plus, for each normalized character, the index of the character it came from.
+
+    The source list is None when normalization kept every position (always the case
+    for ASCII). If normalizing character by character doesn't reproduce the
+    whole-text result (rare combining sequences), positions are approximate.
+    """
+    normalized = normalize_text(text)
+    if text.isascii():
+        return normalized, None
+    pieces = [normalize_text(char) for char in text]
+    if all(len(piece) == 1 for piece in pieces) and len(normalized) == len(text):
+        return normalized, None
+    sources = [index for index, piece in enumerate(pieces) for _ in piece]
+    if len(sources) != len(normalized):
+        sources = [min(index, len(text) - 1) for index in range(len(normalized))]
+    return normalized, sources
+
+
+def _original_span(sources, start: int, end: int):
+    """Maps a [start, end) span of normalized text back to the original (see normalize_with_sources)."""
+    if sources is None:
+        return start, end
+    return sources[start], sources[end - 1] + 1
+
+
+def vocabulary_key(words) -> str:
+    """Stable hash of a word set, used to key the persisted index."""
+    digest = hashlib.sha256(f"v{INDEX_FORMAT_VERSION}\n".encode())
+    for word in sorted(words):
+        digest.update(word.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _is_word_char(char: str) -> bool:
+    """Same character class as the regex `\\w` used by the old per-word search."""
+    return char.isalnum() or char == '_'
+
+
+class AhoCorasickMatcher:
+    """Multi-pattern matcher that finds every bad word in a single pass over the text.
+
+    Words are kept in a trie; failure links are (re)computed lazily, so adding a word
+    only extends the trie and the links are refreshed on the next search.
+    """
+
+    def __init__(self, words=()):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self._terminal = {}
+        self._dirty = False
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> bool:
+        """Inserts a word into the trie. Returns False if it was already present."""
+        if not word:
+            return False
+        node = 0
+        for char in word:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            node = next_node
+        if node in self._terminal:
+            return False
+        self._terminal[node] = word
+        self._dirty = True
+        return True
+
+    def compile(self):
+        """Builds the failure links now instead of on the next search."""
+        if self._dirty:
+            self._build()
+
+    def copy(self):
+        """Returns a compiled copy that later `add` calls on this matcher don't touch."""
+        self.compile()
+        clone = AhoCorasickMatcher()
+        clone._goto = [dict(node) for node in self._goto]
+        clone._fail = list(self._fail)
+        clone._output = list(self._output)
+        clone._terminal = dict(self._terminal)
+        return clone
+
+    def _build(self):
+        """Computes failure links and merged outputs breadth-first."""
+        goto, fail, terminal = self._goto, self._fail, self._terminal
+        output = [()] * len(goto)
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            output[child] = (terminal[child],) if child in terminal else ()
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail_target = goto[state].get(char, 0)
+                fail[child] = fail_target if fail_target != child else 0
+                own = (terminal[child],) if child in terminal else ()
+                output[child] = own + output[fail[child]]
+                queue.append(child)
+
+        self._output = output
+        self._dirty = False
+
+    def iter_matches(self, text: str):
+        """Yields (start, end, word) for every occurrence of a known word in the text."""
+        if self._dirty:
+            self._build()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for word in output[state]:
+                yield index - len(word) + 1, index + 1, word
+
+    def iter_whole_word_matches(self, text: str):
+        """Yields (start, end, word) for matches that don't continue a word on either side.
+
+        An edge of the word that is a word character must not touch another one, as
+        with the old `\\b` regex. An edge like "(" or "*" needs no boundary; the old
+        regex required a word character there, so "(.)(.)" never matched on its own.
+        """
+        length = len(text)
+        for start, end, word in self.iter_matches(text):
+            if start > 0 and _is_word_char(text[start]) and _is_word_char(text[start - 1]):
+                continue
+            if end < length and _is_word_char(text[end - 1]) and _is_word_char(text[end]):
+                continue
+            yield start, end, word
+
+    def search_whole_word(self, text: str):
+        """Returns the first word found on whole-word boundaries, or None."""
+        return next(self.iter_whole_word_matches(text), (None, None, None))[2]
+
+    def __len__(self):
+        return len(self._terminal)
+
+
+class ProfanityIndex:
+    """The compiled vocabulary: exact canonical tokens plus the phrase and residue automata.
+
+    Picklable, so the same object is written to disk and handed to the scan workers.
+    `disguised_words` holds the canonical forms of entries that were written disguised
+    ("sh00t", "c_nt"); they only match message tokens that were disguised too, since
+    their plain spelling is often an ordinary word ("shoot", "cnt"). `categories` maps
+    each entry to the category of the word it came from, and `folded_entries` maps the
+    i/l-folded form of every token and phrase, and the leet spelling of every residue
+    pattern, back to its entry.
+    """
+
+    def __init__(self, words=(), categories=None):
+        self.token_words = frozenset()
+        self.disguised_words = frozenset()
+        self.phrase_matcher = AhoCorasickMatcher()
+        self.folded_phrase_matcher = AhoCorasickMatcher()
+        self.residue_matcher = AhoCorasickMatcher()
+        self.categories = {}
+        self.folded_entries = {}
+        self.add_words(words, categories)
+
+    def add_words(self, words, categories=None):
+        """Stores words in canonical form.
+
+        Single words go into the exact-token set. Phrases go into the phrase matcher
+        (canonical tokens joined by single spaces) and their joined-up forms into the
+        token set: "randi_ka", "randi-ka" and "randika" all become "randika", and
+        "randi0ka" and "randioka" become "randioka". A disguised single word goes into
+        the disguised set instead. Masked patterns such as "f*ck" or "8==D", and phrases
+        with a disguised word, are matched as written (and in the old leet spelling, so
+        "b1*ch" still hits "bi*ch") by the residue automaton.
+        """
+        new_tokens = set()
+        new_disguised = set()
+        for original in words:
+            category = (categories or {}).get(original, CUSTOM_CATEGORY)
+            word = normalize_text(original).strip()
+            if not word:
+                continue
+            if CANONICAL_WORD_PATTERN.fullmatch(word):
+                parts = [canonicalize_token(part) for part in word.split()]
+                if len(parts) == 1 and TOKEN_PATTERN.fullmatch(parts[0]) and is_disguised(word):
+                    new_disguised.add(parts[0])
+                    self._add_entry(parts[0], fold_i_and_l(parts[0]), original, category)
+                    continue
+                if all(TOKEN_PATTERN.fullmatch(part) for part in parts) and not any(map(is_disguised, word.split())):
+                    tokens = ["".join(parts)]
+                    if len(parts) > 1:
+                        phrase = " ".join(parts)
+                        self.phrase_matcher.add(phrase)
+                        self.folded_phrase_matcher.add(fold_i_and_l(phrase))
+                        self._add_entry(phrase, fold_i_and_l(phrase), original, category)
+                        tokens.append("o".join(parts))
+                    for token in tokens:
+                        new_tokens.add(token)
+                        self._add_entry(token, fold_i_and_l(token), original, category)
+                    continue
+            variants = [word.replace(" ", separator) for separator in PHRASE_SEPARATORS] if " " in word else []
+            for variant in [word] + variants:
+                for pattern in (variant, variant.translate(MASK_LEET)):
+                    self.residue_matcher.add(pattern)
+                    self.folded_entries.setdefault(pattern, word)
+            self._categorize(word, original, category)
+        if new_tokens:
+            self.token_words = self.token_words.union(new_tokens)
+        if new_disguised:
+            self.disguised_words = self.disguised_words.union(new_disguised)
+
+    def _add_entry(self, entry: str, folded: str, original: str, category: str):
+        self._categorize(entry, original, category)
+        self.folded_entries.setdefault(folded, entry)
+
+    def _categorize(self, entry: str, original: str, category: str):
+        # A word already in canonical form decides its entry's category over its variants
+        if original == entry or entry not in self.categories:
+            self.categories[entry] = category
+
+    def compile(self):
+        self.phrase_matcher.compile()
+        self.folded_phrase_matcher.compile()
+        self.residue_matcher.compile()
+
+    def copy(self):
+        """Returns a compiled copy that later `add_words` calls on this index don't touch."""
+        clone = ProfanityIndex()
+        clone.token_words = self.token_words
+        clone.disguised_words = self.disguised_words
+        clone.phrase_matcher = self.phrase_matcher.copy()
+        clone.folded_phrase_matcher = self.folded_phrase_matcher.copy()
+        clone.residue_matcher = self.residue_matcher.copy()
+        clone.categories = dict(self.categories)
+        clone.folded_entries = dict(self.folded_entries)
+        return clone
+
+    @staticmethod
+    def _message_tokens(text: str):
+        """Returns the canonical tokens of a normalized message as four lists.
+
+        The first list holds the plain word runs, the second the wider obfuscated runs,
+        so "half-ass" yields ["half", "ass"] and ["halfass"]. The third holds the
+        i/l-folded form of the tokens of either run that were written with a '1', and
+        the fourth the tokens of either run that were disguised (see is_disguised).
+        """
+        runs = ([], [])
+        folded = []
+        disguised = []
+        for tokens, pattern in zip(runs, (TOKEN_PATTERN, OBFUSCATED_TOKEN_PATTERN)):
+            for raw in pattern.findall(text):
+                token = canonicalize_token(raw)
+                if token:
+                    tokens.append(token)
+                    if token != raw.strip(SEPARATORS + '!'):
+                        disguised.append(token)
+                    if "1" in raw:
+                        folded.append(fold_i_and_l(token))
+        return runs[0], runs[1], folded, disguised
+
+    def contains(self, text: str) -> bool:
+        if not text:
+            return False
+        text = normalize_text(text)
+        plain, obfuscated, folded, disguised = self._message_tokens(text)
+        # Fast path: O(1) set lookups for every canonical token of the message
+        if not self.token_words.isdisjoint(plain) or not self.token_words.isdisjoint(obfuscated):
+            return True
+        if disguised and not self.disguised_words.isdisjoint(disguised):
+            return True
+        # A '1' may have been an 'l' ("1und", "bu11$h17")
+        if folded and not self.folded_entries.keys().isdisjoint(folded):
+            return True
+        # Phrases are matched over each canonical token sequence (kept on separate lines)
+        if len(self.phrase_matcher):
+            sequence = " ".join(map(_phrase_token, plain)) + "\n" + " ".join(map(_phrase_token, obfuscated))
+            if self.phrase_matcher.search_whole_word(sequence) is not None:
+                return True
+            if folded and self.folded_phrase_matcher.search_whole_word(fold_i_and_l(sequence)) is not None:
+                return True
+        # Fallback: masked patterns matched as written
+        return self.residue_matcher.search_whole_word(text) is not None
+
+    def classify_many(self, texts) -> list:
+        """Returns, for each text, the list of ProfanityMatch found in it (empty if clean).
+
+        Finds exactly what `contains` would, but reports every match. Texts are
+        tokenized one by one; the phrase and residue automata then make a single pass
+        each over the whole batch, joined with newlines (no pattern contains one).
+        """
+        results = [{} for _ in texts]
+        phrase_parts, phrase_bases, phrase_tokens = [], [], []
+        folded_parts, folded_bases, folded_tokens = [], [], []
+        residue_parts, residue_bases, residue_sources = [], [], []
+        phrase_length = folded_length = residue_length = 0
+
+        for position, text in enumerate(texts):
+            normalized, sources = normalize_with_sources(text or "")
+            # (canonical token, original start, original end, written with a '1', disguised) for both token runs
+            runs = []
+            for pattern in (TOKEN_PATTERN, OBFUSCATED_TOKEN_PATTERN):
+                tokens = []
+                for match in pattern.finditer(normalized):
+                    raw = match.group()
+                    token = canonicalize_token(raw)
+                    if token:
+                        tokens.append((token, *_original_span(sources, *match.span()), "1" in raw, token != raw.strip(SEPARATORS + '!')))
+                runs.append(tokens)
+
+            found = results[position]
+            has_one = False
+            for token, start, end, with_one, disguised in runs[0] + runs[1]:
+                if token in self.token_words or (disguised and token in self.disguised_words):
+                    found[(start, end, token)] = None
+                elif with_one and fold_i_and_l(token) in self.folded_entries:
+                    found[(start, end, self.folded_entries[fold_i_and_l(token)])] = None
+                has_one = has_one or with_one
+
+            # Same sequences as in `contains`, remembering where each token sits in them
+            sequence, positions = _token_sequence(runs, _phrase_token)
+            phrase_parts.append(sequence)
+            phrase_bases.append(phrase_length)
+            phrase_tokens.append(positions)
+            phrase_length += len(sequence) + 1
+            sequence, positions = _token_sequence(runs, lambda token: fold_i_and_l(_phrase_token(token))) if has_one else ("", [])
+            folded_parts.append(sequence)
+            folded_bases.append(folded_length)
+            folded_tokens.append(positions)
+            folded_length += len(sequence) + 1
+
+            residue_parts.append(normalized)
+            residue_bases.append(residue_length)
+            residue_sources.append(sources)
+            residue_length += len(normalized) + 1
+
+        if len(self.phrase_matcher):
+            for matcher, parts, bases, token_positions, folded in (
+                (self.phrase_matcher, phrase_parts, phrase_bases, phrase_tokens, False),
+                (self.folded_phrase_matcher, folded_parts, folded_bases, folded_tokens, True),
+            ):
+                for start, end, phrase in matcher.iter_whole_word_matches("\n".join(parts)):
+                    position = bisect_right(bases, start) - 1
+                    tokens = token_positions[position]
+                    starts = [token[0] for token in tokens]
+                    ends = [token[1] for token in tokens]
+                    first = tokens[bisect_right(starts, start - bases[position]) - 1]
+                    last = tokens[bisect_left(ends, end - bases[position])]
+                    results[position][(first[2], last[3], self.folded_entries[phrase] if folded else phrase)] = None
+
+        if len(self.residue_matcher):
+            for start, end, word in self.residue_matcher.iter_whole_word_matches("\n".join(residue_parts)):
+                position = bisect_right(residue_bases, start) - 1
+                base = residue_bases[position]
+                span = _original_span(residue_sources[position], start - base, end - base)
+                results[position][(*span, self.folded_entries.get(word, word))] = None
+
+        return [
+            [ProfanityMatch(start, end, word, self.categories.get(word, CUSTOM_CATEGORY)) for start, end, word in sorted(found)]
+            for found in results
+        ]
+
+
+# --- Scan worker process state ---
+_worker_index = None
+_worker_version = 0
+
+
+def _init_scan_worker(index: ProfanityIndex, version: int):
+    global _worker_index, _worker_version
+    _worker_index = index
+    _worker_version = version
+
+
+def _apply_worker_deltas(deltas):
+    """Adds the vocabulary deltas this worker hasn't seen yet to its index."""
+    global _worker_version
+    for version, words in deltas:
+        if version > _worker_version:
+            _worker_index.add_words(words)
+            _worker_version = version
+
+
+def _scan_in_worker(text: str, deltas: list) -> bool:
+    _apply_worker_deltas(deltas)
+    return _worker_index.contains(text)
+
+
+def _classify_in_worker(text: str, deltas: list) -> list:
+    _apply_worker_deltas(deltas)
+    return _worker_index.classify_many([text])[0]
+
+
+class ScanPool:
+    """Pre-warmed worker processes that scan long messages off the event loop.
+
+    Workers come from a "forkserver" process, never from the bot's own process, so
+    they don't inherit the threads and locks of the MongoDB client or the Telegram
+    client. Each worker receives a pickled copy of the compiled index once, when it
+    starts, so nothing large is pickled per task. Words added afterwards are
+    versioned deltas sent along with each task; a worker applies the ones newer than
+    its own version. After a word is removed, or once MAX_PENDING_DELTAS have piled
+    up, a fresh set of workers is started from a copy of the current index in a
+    thread while the old set keeps serving, then swapped in. Where "forkserver" is
+    unavailable the filter just scans inline.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = None
+        self._version = 0
+        self._deltas = []
+        self._restart_task = None
+        self._restart_index = None
+        self._window_start = 0.0
+        self._window_chars = 0
+
+    @staticmethod
+    def available() -> bool:
+        return "forkserver" in multiprocessing.get_all_start_methods()
+
+    def _launch(self, index: ProfanityIndex, version: int):
+        """Starts workers holding `index` at `version` and waits until all of them are up. Blocks."""
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_scan_worker,
+            initargs=(index, version)
+        )
+        try:
+            # Workers are started (and sent the index) on submit; wait for all of them
+            # here so the first long message doesn't pay for the startup
+            for future in [executor.submit(_scan_in_worker, "", ()) for _ in range(self.workers)]:
+                future.result()
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        return executor
+
+    def start(self, index: ProfanityIndex):
+        """Starts the first workers and waits until they are up; use `restart` once the loop runs."""
+        self._executor = self._launch(index.copy(), self._version)
+
+    def restart(self, index: ProfanityIndex):
+        """Replaces the workers with ones started from `index`, without blocking the loop.
+
+        Requests made while a restart is running are merged into one more restart from
+        the latest index once it finishes.
+        """
+        if self._executor is None:
+            return
+        self._restart_index = index
+        if self._restart_task is None:
+            self._restart_task = asyncio.ensure_future(self._restart())
+
+    async def _restart(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._restart_index is not None:
+                index, self._restart_index = self._restart_index, None
+                # Copied on the loop, so it holds exactly the words up to `version`
+                snapshot, version = index.copy(), self._version
+                executor = await loop.run_in_executor(None, self._launch, snapshot, version)
+                if self._executor is None:
+                    # Shut down while the new workers were starting
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return
+                old_executor, self._executor = self._executor, executor
+                # The new workers already have everything up to `version`
+                self._deltas = [delta for delta in self._deltas if delta[0] > version]
+                old_executor.shutdown(wait=False)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Could not restart profanity scan workers: {e}. Scanning inline from now on.")
+            self.shutdown()
+        finally:
+            self._restart_task = None
+
+    def add_words(self, index: ProfanityIndex, words):
+        if self._executor is None:
+            return
+        self._version += 1
+        self._deltas.append((self._version, list(words)))
+        if len(self._deltas) >= MAX_PENDING_DELTAS and self._restart_task is None:
+            self.restart(index)
+
+    def should_offload(self, length: int) -> bool:
+        """True for long texts, and for any text once the inline budget of this second is spent."""
+        if self._executor is None:
+            return False
+        if length >= OFFLOAD_MIN_CHARS:
+            return True
+        now = time.monotonic()
+        if now - self._window_start >= 1:
+            self._window_start = now
+            self._window_chars = 0
+        if self._window_chars + length > INLINE_CHARS_PER_SECOND:
+            return True
+        self._window_chars += length
+        return False
+
+    async def contains(self, text: str) -> bool:
+        future = self._executor.submit(_scan_in_worker, text, tuple(self._deltas))
+        return await asyncio.wrap_future(future)
+
+    async def classify(self, text: str) -> list:
+        future = self._executor.submit(_classify_in_worker, text, tuple(self._deltas))
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        if self._restart_task is not None:
+            self._restart_task.cancel()
+        self._restart_index = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
 class ProfanityFilter:
-    def __init__(self, mongo_uri=None):
-        self.bad_words = self._load_default_bad_words()
-        self.mongo_client = None
+    def __init__(self, mongo_uri=None, index_path=DEFAULT_INDEX_PATH, mongo_client=None):
+        self.scan_pool = None
+        self.default_categories = self._load_default_bad_words()
+        self.default_words = set(self.default_categories)
+        self.default_key = vocabulary_key(self.default_words)
+        self.index_path = index_path
+        self._save_task = None
+        self._save_lock = asyncio.Lock()
+        if not self._load_index():
+            self._reset_index(self.default_words)
+            self._write_index(self._index_snapshot())
+        # An existing AsyncIOMotorClient can be passed in to share its connection pool
+        self.mongo_client = mongo_client
         self.db = None
         self.collection = None
         self.mongo_uri = mongo_uri
+        # MongoDB _id -> word, needed to resolve delete events from the change stream
+        self.db_word_ids = {}
 
         if self.mongo_uri:
             pass
         else:
             logger.warning("No MongoDB URI provided. Using default profanity list only.")
 
-        logger.info(f"Profanity filter initialized with {len(self.bad_words)} bad words.")
+        logger.info(
+            f"Profanity filter initialized with {len(self.bad_words)} bad words "
+            f"({len(self.index.token_words)} canonical tokens, {len(self.index.phrase_matcher)} phrases, "
+            f"{len(self.index.residue_matcher)} residue patterns)."
+        )
+
+    def start_scan_pool(self, workers: int = SCAN_WORKERS):
+        """Starts the worker processes long texts are scanned in (see contains_profanity_async).
+
+        Blocks until the workers are up, so call it at startup; later restarts happen
+        in the background (see ScanPool).
+        """
+        if workers <= 0 or not ScanPool.available():
+            logger.info("Profanity scans run inline on the event loop.")
+            return
+        self.scan_pool = ScanPool(workers)
+        self.scan_pool.start(self.index)
+        logger.info(f"Started {workers} profanity scan workers for texts of {OFFLOAD_MIN_CHARS}+ characters.")
+
+    def _reset_index(self, words):
+        """Rebuilds the whole index from scratch for the given words."""
+        self.bad_words = set(words)
+        self.index = ProfanityIndex(self.bad_words, self.default_categories)
+        self.index_key = vocabulary_key(self.bad_words)
+        if self.scan_pool is not None:
+            self.scan_pool.restart(self.index)
+
+    def _load_index(self) -> bool:
+        """Loads the compiled index from disk if it was built from the current defaults.
+
+        The artifact also carries the MongoDB words known when it was written, so a
+        restart has the full vocabulary before the database is even reachable.
+        """
+        if not self.index_path or not os.path.exists(self.index_path):
+            return False
+        try:
+            with open(self.index_path, "rb") as index_file:
+                artifact = pickle.load(index_file)
+            if artifact.get("version") != INDEX_FORMAT_VERSION or artifact.get("default_key") != self.default_key:
+                logger.info("Profanity index on disk is outdated, rebuilding it.")
+                return False
+            self.bad_words = artifact["bad_words"]
+            self.index = artifact["index"]
+            self.index_key = artifact["key"]
+            logger.info(f"Loaded profanity index from {self.index_path}.")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not load profanity index from {self.index_path}: {e}. Rebuilding it.")
+            return False
+
+    def _index_snapshot(self) -> dict:
+        """Copies what gets persisted, so it can be pickled while the live index keeps changing."""
+        return {
+            "version": INDEX_FORMAT_VERSION,
+            "key": self.index_key,
+            "default_key": self.default_key,
+            "bad_words": set(self.bad_words),
+            "index": self.index.copy(),
+        }
+
+    def _write_index(self, artifact: dict):
+        """Writes an index snapshot to disk atomically."""
+        if not self.index_path:
+            return
+        temp_path = f"{self.index_path}.tmp"
+        try:
+            with open(temp_path, "wb") as index_file:
+                pickle.dump(artifact, index_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.index_path)
+        except Exception as e:
+            logger.warning(f"Could not save profanity index to {self.index_path}: {e}")
+
+    def _schedule_index_save(self):
+        """Saves the index INDEX_SAVE_DELAY seconds from now; changes made meanwhile share that save."""
+        if self.index_path and self._save_task is None:
+            self._save_task = asyncio.ensure_future(self._save_index_later())
+
+    async def _save_index_later(self):
+        await asyncio.sleep(INDEX_SAVE_DELAY)
+        # Changes from here on schedule the next save
+        self._save_task = None
+        async with self._save_lock:
+            # Snapshot on the loop, pickle and write in a thread
+            artifact = self._index_snapshot()
+            await asyncio.get_running_loop().run_in_executor(None, self._write_index, artifact)
+
+    def _index_words(self, words):
+        """Adds words to the live index and to the scan workers' copies."""
+        self.index.add_words(words, self.default_categories)
+        if self.scan_pool is not None:
+            self.scan_pool.add_words(self.index, words)
 
     async def init_async_db(self):
         """Asynchronously initializes the MongoDB connection and loads words."""
@@ -28,7 +789,8 @@ class ProfanityFilter:
             return
 
         try:
-            self.mongo_client = AsyncIOMotorClient(self.mongo_uri, serverSelectionTimeoutMS=5000)
+            if self.mongo_client is None:
+                self.mongo_client = AsyncIOMotorClient(self.mongo_uri, serverSelectionTimeoutMS=5000)
             self.db = self.mongo_client.get_database("asfilter")
             self.collection = self.db.get_collection("bad_words")
 
@@ -58,357 +820,422 @@ class ProfanityFilter:
             self.db = None
             self.collection = None
 
-    def _load_default_bad_words(self):
+    @staticmethod
+    def _load_default_bad_words():
         # MASSIVE comprehensive list of profanity in Hindi, English, and all variations
-        default_list = [
+        sections = [
             # ===== CORE HINDI PROFANITY =====
-            "bhadve", "bhadwe", "bhadva", "bhadvaa", "bhadvon", "bhadvonka",
-            "bhosdike", "bhosdiwale", "bhosad", "bhosada", "bhosdi", "bhosdika",
-            "bhosdike", "bhosdiwala", "bhosadpappu", "bhosadpappu",
-            "bsdk", "bsdka", "bsdke", "bsdi", "bsdiwale", "bsdiwala", "bsdwala",
-            "bsdwale", "bsdki", "bsdko",
-            "madarchod", "madrchod", "madherchod", "maderchod", "madarjaat",
-            "madarjat", "maderjaat", "madarch*d", "madrch*d", "maderch*d",
-            "behenchod", "behenchhod", "behenchud", "behenchood", "behenkelode",
-            "behenkelund", "behench*d", "behnchod", "bhenchod", "bhench*d",
-            "randi", "rand", "randiwa", "randikhana", "randikhane", "randi ka",
-            "randi ki", "randibaaz", "randipana", "randi_pana",
-            "saala", "sala", "saale", "sale", "saali", "sali", "saalya", "salya",
-            "saale_kutte", "saali_kutiya",
-            "gaand", "gand", "gaandu", "gandu", "gaandfat", "gandfat", "gaand mara",
-            "gand mara", "gaandmasti", "gandmasti", "gaand_me_dum", "gand_me_dum",
-            "harami", "haraami", "haramkhor", "haramkhor", "harami ki aulad",
-            "haramzada", "haramzadi", "haramkhor", "haramkhori",
-            "kutte", "kutta", "kutti", "kuttiya", "kutte ka", "kutte ke",
-            "kutte ki aulad", "kutteki_aulad", "kutiya_ki_aulad",
-            "chutiya", "chutia", "chutiye", "chutiyapa", "chut", "choot", "chutad",
-            "chootad", "chutiyapanti", "chutiyagiri", "chutiya_giri",
-            "lund", "laund", "loda", "lode", "loduu", "land", "lauda", "laude",
-            "lund_chus", "lund_chusa", "lund_kha", "lund_le",
-            "chod", "chhod", "chood", "chud", "chudai", "chudail", "chudasi",
-            "chudwa", "chudwayega", "chudwaunga", "chudwana", "chudwane",
-            "penchod", "penchhod", "pencood", "penchud", "pensod",
-            "mc", "bc", "bkl", "lodu", "lawde", "lawda", "loda", "lodu",
-            "gandu", "gaandu", "gandfat", "gaandfat", "gandmasti", "gaandmasti",
-            "chakke", "chakka", "hijda", "hijde", "hijra", "hijre", "hijde",
-            "kamine", "kaminey", "kamina", "kamini", "kamina_pan", "kaminepan",
+            ("hindi", [
+                "bhadve", "bhadwe", "bhadva", "bhadvaa", "bhadvon", "bhadvonka",
+                "bhosdike", "bhosdiwale", "bhosad", "bhosada", "bhosdi", "bhosdika",
+                "bhosdike", "bhosdiwala", "bhosadpappu", "bhosadpappu",
+                "bsdk", "bsdka", "bsdke", "bsdi", "bsdiwale", "bsdiwala", "bsdwala",
+                "bsdwale", "bsdki", "bsdko",
+                "madarchod", "madrchod", "madherchod", "maderchod", "madarjaat",
+                "madarjat", "maderjaat", "madarch*d", "madrch*d", "maderch*d",
+                "behenchod", "behenchhod", "behenchud", "behenchood", "behenkelode",
+                "behenkelund", "behench*d", "behnchod", "bhenchod", "bhench*d",
+                "randi", "rand", "randiwa", "randikhana", "randikhane", "randi ka",
+                "randi ki", "randibaaz", "randipana", "randi_pana",
+                "saala", "sala", "saale", "sale", "saali", "sali", "saalya", "salya",
+                "saale_kutte", "saali_kutiya",
+                "gaand", "gand", "gaandu", "gandu", "gaandfat", "gandfat", "gaand mara",
+                "gand mara", "gaandmasti", "gandmasti", "gaand_me_dum", "gand_me_dum",
+                "harami", "haraami", "haramkhor", "haramkhor", "harami ki aulad",
+                "haramzada", "haramzadi", "haramkhor", "haramkhori",
+                "kutte", "kutta", "kutti", "kuttiya", "kutte ka", "kutte ke",
+                "kutte ki aulad", "kutteki_aulad", "kutiya_ki_aulad",
+                "chutiya", "chutia", "chutiye", "chutiyapa", "chut", "choot", "chutad",
+                "chootad", "chutiyapanti", "chutiyagiri", "chutiya_giri",
+                "lund", "laund", "loda", "lode", "loduu", "land", "lauda", "laude",
+                "lund_chus", "lund_chusa", "lund_kha", "lund_le",
+                "chod", "chhod", "chood", "chud", "chudai", "chudail", "chudasi",
+                "chudwa", "chudwayega", "chudwaunga", "chudwana", "chudwane",
+                "penchod", "penchhod", "pencood", "penchud", "pensod",
+                "mc", "bc", "bkl", "lodu", "lawde", "lawda", "loda", "lodu",
+                "gandu", "gaandu", "gandfat", "gaandfat", "gandmasti", "gaandmasti",
+                "chakke", "chakka", "hijda", "hijde", "hijra", "hijre", "hijde",
+                "kamine", "kaminey", "kamina", "kamini", "kamina_pan", "kaminepan",
+            ]),
 
             # ===== ENGLISH PROFANITY =====
-            "fuck", "fucker", "fucking", "motherfucker", "motherfucking", "fuckface",
-            "fuckboy", "fuckgirl", "fuckoff", "fuckyou", "fuck u", "fuk", "fuking",
-            "fuker", "fucc", "fucck", "fukk", "fukka", "fukker",
-            "shit", "shite", "shithead", "shitter", "bullshit", "shitface", "shitbag",
-            "shitty", "shitt", "shite", "shittiest", "shittier",
-            "asshole", "ass", "arse", "arsehole", "asshat", "asswipe", "assclown",
-            "asslicker", "ass_kisser", "assface", "assbag",
-            "bitch", "bitches", "bitching", "bitchy", "biatch", "bich", "beetch",
-            "bitchass", "bitchy", "bitchslap",
-            "bastard", "bastards", "basted", "bastid", "basterd", "basturd", "bastardo",
-            "dick", "dickhead", "dickface", "dickwad", "dickweed", "dickbag", "dickish",
-            "dickless", "dicklicker", "dick_for_brains",
-            "pussy", "pussies", "pusy", "puzzy", "pussi", "pusi", "pussie", "pussyhole",
-            "cunt", "cunts", "cuntface", "cunty", "cuntbag", "cuntish", "cunthead",
-            "whore", "whores", "whoring", "hagees", "aand", "hoes", "hoebag", "hoeski",
-            "slut", "sluts", "slutty", "slutbag", "slutface", "slutshaming", "slutwalk",
-            "cock", "cocks", "cocky", "cockface", "cockhead", "cocksucker", "cockwomble",
-            "wanker", "wank", "wanking", "wankered", "wankstain", "wanky", "wankjob",
-            "twat", "twats", "twatty", "twatwaffle", "twatface", "twathead", "twatish",
+            ("english", [
+                "fuck", "fucker", "fucking", "motherfucker", "motherfucking", "fuckface",
+                "fuckboy", "fuckgirl", "fuckoff", "fuckyou", "fuck u", "fuk", "fuking",
+                "fuker", "fucc", "fucck", "fukk", "fukka", "fukker",
+                "shit", "shite", "shithead", "shitter", "bullshit", "shitface", "shitbag",
+                "shitty", "shitt", "shite", "shittiest", "shittier",
+                "asshole", "ass", "arse", "arsehole", "asshat", "asswipe", "assclown",
+                "asslicker", "ass_kisser", "assface", "assbag",
+                "bitch", "bitches", "bitching", "bitchy", "biatch", "bich", "beetch",
+                "bitchass", "bitchy", "bitchslap",
+                "bastard", "bastards", "basted", "bastid", "basterd", "basturd", "bastardo",
+                "dick", "dickhead", "dickface", "dickwad", "dickweed", "dickbag", "dickish",
+                "dickless", "dicklicker", "dick_for_brains",
+                "pussy", "pussies", "pusy", "puzzy", "pussi", "pusi", "pussie", "pussyhole",
+                "cunt", "cunts", "cuntface", "cunty", "cuntbag", "cuntish", "cunthead",
+                "whore", "whores", "whoring", "hagees", "aand", "hoes", "hoebag", "hoeski",
+                "slut", "sluts", "slutty", "slutbag", "slutface", "slutshaming", "slutwalk",
+                "cock", "cocks", "cocky", "cockface", "cockhead", "cocksucker", "cockwomble",
+                "wanker", "wank", "wanking", "wankered", "wankstain", "wanky", "wankjob",
+                "twat", "twats", "twatty", "twatwaffle", "twatface", "twathead", "twatish",
+            ]),
 
             # ===== HINGLISH MIXED =====
-            "fuck bhenchod", "bhenchod fuck", "madarchod fuck", "fuck madarchod",
-            "bhosdiwala fuck", "fuck bhosdiwala", "randi ka bacha", "randi ki aulad",
-            "chutiya fuck", "fuck chutiya", "lund chus", "gaand mara", "ass gaand",
-            "bitch saali", "saali bitch", "whore randi", "randi whore",
+            ("hinglish", [
+                "fuck bhenchod", "bhenchod fuck", "madarchod fuck", "fuck madarchod",
+                "bhosdiwala fuck", "fuck bhosdiwala", "randi ka bacha", "randi ki aulad",
+                "chutiya fuck", "fuck chutiya", "lund chus", "gaand mara", "ass gaand",
+                "bitch saali", "saali bitch", "whore randi", "randi whore",
+            ]),
 
             # ===== ABBREVIATIONS & NUMBER SUBSTITUTIONS =====
-            "fck", "fcuk", "fuk", "fku", "f*ck", "f**k", "f***", "f##k", "f00k",
-            "sh1t", "sh!t", "sht", "s**t", "sh*t", "sh**", "sh##", "sh00t",
-            "b1tch", "b!tch", "btch", "b**ch", "b*tch", "bi*ch", "b00ch",
-            "a55", "a55h0l3", "a$$", "a**", "a*s", "@$$", "@**", "@ss", "a55hole",
-            "d1ck", "d!ck", "dck", "d**k", "d*ck", "di*k", "d00k",
-            "p0rn", "pr0n", "p*rn", "p**n", "p00n", "p0rn", "prn",
-            "m0therfucker", "m0th3rfucker", "mthrfcker", "mthr_fckr",
-            "b3h3nch0d", "b3hench0d", "bhench0d", "behench0d",
-            "madarch0d", "m4d4rch0d", "m4darch0d", "madrch0d",
+            ("obfuscated", [
+                "fck", "fcuk", "fuk", "fku", "f*ck", "f**k", "f***", "f##k", "f00k",
+                "sh1t", "sh!t", "sht", "s**t", "sh*t", "sh**", "sh##", "sh00t",
+                "b1tch", "b!tch", "btch", "b**ch", "b*tch", "bi*ch", "b00ch",
+                "a55", "a55h0l3", "a$$", "a**", "a*s", "@$$", "@**", "@ss", "a55hole",
+                "d1ck", "d!ck", "dck", "d**k", "d*ck", "di*k", "d00k",
+                "p0rn", "pr0n", "p*rn", "p**n", "p00n", "p0rn", "prn",
+                "m0therfucker", "m0th3rfucker", "mthrfcker", "mthr_fckr",
+                "b3h3nch0d", "b3hench0d", "bhench0d", "behench0d",
+                "madarch0d", "m4d4rch0d", "m4darch0d", "madrch0d",
+            ]),
 
             # ===== CREATIVE MISSPELLINGS =====
-            "phuck", "phuk", "phacker", "phucker", "phucc", "phucck", "phukk",
-            "sheeet", "shiet", "shytt", "shite", "shyte", "shitt", "shyte",
-            "beech", "beotch", "biyotch", "biznitch", "bizatch", "bizzle", "bytch",
-            "azz", "azzhole", "azzh0le", "azzhole", "@zz", "@zzh0le", "@sshole",
-            "dikk", "dikkhead", "dikkhed", "dikhed", "dikhead", "dikhed", "dicc",
-            "kunt", "qunt", "cwnt", "c*nt", "c**t", "c00nt", "k00nt", "c_nt",
-            "phaggot", "faggit", "faggitt", "fagot", "fagget", "faggit",
+            ("obfuscated", [
+                "phuck", "phuk", "phacker", "phucker", "phucc", "phucck", "phukk",
+                "sheeet", "shiet", "shytt", "shite", "shyte", "shitt", "shyte",
+                "beech", "beotch", "biyotch", "biznitch", "bizatch", "bizzle", "bytch",
+                "azz", "azzhole", "azzh0le", "azzhole", "@zz", "@zzh0le", "@sshole",
+                "dikk", "dikkhead", "dikkhed", "dikhed", "dikhead", "dikhed", "dicc",
+                "kunt", "qunt", "cwnt", "c*nt", "c**t", "c00nt", "k00nt", "c_nt",
+                "phaggot", "faggit", "faggitt", "fagot", "fagget", "faggit",
+            ]),
 
             # ===== REVERSED WORDS =====
-            "kcuf", "tihs", "hctib", "kcid", "yssip", "tnuc", "erohw", "tuls", "kcoj",
-            "odhcab", "odhcam", "odhceb", "odhcram", "odhcuf", "odhcus", "odhcut",
-            "evird", "kcilc", "kcilb", "kcilf", "kcils", "kcilw", "kcilg",
+            ("reversed", [
+                "kcuf", "tihs", "hctib", "kcid", "yssip", "tnuc", "erohw", "tuls", "kcoj",
+                "odhcab", "odhcam", "odhceb", "odhcram", "odhcuf", "odhcus", "odhcut",
+                "evird", "kcilc", "kcilb", "kcilf", "kcils", "kcilw", "kcilg",
+            ]),
 
             # ===== COMMON PHRASES =====
-            "teri maa ki chut", "teri maa ka bhosda", "maa chuda", "behen ka loda",
-            "bhosdi ke", "gaand mein dam", "lund lele", "chut marike",
-            "fuck off", "fuck you", "go to hell", "screw you", "suck my dick",
-            "lick my ass", "kiss my ass", "eat shit", "shit happens", "bull shit",
-            "bhen k lode", "maa k lode", "chut k dhakkan", "gaand k dhakkan",
+            ("phrase", [
+                "teri maa ki chut", "teri maa ka bhosda", "maa chuda", "behen ka loda",
+                "bhosdi ke", "gaand mein dam", "lund lele", "chut marike",
+                "fuck off", "fuck you", "go to hell", "screw you", "suck my dick",
+                "lick my ass", "kiss my ass", "eat shit", "shit happens", "bull shit",
+                "bhen k lode", "maa k lode", "chut k dhakkan", "gaand k dhakkan",
+            ]),
 
             # ===== REGIONAL VARIATIONS =====
-            "lauda", "laude", "laudo", "lawda", "lawde", "lawdo", "loda", "lode", "lodo",
-            "chodu", "choda", "chode", "chodi", "chodu", "choddi", "chodke", "chodh",
-            "gandu", "gando", "gandi", "gand", "gaand", "gandfat", "gandmasti",
-            "bhenchod", "bhenchhod", "bhenchud", "bhenchood", "bhenkelode",
-            "bhenkelund", "bhenkilodi", "bhenkilora",
+            ("hindi", [
+                "lauda", "laude", "laudo", "lawda", "lawde", "lawdo", "loda", "lode", "lodo",
+                "chodu", "choda", "chode", "chodi", "chodu", "choddi", "chodke", "chodh",
+                "gandu", "gando", "gandi", "gand", "gaand", "gandfat", "gandmasti",
+                "bhenchod", "bhenchhod", "bhenchud", "bhenchood", "bhenkelode",
+                "bhenkelund", "bhenkilodi", "bhenkilora",
+            ]),
 
             # ===== URDU/ISLAMIC SLANG =====
-            "haramzada", "haramzadi", "haramkhor", "haramkhori", "haram ki aulad",
-            "kamina", "kamine", "kaminey", "kamina_pan", "kaminepan", "kamini",
+            ("urdu", [
+                "haramzada", "haramzadi", "haramkhor", "haramkhori", "haram ki aulad",
+                "kamina", "kamine", "kaminey", "kamina_pan", "kaminepan", "kamini",
+            ]),
 
             # ===== SOUTH INDIAN SLANG =====
-            "punda", "pundai", "mayir", "mayiru", "poolu", "pooley", "kunji",
-            "thevdiya", "thevdiyaa", "thevdiyapaya", "thevdiyapaiya", "thevdiyapulla",
+            ("south_indian", [
+                "punda", "pundai", "mayir", "mayiru", "poolu", "pooley", "kunji",
+                "thevdiya", "thevdiyaa", "thevdiyapaya", "thevdiyapaiya", "thevdiyapulla",
+            ]),
 
             # ===== CREATIVE COMBINATIONS =====
-            "lundtop", "chuttop", "gandtop", "bhosdatop", "madartop", "behntop",
-            "gand_mara", "gaand_mara", "lund_chus", "chut_marani", "bhosdi_ke",
-            "mother_lover", "sister_fucker", "brother_fucker", "father_fucker",
+            ("hinglish", [
+                "lundtop", "chuttop", "gandtop", "bhosdatop", "madartop", "behntop",
+                "gand_mara", "gaand_mara", "lund_chus", "chut_marani", "bhosdi_ke",
+                "mother_lover", "sister_fucker", "brother_fucker", "father_fucker",
+            ]),
 
             # ===== SYMBOL & NUMBER VARIATIONS =====
-            "f_u_c_k", "f-u-c-k", "f.u.c.k", "f@ck", "f#ck", "f$ck", "f%ck", "f&ck",
-            "sh!t", "sh1t", "sh1tty", "sh1thead", "sh1tbag", "sh1tfaced",
-            "b1tch", "b!tch", "b1tchy", "b1tches", "b1tchface", "b1tchass",
-            "a55", "a55h0le", "a55h0l3", "a55wipe", "a55hat", "a55clown",
-            "d1ck", "d!ck", "d1ckhead", "d1ckface", "d1ckwad", "d1ckweed",
-            "c0ck", "c0cksucker", "c0ckhead", "c0ckface", "c0cky",
-            "p0rn", "pr0n", "p0rnstar", "pr0nstar", "p0rnhub", "pr0nhub",
+            ("obfuscated", [
+                "f_u_c_k", "f-u-c-k", "f.u.c.k", "f@ck", "f#ck", "f$ck", "f%ck", "f&ck",
+                "sh!t", "sh1t", "sh1tty", "sh1thead", "sh1tbag", "sh1tfaced",
+                "b1tch", "b!tch", "b1tchy", "b1tches", "b1tchface", "b1tchass",
+                "a55", "a55h0le", "a55h0l3", "a55wipe", "a55hat", "a55clown",
+                "d1ck", "d!ck", "d1ckhead", "d1ckface", "d1ckwad", "d1ckweed",
+                "c0ck", "c0cksucker", "c0ckhead", "c0ckface", "c0cky",
+                "p0rn", "pr0n", "p0rnstar", "pr0nstar", "p0rnhub", "pr0nhub",
+            ]),
 
             # ===== START/END VARIATIONS =====
-            "hase_gandu", "start_gandu", "0_gandu", "o_gandu", "gandu_hase",
-            "hase_bhosdi", "start_bhosdi", "0_bhosdi", "o_bhosdi", "bhosdi_hase",
-            "hase_chutiya", "start_chutiya", "0_chutiya", "o_chutiya", "chutiya_hase",
-            "hase_madar", "start_madar", "0_madar", "o_madar", "madar_hase",
-            "hase_lund", "start_lund", "0_lund", "o_lund", "lund_hase",
+            ("hindi", [
+                "hase_gandu", "start_gandu", "0_gandu", "o_gandu", "gandu_hase",
+                "hase_bhosdi", "start_bhosdi", "0_bhosdi", "o_bhosdi", "bhosdi_hase",
+                "hase_chutiya", "start_chutiya", "0_chutiya", "o_chutiya", "chutiya_hase",
+                "hase_madar", "start_madar", "0_madar", "o_madar", "madar_hase",
+                "hase_lund", "start_lund", "0_lund", "o_lund", "lund_hase",
+            ]),
 
             # ===== ULTE-SIDHE FLIPPY WORDS =====
-            "uʞɔnɟ", "ʇıɥs", "ɥɔʇıq", "ʞɔıp", "ʎssnd", "ʇnnu", "ʍoɹɥʍ", "ʇnls",
-            "ʎɐʇʇɐq", "ɐqɐɯ", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq",
-            "ɐɹɐʇsɐq", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq",
+            ("flipped", [
+                "uʞɔnɟ", "ʇıɥs", "ɥɔʇıq", "ʞɔıp", "ʎssnd", "ʇnnu", "ʍoɹɥʍ", "ʇnls",
+                "ʎɐʇʇɐq", "ɐqɐɯ", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq",
+                "ɐɹɐʇsɐq", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq", "ɐɹɐʇsɐq",
+            ]),
 
             # ===== EMOTICON/ASCII VARIATIONS =====
-            "8==D", "8===D", "8====D", "8=====D", "8======D",
-            "(.)(.)", "( . Y . )", "( o Y o )", "( . ) ( . )",
-            "(_!_)", "(_|_)", "(_o_)", "(_O_)", "(_0_)",
+            ("ascii_art", [
+                "8==D", "8===D", "8====D", "8=====D", "8======D",
+                "(.)(.)", "( . Y . )", "( o Y o )", "( . ) ( . )",
+                "(_!_)", "(_|_)", "(_o_)", "(_O_)", "(_0_)",
+            ]),
 
             # ===== COMMON INSULTS =====
-            "sucker", "loser", "idiot", "moron", "retard", "dumbass", "stupid",
-            "jerk", "scumbag", "douche", "douchebag", "pig", "swine", "animal",
-            "dog", "swear", "abuse", "badword", "gaali", "gali", "abusive",
-            "nigga", "nigger", "negro", "cracker", "honkey", "spic", "chink",
-            "gook", "kike", "wop", "dago", "kyke", "heeb", "mick", "paddy",
-            "turd", "turdface", "turdbrain", "turdhead", "turdlicker",
-            "scrotum", "scrot", "scrote", "scrotface", "nutjob", "nutcase",
-            "wanksta", "wankster", "wankjob", "wanktard", "wankshaft",
-            "cumdumpster", "cumdump", "cumslut", "cumwhore", "cumface",
-            "jizz", "jizzface", "jizzhead", "jizzbag", "jizzstain",
-            "spunk", "spunkface", "spunkhead", "spunkstain", "spunkdumpster",
-            "tosser", "tosspot", "tossbag", "tossface", "tosshead",
-            "prick", "prickhead", "prickface", "prickwad", "prickweed",
-            "knob", "knobhead", "knobface", "knobend", "knobjockey",
-            "bellend", "bellendhead", "bellendface", "bellendwad",
-            "fanny", "fannyhead", "fannyface", "fannywad", "fannybandit",
-            "minge", "mingehead", "mingeface", "mingewad", "mingebag",
-            "berk", "berkhead", "berkface", "berkwad", "berkbrain",
-            "plonker", "plonkhead", "plonkface", "plonkwad", "plonkbrain",
-            "git", "gitt", "githead", "gitface", "gitwad", "gitbrain",
-            "pillock", "pillockhead", "pillockface", "pillockwad", "pillockbrain",
-            "numpty", "numptyhead", "numptyface", "numptywad", "numptybrain",
-            "muppet", "muppethead", "muppetface", "muppetwad", "muppetbrain",
-            "twit", "twithead", "twitface", "twitwad", "twitbrain",
-            "nonce", "noncehead", "nonceface", "noncewad", "noncebrain",
-            "gobshite", "gobshit", "gobshitehead", "gobshiteface",
-            "arsebandit", "arsewipe", "arsehead", "arseface", "arseclown",
-            "bollocks", "bollock", "bollockhead", "bollockface", "bollockbrain",
-            "bugger", "buggerhead", "buggerface", "buggerwad", "buggerbrain",
-            "bloody", "bloodyhell", "bloodynora", "bloodyhell", "bloodyhell",
-            "sod", "sodoff", "sodhead", "sodface", "sodbrain", "sodding",
-            "blimey", "blimeyhell", "blimeynora", "blimeyhell", "blimeyhell",
-            "crikey", "crikeyhell", "crikeynora", "crikeyhell", "crikeyhell",
-            "cripes", "cripeshell", "cripesnora", "cripeshell", "cripeshell",
-            "gordonbennett", "gordonbennetthead", "gordonbennettface",
-            "streuth", "streuthhead", "streuthface", "streuthwad", "streuthbrain",
-            "blighter", "blighterhead", "blighterface", "blighterwad", "blighterbrain",
-            "bounder", "bounderhead", "bounderface", "bounderwad", "bounderbrain",
-            "cad", "cadhead", "cadface", "cadwad", "cadbrain", "caddish",
-            "rotter", "rotterhead", "rotterface", "rotterwad", "rotterbrain",
-            "scoundrel", "scoundrelhead", "scoundrelface", "scoundrelwad", "scoundrelbrain",
-            "blackguard", "blackguardhead", "blackguardface", "blackguardwad", "blackguardbrain",
-            "neerdowell", "neerdowellhead", "neerdowellface", "neerdowellwad", "neerdowellbrain",
-            "goodfornothing", "goodfornothinghead", "goodfornothingface",
-            "wastrel", "wastrelhead", "wastrelface", "wastrelwad", "wastrelbrain",
-            "layabout", "layabouthead", "layaboutface", "layaboutwad", "layaboutbrain",
-            "loafer", "loaferhead", "loaferface", "loaferwad", "loaferbrain",
-            "slacker", "slackerhead", "slackerface", "slackerwad", "slackerbrain",
-            "shirker", "shirkerhead", "shirkerface", "shirkerwad", "shirkerbrain",
-            "skiver", "skiverhead", "skiverface", "skiverwad", "skiverbrain",
-            "malingerer", "malingererhead", "malingererface", "malingererwad", "malingererbrain",
-            "goldbricker", "goldbrickerhead", "goldbrickerface", "goldbrickerwad", "goldbrickerbrain",
-            "sluggard", "sluggardhead", "sluggardface", "sluggardwad", "sluggardbrain",
-            "slugabed", "slugabedhead", "slugabedface", "slugabedwad", "slugabedbrain",
-            "drone", "dronehead", "droneface", "dronewad", "dronebrain",
-            "idler", "idlerhead", "idlerface", "idlerwad", "idlerbrain",
-            "dawdler", "dawdlerhead", "dawdlerface", "dawdlwad", "dawdlerbrain",
-            "laggard", "laggardhead", "laggardface", "laggardwad", "laggardbrain",
-            "slowcoach", "slowcoachhead", "slowcoachface", "slowcoachwad", "slowcoachbrain",
-            "stickinthemud", "stickinthemudhead", "stickinthemudface",
-            "fuddy-duddy", "fuddyduddy", "fuddy-duddyhead", "fuddy-duddyface",
-            "oldfuddy-duddy", "oldfuddyduddy", "oldfuddy-duddyhead", "oldfuddy-duddyface",
-            "fogey", "fogeyhead", "fogeyface", "fogeywad", "fogeybrain", "oldfogey",
-            "fossil", "fossilhead", "fossilface", "fossilwad", "fossilbrain", "oldfossil",
-            "relic", "relichead", "relicface", "relicwad", "relicbrain", "oldrelic",
-            "dinosaur", "dino", "dinohead", "dinoface", "dinowad", "dinobrain", "olddinosaur",
-            "antiquated", "antiquatedhead", "antiquatedface", "antiquatedwad", "antiquatedbrain",
-            "obsolete", "obsoletehead", "obsoleteface", "obsoletewad", "obsoletebrain",
-            "outmoded", "outmodedhead", "outmodedface", "outmodedwad", "outmodedbrain",
-            "outdated", "outdatedhead", "outdatedface", "outdatedwad", "outdatedbrain",
-            "superannuated", "superannuatedhead", "superannuatedface", "superannuatedwad", "superannuatedbrain",
-            "antediluvian", "antediluvianhead", "antediluvianface", "antediluvianwad", "antediluvianbrain",
-            "medieval", "medievalhead", "medievalface", "medievalwad", "medievalbrain",
-            "primitive", "primitivehead", "primitiveface", "primitivewad", "primitivebrain",
-            "primeval", "primevalhead", "primevalface", "primevalwad", "primevalbrain",
-            "ancient", "ancienthead", "ancientface", "ancientwad", "ancientbrain",
-            "archaic", "archaichead", "archaicface", "archaicwad", "archaicbrain",
-            "bygone", "bygonehead", "bygoneface", "bygonewad", "bygonebrain",
-            "passé", "passe", "passéhead", "passehead", "passéface", "passeface",
-            "old-hat", "oldhat", "old-hathead", "oldhathead", "old-hatface", "oldhatface",
-            "behindthetimes", "behindthetimeshead", "behindthetimesface",
-            "outoftouch", "outoftouchhead", "outoftouchface",
-            "outofdate", "outofdatehead", "outofdateface",
-            "outofstep", "outofstephead", "outofstepface",
-            "outofsync", "outofsynchead", "outofsyncface",
-            "outofline", "outlinehead", "outlineface",
-            "outoforder", "outoforderhead", "outoforderface",
-            "outofwhack", "outofwhackhead", "outofwhackface",
-            "outofkilter", "outofkilterhead", "outofkilterface",
-            "outofjoint", "outofjointhead", "outofjointface",
-            "outofsorts", "outofsortshead", "outofsortsface",
-            "outoffashion", "outoffashionhead", "outoffashionface",
-            "outofstyle", "outofstylehead", "outofstyleface",
-            "outofvogue", "outofvoguehead", "outofvogueface",
-            "outofseason", "outofseasonhead", "outofseasonface",
-            "outofprint", "outofprinthead", "outofprintface",
-            "outofstock", "outofstockhead", "outofstockface",
-            "outofsupply", "outofsupplyhead", "outofsupplyface",
-            "outofcirculation", "outofcirculationhead", "outofcirculationface",
-            "outofcommission", "outofcommissionhead", "outofcommissionface",
-            "outofservice", "outofservicehead", "outofserviceface",
-            "outofaction", "outofactionhead", "outofactionface",
-            "outofplay", "outofplayhead", "outofplayface",
-            "outofbounds", "outofboundshead", "outofboundsface",
-            "outofreach", "outofreachhead", "outofreachface",
-            "outofsight", "outofsighthead", "outofsightface",
-            "outofmind", "outofmindhead", "outofmindface",
-            "outofcontrol", "outofcontrolhead", "outofcontrolface",
-            "outofhand", "outofhandhead", "outofhandface",
-            "outofpocket", "outofpockethead", "outofpocketface",
-            "outofpocket", "outofpockethead", "outofpocketface",
-            "outofthequestion", "outofthequestionhead", "outofthequestionface",
-            "outoftheordinary", "outoftheordinaryhead", "outoftheordinaryface",
-            "outoftheway", "outofthewayhead", "outofthewayface",
-            "outofthewoods", "outofthewoodshead", "outofthewoodsface",
-            "outoftheblue", "outofthebluehead", "outoftheblueface",
-            "outofthebox", "outoftheboxhead", "outoftheboxface",
-            "outofthecloset", "outoftheclosethead", "outoftheclosetface",
-            "outoftheloop", "outoftheloophhead", "outoftheloopface",
-            "outofthepicture", "outofthepicturehead", "outofthepictureface",
-            "outofthequestion", "outofthequestionhead", "outofthequestionface",
-            "outoftheordinary", "outoftheordinaryhead", "outoftheordinaryface",
-            "outoftheway", "outofthewayhead", "outofthewayface",
-            "outofthewoods", "outofthewoodshead", "outofthewoodsface",
-            "outoftheblue", "outofthebluehead", "outoftheblueface",
-            "outofthebox", "outoftheboxhead", "outoftheboxface",
-            "outofthecloset", "outoftheclosethead", "outoftheclosetface",
-            "outoftheloop", "outoftheloophhead", "outoftheloopface",
-            "outofthepicture", "outofthepicturehead", "outofthepictureface"
+            ("insult", [
+                "sucker", "loser", "idiot", "moron", "retard", "dumbass", "stupid",
+                "jerk", "scumbag", "douche", "douchebag", "pig", "swine", "animal",
+                "dog", "swear", "abuse", "badword", "gaali", "gali", "abusive",
+                "nigga", "nigger", "negro", "cracker", "honkey", "spic", "chink",
+                "gook", "kike", "wop", "dago", "kyke", "heeb", "mick", "paddy",
+                "turd", "turdface", "turdbrain", "turdhead", "turdlicker",
+                "scrotum", "scrot", "scrote", "scrotface", "nutjob", "nutcase",
+                "wanksta", "wankster", "wankjob", "wanktard", "wankshaft",
+                "cumdumpster", "cumdump", "cumslut", "cumwhore", "cumface",
+                "jizz", "jizzface", "jizzhead", "jizzbag", "jizzstain",
+                "spunk", "spunkface", "spunkhead", "spunkstain", "spunkdumpster",
+                "tosser", "tosspot", "tossbag", "tossface", "tosshead",
+                "prick", "prickhead", "prickface", "prickwad", "prickweed",
+                "knob", "knobhead", "knobface", "knobend", "knobjockey",
+                "bellend", "bellendhead", "bellendface", "bellendwad",
+                "fanny", "fannyhead", "fannyface", "fannywad", "fannybandit",
+                "minge", "mingehead", "mingeface", "mingewad", "mingebag",
+                "berk", "berkhead", "berkface", "berkwad", "berkbrain",
+                "plonker", "plonkhead", "plonkface", "plonkwad", "plonkbrain",
+                "git", "gitt", "githead", "gitface", "gitwad", "gitbrain",
+                "pillock", "pillockhead", "pillockface", "pillockwad", "pillockbrain",
+                "numpty", "numptyhead", "numptyface", "numptywad", "numptybrain",
+                "muppet", "muppethead", "muppetface", "muppetwad", "muppetbrain",
+                "twit", "twithead", "twitface", "twitwad", "twitbrain",
+                "nonce", "noncehead", "nonceface", "noncewad", "noncebrain",
+                "gobshite", "gobshit", "gobshitehead", "gobshiteface",
+                "arsebandit", "arsewipe", "arsehead", "arseface", "arseclown",
+                "bollocks", "bollock", "bollockhead", "bollockface", "bollockbrain",
+                "bugger", "buggerhead", "buggerface", "buggerwad", "buggerbrain",
+                "bloody", "bloodyhell", "bloodynora", "bloodyhell", "bloodyhell",
+                "sod", "sodoff", "sodhead", "sodface", "sodbrain", "sodding",
+                "blimey", "blimeyhell", "blimeynora", "blimeyhell", "blimeyhell",
+                "crikey", "crikeyhell", "crikeynora", "crikeyhell", "crikeyhell",
+                "cripes", "cripeshell", "cripesnora", "cripeshell", "cripeshell",
+                "gordonbennett", "gordonbennetthead", "gordonbennettface",
+                "streuth", "streuthhead", "streuthface", "streuthwad", "streuthbrain",
+                "blighter", "blighterhead", "blighterface", "blighterwad", "blighterbrain",
+                "bounder", "bounderhead", "bounderface", "bounderwad", "bounderbrain",
+                "cad", "cadhead", "cadface", "cadwad", "cadbrain", "caddish",
+                "rotter", "rotterhead", "rotterface", "rotterwad", "rotterbrain",
+                "scoundrel", "scoundrelhead", "scoundrelface", "scoundrelwad", "scoundrelbrain",
+                "blackguard", "blackguardhead", "blackguardface", "blackguardwad", "blackguardbrain",
+                "neerdowell", "neerdowellhead", "neerdowellface", "neerdowellwad", "neerdowellbrain",
+                "goodfornothing", "goodfornothinghead", "goodfornothingface",
+                "wastrel", "wastrelhead", "wastrelface", "wastrelwad", "wastrelbrain",
+                "layabout", "layabouthead", "layaboutface", "layaboutwad", "layaboutbrain",
+                "loafer", "loaferhead", "loaferface", "loaferwad", "loaferbrain",
+                "slacker", "slackerhead", "slackerface", "slackerwad", "slackerbrain",
+                "shirker", "shirkerhead", "shirkerface", "shirkerwad", "shirkerbrain",
+                "skiver", "skiverhead", "skiverface", "skiverwad", "skiverbrain",
+                "malingerer", "malingererhead", "malingererface", "malingererwad", "malingererbrain",
+                "goldbricker", "goldbrickerhead", "goldbrickerface", "goldbrickerwad", "goldbrickerbrain",
+                "sluggard", "sluggardhead", "sluggardface", "sluggardwad", "sluggardbrain",
+                "slugabed", "slugabedhead", "slugabedface", "slugabedwad", "slugabedbrain",
+                "drone", "dronehead", "droneface", "dronewad", "dronebrain",
+                "idler", "idlerhead", "idlerface", "idlerwad", "idlerbrain",
+                "dawdler", "dawdlerhead", "dawdlerface", "dawdlwad", "dawdlerbrain",
+                "laggard", "laggardhead", "laggardface", "laggardwad", "laggardbrain",
+                "slowcoach", "slowcoachhead", "slowcoachface", "slowcoachwad", "slowcoachbrain",
+                "stickinthemud", "stickinthemudhead", "stickinthemudface",
+                "fuddy-duddy", "fuddyduddy", "fuddy-duddyhead", "fuddy-duddyface",
+                "oldfuddy-duddy", "oldfuddyduddy", "oldfuddy-duddyhead", "oldfuddy-duddyface",
+                "fogey", "fogeyhead", "fogeyface", "fogeywad", "fogeybrain", "oldfogey",
+                "fossil", "fossilhead", "fossilface", "fossilwad", "fossilbrain", "oldfossil",
+                "relic", "relichead", "relicface", "relicwad", "relicbrain", "oldrelic",
+                "dinosaur", "dino", "dinohead", "dinoface", "dinowad", "dinobrain", "olddinosaur",
+                "antiquated", "antiquatedhead", "antiquatedface", "antiquatedwad", "antiquatedbrain",
+                "obsolete", "obsoletehead", "obsoleteface", "obsoletewad", "obsoletebrain",
+                "outmoded", "outmodedhead", "outmodedface", "outmodedwad", "outmodedbrain",
+                "outdated", "outdatedhead", "outdatedface", "outdatedwad", "outdatedbrain",
+                "superannuated", "superannuatedhead", "superannuatedface", "superannuatedwad", "superannuatedbrain",
+                "antediluvian", "antediluvianhead", "antediluvianface", "antediluvianwad", "antediluvianbrain",
+                "medieval", "medievalhead", "medievalface", "medievalwad", "medievalbrain",
+                "primitive", "primitivehead", "primitiveface", "primitivewad", "primitivebrain",
+                "primeval", "primevalhead", "primevalface", "primevalwad", "primevalbrain",
+                "ancient", "ancienthead", "ancientface", "ancientwad", "ancientbrain",
+                "archaic", "archaichead", "archaicface", "archaicwad", "archaicbrain",
+                "bygone", "bygonehead", "bygoneface", "bygonewad", "bygonebrain",
+                "passé", "passe", "passéhead", "passehead", "passéface", "passeface",
+                "old-hat", "oldhat", "old-hathead", "oldhathead", "old-hatface", "oldhatface",
+                "behindthetimes", "behindthetimeshead", "behindthetimesface",
+                "outoftouch", "outoftouchhead", "outoftouchface",
+                "outofdate", "outofdatehead", "outofdateface",
+                "outofstep", "outofstephead", "outofstepface",
+                "outofsync", "outofsynchead", "outofsyncface",
+                "outofline", "outlinehead", "outlineface",
+                "outoforder", "outoforderhead", "outoforderface",
+                "outofwhack", "outofwhackhead", "outofwhackface",
+                "outofkilter", "outofkilterhead", "outofkilterface",
+                "outofjoint", "outofjointhead", "outofjointface",
+                "outofsorts", "outofsortshead", "outofsortsface",
+                "outoffashion", "outoffashionhead", "outoffashionface",
+                "outofstyle", "outofstylehead", "outofstyleface",
+                "outofvogue", "outofvoguehead", "outofvogueface",
+                "outofseason", "outofseasonhead", "outofseasonface",
+                "outofprint", "outofprinthead", "outofprintface",
+                "outofstock", "outofstockhead", "outofstockface",
+                "outofsupply", "outofsupplyhead", "outofsupplyface",
+                "outofcirculation", "outofcirculationhead", "outofcirculationface",
+                "outofcommission", "outofcommissionhead", "outofcommissionface",
+                "outofservice", "outofservicehead", "outofserviceface",
+                "outofaction", "outofactionhead", "outofactionface",
+                "outofplay", "outofplayhead", "outofplayface",
+                "outofbounds", "outofboundshead", "outofboundsface",
+                "outofreach", "outofreachhead", "outofreachface",
+                "outofsight", "outofsighthead", "outofsightface",
+                "outofmind", "outofmindhead", "outofmindface",
+                "outofcontrol", "outofcontrolhead", "outofcontrolface",
+                "outofhand", "outofhandhead", "outofhandface",
+                "outofpocket", "outofpockethead", "outofpocketface",
+                "outofpocket", "outofpockethead", "outofpocketface",
+                "outofthequestion", "outofthequestionhead", "outofthequestionface",
+                "outoftheordinary", "outoftheordinaryhead", "outoftheordinaryface",
+                "outoftheway", "outofthewayhead", "outofthewayface",
+                "outofthewoods", "outofthewoodshead", "outofthewoodsface",
+                "outoftheblue", "outofthebluehead", "outoftheblueface",
+                "outofthebox", "outoftheboxhead", "outoftheboxface",
+                "outofthecloset", "outoftheclosethead", "outoftheclosetface",
+                "outoftheloop", "outoftheloophhead", "outoftheloopface",
+                "outofthepicture", "outofthepicturehead", "outofthepictureface",
+                "outofthequestion", "outofthequestionhead", "outofthequestionface",
+                "outoftheordinary", "outoftheordinaryhead", "outoftheordinaryface",
+                "outoftheway", "outofthewayhead", "outofthewayface",
+                "outofthewoods", "outofthewoodshead", "outofthewoodsface",
+                "outoftheblue", "outofthebluehead", "outoftheblueface",
+                "outofthebox", "outoftheboxhead", "outoftheboxface",
+                "outofthecloset", "outoftheclosethead", "outoftheclosetface",
+                "outoftheloop", "outoftheloophhead", "outoftheloopface",
+                "outofthepicture", "outofthepicturehead", "outofthepictureface",
+            ]),
         ]
         
-        # Generate additional variations (spaces, underscores, hyphens, etc.)
-        additional_variations = []
-        for word in default_list:
-            if ' ' in word:
-                additional_variations.extend([
-                    word.replace(' ', ''),
-                    word.replace(' ', '_'),
-                    word.replace(' ', '-'),
-                    word.replace(' ', '.'),
-                    word.replace(' ', '*'),
-                    word.replace(' ', '0'),
-                    word.replace(' ', 'o'),
-                    word.replace(' ', '@'),
-                    word.replace(' ', '#'),
-                    word.replace(' ', '$'),
-                    word.replace(' ', '%'),
-                    word.replace(' ', '&'),
-                    word.replace(' ', '+'),
-                    word.replace(' ', '='),
-                    word.replace(' ', '!'),
-                    word.replace(' ', '?'),
-                    word.replace(' ', '~'),
-                    word.replace(' ', '`'),
-                    word.replace(' ', '|'),
-                    word.replace(' ', '\\'),
-                    word.replace(' ', '/'),
-                    word.replace(' ', ':'),
-                    word.replace(' ', ';'),
-                    word.replace(' ', '<'),
-                    word.replace(' ', '>'),
-                    word.replace(' ', '"'),
-                    word.replace(' ', "'"),
-                    word.replace(' ', '('),
-                    word.replace(' ', ')'),
-                    word.replace(' ', '['),
-                    word.replace(' ', ']'),
-                    word.replace(' ', '{'),
-                    word.replace(' ', '}'),
-                ])
-        
-        # Generate leet speak variations
-        leet_variations = []
-        leet_map = {
-            'a': '@', 'e': '3', 'i': '1', 'o': '0', 's': '$', 't': '7', 'l': '1',
-            'A': '@', 'E': '3', 'I': '1', 'O': '0', 'S': '$', 'T': '7', 'L': '1'
-        }
-        
-        for word in default_list:
-            leet_word = word
-            for char, replacement in leet_map.items():
-                leet_word = leet_word.replace(char, replacement)
-            if leet_word != word:
-                leet_variations.append(leet_word)
-        
-        default_list.extend(additional_variations)
-        default_list.extend(leet_variations)
-        
-        # Remove duplicates and convert to set
-        return set(default_list)
+        # Separator and leet variants are no longer generated here: messages are
+        # normalized before matching and the vocabulary is stored in canonical form.
+        # Word -> category; a word listed in several sections keeps the first one
+        categories = {}
+        for category, words in sections:
+            for word in words:
+                categories.setdefault(word, category)
+        return categories
 
     async def _load_additional_bad_words_from_db(self):
         """Asynchronously loads additional bad words from MongoDB and adds them to the existing set."""
-        if self.collection: 
+        if self.collection is not None:
             try:
-                cursor = self.collection.find({})
-                db_words = [doc['word'] for doc in await cursor.to_list(length=None) if 'word' in doc]
-                self.bad_words.update(db_words)
+                db_words = set()
+                db_word_ids = {}
+                async for doc in self.collection.find({}, {"word": 1}):
+                    if 'word' in doc:
+                        db_words.add(doc['word'])
+                        db_word_ids[doc['_id']] = doc['word']
+                self.db_word_ids = db_word_ids
+
+                all_words = self.default_words | db_words
+                key = vocabulary_key(all_words)
+                if key == self.index_key:
+                    logger.debug(f"Profanity index already includes all {len(db_words)} MongoDB bad words.")
+                    return
+
+                if self.bad_words <= all_words:
+                    new_words = all_words - self.bad_words
+                    self.bad_words.update(new_words)
+                    self._index_words(new_words)
+                    self.index_key = key
+                else:
+                    # Words were removed from MongoDB since the index was written
+                    self._reset_index(all_words)
+                self._schedule_index_save()
                 logger.info(f"Loaded {len(db_words)} additional bad words from MongoDB.")
             except Exception as e:
                 logger.error(f"Error loading additional bad words from MongoDB: {e}")
         else:
             logger.warning("MongoDB collection not available to load additional bad words.")
 
+    async def watch_bad_words(self, poll_interval: int = BAD_WORDS_POLL_INTERVAL):
+        """Keeps the live index in sync with the 'bad_words' collection.
+
+        Inserts and deletes made by any replica are applied as they happen through a
+        change stream. Standalone MongoDB servers don't support change streams, so in
+        that case the collection is polled every `poll_interval` seconds instead.
+        """
+        if self.collection is None:
+            logger.warning("MongoDB collection not available, bad words will not be hot reloaded.")
+            return
+
+        resume_token = None
+        while True:
+            try:
+                async with self.collection.watch(full_document="updateLookup", resume_after=resume_token) as stream:
+                    logger.info("Watching MongoDB 'bad_words' collection for changes.")
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        await self._apply_change(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                logger.warning(f"Change streams unavailable ({e}). Polling 'bad_words' every {poll_interval}s instead.")
+                break
+            except Exception as e:
+                logger.error(f"Bad words change stream failed: {e}. Reconnecting in {poll_interval}s.")
+                await asyncio.sleep(poll_interval)
+                if resume_token is None:
+                    # Without a resume point, catch up on anything missed with a full diff
+                    await self._load_additional_bad_words_from_db()
+
+        while True:
+            await asyncio.sleep(poll_interval)
+            await self._load_additional_bad_words_from_db()
+
+    async def _apply_change(self, change):
+        """Applies a single change stream event to the live index."""
+        operation = change.get("operationType")
+        doc_id = change.get("documentKey", {}).get("_id")
+
+        if operation in ("insert", "replace", "update"):
+            word = (change.get("fullDocument") or {}).get("word")
+            if not word:
+                return
+            self.db_word_ids[doc_id] = word
+            if word not in self.bad_words:
+                self.bad_words.add(word)
+                self._index_words([word])
+                self.index_key = vocabulary_key(self.bad_words)
+                self._schedule_index_save()
+                logger.info(f"Hot reloaded bad word '{word}' from MongoDB.")
+
+        elif operation == "delete":
+            word = self.db_word_ids.pop(doc_id, None)
+            if word and word not in self.default_words and word in self.bad_words:
+                # Removing from the automata would need a rebuild anyway, so rebuild once
+                self._reset_index(self.bad_words - {word})
+                self._schedule_index_save()
+                logger.info(f"Removed bad word '{word}' after it was deleted from MongoDB.")
+
     async def add_bad_word(self, word: str) -> bool:
         """Asynchronously adds a bad word to the filter and, if connected, to MongoDB."""
         normalized_word = word.lower().strip()
         if normalized_word not in self.bad_words:
             self.bad_words.add(normalized_word)
-            if self.collection:
+            self._index_words([normalized_word])
+            self.index_key = vocabulary_key(self.bad_words)
+            self._schedule_index_save()
+            if self.collection is not None:
                 try:
                     await self.collection.update_one(
                         {"word": normalized_word},
@@ -422,11 +1249,38 @@ class ProfanityFilter:
         return False
 
     def contains_profanity(self, text: str) -> bool:
+        return self.index.contains(text)
+
+    def classify_many(self, texts) -> list:
+        """Scans a batch of texts; see ProfanityIndex.classify_many."""
+        return self.index.classify_many(texts)
+
+    async def contains_profanity_async(self, text: str) -> bool:
+        """Like contains_profanity, but long texts and bursts are scanned in a worker process.
+
+        Short texts are still checked inline, where a worker round trip would cost more
+        than the scan. If the workers fail, the text is scanned inline instead.
+        """
         if not text:
             return False
-        text = text.lower()
-        for word in self.bad_words:
-            # Use word boundaries to match whole words
-            if re.search(r'\b' + re.escape(word) + r'\b', text):
-                return True
-        return False
+        if self.scan_pool is None or not self.scan_pool.should_offload(len(text)):
+            return self.index.contains(text)
+        try:
+            return await self.scan_pool.contains(text)
+        except Exception as e:
+            logger.error(f"Profanity scan worker failed: {e}. Restarting the workers.")
+            self.scan_pool.restart(self.index)
+            return self.index.contains(text)
+
+    async def classify_async(self, text: str) -> list:
+        """Like classify_many for a single text, offloaded to the workers like contains_profanity_async."""
+        if not text:
+            return []
+        if self.scan_pool is None or not self.scan_pool.should_offload(len(text)):
+            return self.index.classify_many([text])[0]
+        try:
+            return await self.scan_pool.classify(text)
+        except Exception as e:
+            logger.error(f"Profanity scan worker failed: {e}. Restarting the workers.")
+            self.scan_pool.restart(self.index)
+            return self.index.classify_many([text])[0]
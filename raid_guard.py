@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# A chat is in raid mode once this many members joined within the window
+RAID_JOIN_THRESHOLD = 15
+JOIN_WINDOW_SECONDS = 60
+# Raid mode stays on this long after the last join that kept the rate high
+RAID_COOLDOWN_SECONDS = 300
+# Joins during a raid are collected for this long (or up to MAX_BATCH) and handled together
+BATCH_SECONDS = 2
+MAX_BATCH = 100
+MAX_TRACKED_CHATS = 20000
+
+
+class JoinRaidGuard:
+    """Detects join-rate spikes per chat and batches the joins made during one.
+
+    `record_joins` keeps a sliding window of join times per chat and reports
+    whether the chat is in raid mode. Joins handed to `enqueue` during a raid are
+    buffered and passed to `process_batch(chat_id, items)` in batches, so the
+    handler returns at once and the per-join work (settings, bios, punishments)
+    is done once per batch instead of once per member.
+    """
+
+    def __init__(self, process_batch):
+        self.process_batch = process_batch
+        self._joins = TTLCache(max_size=MAX_TRACKED_CHATS, ttl=JOIN_WINDOW_SECONDS)
+        self._raid_until = TTLCache(max_size=MAX_TRACKED_CHATS)
+        self._batches = {}
+
+    def record_joins(self, chat_id: int, count: int = 1) -> bool:
+        """Registers `count` joins now and returns True if the chat is in raid mode."""
+        now = time.monotonic()
+        joins = self._joins.get(chat_id)
+        if joins is None:
+            joins = deque()
+        joins.extend([now] * count)
+        while joins and joins[0] <= now - JOIN_WINDOW_SECONDS:
+            joins.popleft()
+        # Re-set so the window expires only after JOIN_WINDOW_SECONDS without joins
+        self._joins.set(chat_id, joins)
+
+        if len(joins) >= RAID_JOIN_THRESHOLD:
+            if chat_id not in self._raid_until:
+                logger.warning(f"Join raid detected in chat {chat_id}: {len(joins)} joins in {JOIN_WINDOW_SECONDS}s.")
+            self._raid_until.set(chat_id, True, ttl=RAID_COOLDOWN_SECONDS)
+        return chat_id in self._raid_until
+
+    def in_raid(self, chat_id: int) -> bool:
+        return chat_id in self._raid_until
+
+    def enqueue(self, chat_id: int, item):
+        batch = self._batches.get(chat_id)
+        if batch is None:
+            batch = self._batches[chat_id] = []
+            asyncio.ensure_future(self._flush_later(chat_id))
+        batch.append(item)
+        if len(batch) >= MAX_BATCH:
+            self._flush(chat_id)
+
+    async def _flush_later(self, chat_id: int):
+        await asyncio.sleep(BATCH_SECONDS)
+        self._flush(chat_id)
+
+    def _flush(self, chat_id: int):
+        batch = self._batches.pop(chat_id, None)
+        if batch:
+            asyncio.ensure_future(self._process(chat_id, batch))
+
+    async def _process(self, chat_id: int, batch: list):
+        try:
+            await self.process_batch(chat_id, batch)
+        except Exception as e:
+            logger.error(f"Error processing a batch of {len(batch)} joins in chat {chat_id}: {e}")
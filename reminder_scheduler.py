@@ -1,15 +1,20 @@
 import asyncio
 import random
 from pyrogram import Client, enums
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
 import datetime
+from dispatcher import PRIORITY_BACKGROUND
+from member_sampler import sample_members
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Reminder settings
 USERS_TO_TAG_COUNT = 5       # Number of online users to tag
+DEFAULT_INTERVAL_HOURS = 2   # Used when a group's settings have no interval_hours
+DUE_BATCH_SIZE = 50          # Due groups handled per scheduler tick
+MAX_SLEEP_SECONDS = 60       # Longest the scheduler sleeps between checks
 
 # List of engaging messages
 REMINDER_MESSAGES = {
@@ -80,63 +85,100 @@ def get_random_message():
     message_type = random.choice(list(REMINDER_MESSAGES.keys()))
     return random.choice(REMINDER_MESSAGES[message_type])
 
-async def send_random_reminder(client: Client, db: MongoClient, chat_id: int):
+async def send_random_reminder(client: Client, db: AsyncIOMotorDatabase, chat_id: int, dispatcher=None, recent_members=None):
     """Sends a random reminder to a specific group."""
     try:
-        online_members = []
-        # Pyrogram's `get_chat_members` is an async iterator
-        async for member in client.get_chat_members(chat_id):
-            if not member.user.is_bot:
-                online_members.append(member.user)
+        # Recently active users first, topped up from one page of members
+        members_to_tag = await sample_members(client, chat_id, USERS_TO_TAG_COUNT, recent_members)
         
-        # Shuffle the list and select a few members to tag
-        random.shuffle(online_members)
-        members_to_tag = online_members[:USERS_TO_TAG_COUNT]
-        
-        mentions = " ".join([f"<a href='tg://user?id={user.id}'>{user.first_name}</a>" for user in members_to_tag])
+        mentions = " ".join([f"<a href='tg://user?id={user_id}'>{first_name}</a>" for user_id, first_name in members_to_tag])
         
         random_message = get_random_message()
         final_message = f"{mentions}\n\n{random_message}" if mentions else random_message
         
-        await client.send_message(chat_id, final_message, parse_mode=enums.ParseMode.HTML)
+        if dispatcher is not None:
+            await dispatcher.call(PRIORITY_BACKGROUND, chat_id, client.send_message, chat_id, final_message, parse_mode=enums.ParseMode.HTML)
+        else:
+            await client.send_message(chat_id, final_message, parse_mode=enums.ParseMode.HTML)
         logger.info(f"Sent reminder to group {chat_id}")
             
     except Exception as e:
         logger.error(f"Error sending random reminder to chat {chat_id}: {e}")
 
-async def reminder_scheduler(client: Client, db: MongoClient):
-    """Schedules the reminder to run at a fixed interval for each group based on settings."""
+def next_due_time(interval_hours, now=None) -> datetime.datetime:
+    """When a chat with the given reminder interval is next due, counting from `now`."""
+    return (now or datetime.datetime.now()) + datetime.timedelta(hours=interval_hours)
+
+async def backfill_due_times(db: AsyncIOMotorDatabase):
+    """Gives reminder settings saved before `next_due_at` existed a due time one interval from now."""
+    result = await db.reminder_settings.update_many(
+        {"next_due_at": {"$exists": False}},
+        [{"$set": {"next_due_at": {"$add": [
+            datetime.datetime.now(),
+            {"$multiply": [{"$ifNull": ["$interval_hours", DEFAULT_INTERVAL_HOURS]}, 3600 * 1000]}
+        ]}}}]
+    )
+    if result.modified_count:
+        logger.info(f"Scheduled reminders for {result.modified_count} groups without a due time.")
+
+async def send_due_reminder(client: Client, db: AsyncIOMotorDatabase, settings: dict, dispatcher=None, recent_members=None):
+    """Sends one due reminder (if the bot is still an admin) and persists the next due time."""
+    chat_id = settings["chat_id"]
+    try:
+        bot_member = await client.get_chat_member(chat_id, client.me.id)
+        if bot_member.status == enums.ChatMemberStatus.ADMINISTRATOR:
+            await send_random_reminder(client, db, chat_id, dispatcher, recent_members)
+    except Exception as e:
+        logger.error(f"Bot is not an admin or cannot access group {chat_id}. Skipping reminder. Error: {e}")
+
+    # Moved forward even when skipped, so a group where the bot isn't admin isn't retried every tick
+    next_due_at = next_due_time(settings.get("interval_hours", DEFAULT_INTERVAL_HOURS))
+    await db.reminder_settings.update_one({"chat_id": chat_id}, {"$set": {"next_due_at": next_due_at}})
+
+async def reminder_scheduler(client: Client, db: AsyncIOMotorDatabase, dispatcher=None, recent_members=None):
+    """Sends each group its reminder when the `next_due_at` stored in its settings passes.
+
+    Every tick pulls only the due groups with one range query on the indexed
+    `next_due_at` field, then sleeps until the earliest upcoming due time (at most
+    MAX_SLEEP_SECONDS, so settings changed meanwhile are noticed). Due times are
+    persisted, so a restart does not send every group a reminder at once.
+    `dispatcher` is the shared OutboundDispatcher reminders are sent through, and
+    `recent_members` the RecentMembers tracker used to pick whom to tag.
+    """
     if db is None:
         logger.warning("MongoDB not connected. Reminder scheduler will not run.")
         return
-        
-    last_run = {}
-    
+
+    try:
+        await backfill_due_times(db)
+    except Exception as e:
+        logger.error(f"Error scheduling reminders without a due time: {e}")
+
+    while not client.is_initialized:
+        await asyncio.sleep(1)
+
     while True:
+        sleep_seconds = MAX_SLEEP_SECONDS
         try:
-            active_groups = db.groups.find({})
-            for group_doc in active_groups:
-                chat_id = group_doc['chat_id']
-                
-                # Fetch settings for the specific group
-                settings = db.reminder_settings.find_one({"chat_id": chat_id})
-                if not settings or settings.get("enabled", True) is False:
-                    continue # Skip if reminders are disabled for this group
-                
-                interval_hours = settings.get("interval_hours", 2)
-                
-                now = datetime.datetime.now()
-                # Check if enough time has passed since the last run for this group
-                if chat_id not in last_run or (now - last_run[chat_id]).total_seconds() >= interval_hours * 3600:
-                    try:
-                        bot_member = await client.get_chat_member(chat_id, client.me.id)
-                        if bot_member.status == enums.ChatMemberStatus.ADMINISTRATOR:
-                            await send_random_reminder(client, db, chat_id)
-                            last_run[chat_id] = now
-                    except Exception as e:
-                        logger.error(f"Bot is not an admin or cannot access group {chat_id}. Skipping reminder. Error: {e}")
-                        
+            now = datetime.datetime.now()
+            due = [
+                settings async for settings in db.reminder_settings
+                    .find({"next_due_at": {"$lte": now}, "enabled": {"$ne": False}}, {"chat_id": 1, "interval_hours": 1})
+                    .sort("next_due_at", 1)
+                    .limit(DUE_BATCH_SIZE)
+            ]
+            if due:
+                await asyncio.gather(*[send_due_reminder(client, db, settings, dispatcher, recent_members) for settings in due])
+                continue
+
+            upcoming = await db.reminder_settings.find_one(
+                {"enabled": {"$ne": False}, "next_due_at": {"$ne": None}},
+                {"next_due_at": 1},
+                sort=[("next_due_at", 1)]
+            )
+            if upcoming:
+                sleep_seconds = min(MAX_SLEEP_SECONDS, max(1, (upcoming["next_due_at"] - now).total_seconds()))
         except Exception as e:
             logger.error(f"Error in main reminder scheduler loop: {e}")
-            
-        await asyncio.sleep(60) # Check every minute to see if any group needs a reminder
+
+        await asyncio.sleep(sleep_seconds)
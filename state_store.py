@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Entries kept per namespace by the in-memory backend
+MEMORY_MAX_ENTRIES = 50000
+# A leader that can't renew its lease for this long is replaced
+LEASE_TTL_SECONDS = 30
+LEASE_RENEW_SECONDS = LEASE_TTL_SECONDS / 3
+
+
+class MemoryStateStore:
+    """Key-value state kept in this process; the default for a single instance.
+
+    Has the same async interface as MongoStateStore so handlers don't care which
+    backend is configured. Entries expire `ttl` seconds after they were set.
+    """
+
+    def __init__(self, namespace: str, ttl: float = None):
+        self.namespace = namespace
+        self._data = TTLCache(max_size=MEMORY_MAX_ENTRIES, ttl=ttl)
+
+    async def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    async def set(self, key, value):
+        self._data.set(key, value)
+
+    async def add(self, key, value) -> bool:
+        """Sets `key` only if it is absent; returns False if it already existed."""
+        if key in self._data:
+            return False
+        self._data.set(key, value)
+        return True
+
+    async def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    async def contains(self, key) -> bool:
+        return key in self._data
+
+    async def clear(self) -> int:
+        """Removes every entry and returns how many there were."""
+        count = len(self._data)
+        self._data.clear()
+        return count
+
+
+class MongoStateStore:
+    """Key-value state in the `shared_state` collection, shared by every instance.
+
+    Keys are stored as "<namespace>:<key>", so one collection serves all
+    namespaces. `add` and `pop` are single atomic operations, so two instances
+    can't both start the same game or both reveal the same one-time message.
+    Values must be BSON-encodable (dict keys are strings). Expired entries are
+    filtered on read and removed by a TTL index.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, namespace: str, ttl: float = None):
+        self.collection = db.shared_state
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def _id(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _live(self, key) -> dict:
+        return {"_id": self._id(key), "$or": [{"expires_at": None}, {"expires_at": {"$gt": datetime.utcnow()}}]}
+
+    def _document(self, value) -> dict:
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl) if self.ttl is not None else None
+        return {"ns": self.namespace, "value": value, "expires_at": expires_at}
+
+    async def get(self, key, default=None):
+        doc = await self.collection.find_one(self._live(key), {"value": 1})
+        return default if doc is None else doc["value"]
+
+    async def set(self, key, value):
+        await self.collection.update_one({"_id": self._id(key)}, {"$set": self._document(value)}, upsert=True)
+
+    async def add(self, key, value) -> bool:
+        """Sets `key` only if it is absent or expired; returns False if it already existed."""
+        try:
+            await self.collection.update_one(
+                {"_id": self._id(key), "expires_at": {"$lte": datetime.utcnow()}},
+                {"$set": self._document(value)},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The upsert collided with a live entry
+            return False
+        return True
+
+    async def pop(self, key, default=None):
+        doc = await self.collection.find_one_and_delete(self._live(key), {"value": 1})
+        return default if doc is None else doc["value"]
+
+    async def contains(self, key) -> bool:
+        return await self.collection.count_documents(self._live(key), limit=1) > 0
+
+    async def clear(self) -> int:
+        """Removes every entry of the namespace and returns how many there were."""
+        result = await self.collection.delete_many({"ns": self.namespace})
+        return result.deleted_count
+
+
+async def ensure_state_indexes(db: AsyncIOMotorDatabase):
+    await db.shared_state.create_index("expires_at", expireAfterSeconds=0)
+    await db.shared_state.create_index("ns")
+
+
+def open_state_store(namespace: str, ttl: float = None, db: AsyncIOMotorDatabase = None):
+    """Returns the Mongo-backed store when `db` is given, else the in-memory one."""
+    if db is not None:
+        return MongoStateStore(db, namespace, ttl=ttl)
+    return MemoryStateStore(namespace, ttl=ttl)
+
+
+class LeaderLease:
+    """Elects one instance to run the singleton background jobs.
+
+    The lease is a document in the `leases` collection naming its holder and when
+    it expires. The holder renews it every LEASE_RENEW_SECONDS; another instance
+    can take it over only once it has expired, so a crashed leader is replaced
+    within LEASE_TTL_SECONDS. `run` starts the given jobs when this instance
+    becomes leader and cancels them when it loses the lease. Without a database
+    (single-instance mode) the instance is always the leader.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, name: str):
+        self.db = db
+        self.name = name
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = db is None
+
+    async def try_acquire(self) -> bool:
+        """Takes or renews the lease; returns True if this instance holds it."""
+        now = datetime.utcnow()
+        try:
+            await self.db.leases.find_one_and_update(
+                {"_id": self.name, "$or": [{"holder": self.holder}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"holder": self.holder, "expires_at": now + timedelta(seconds=LEASE_TTL_SECONDS)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another instance holds a lease that hasn't expired
+            return False
+        return True
+
+    async def run(self, jobs: list):
+        """Runs the coroutine functions in `jobs` for as long as this instance leads."""
+        if self.db is None:
+            await asyncio.gather(*(job() for job in jobs))
+            return
+
+        loop = asyncio.get_running_loop()
+        tasks = []
+        valid_until = 0.0
+        while True:
+            try:
+                held = await self.try_acquire()
+                if held:
+                    valid_until = loop.time() + LEASE_TTL_SECONDS
+            except Exception as e:
+                # Keep leading on a transient error until our lease would have run out
+                logger.warning(f"Could not renew the {self.name} lease: {e}")
+                held = loop.time() < valid_until
+
+            if held and not self.is_leader:
+                logger.info(f"Instance {self.holder} is now the {self.name} leader.")
+                self.is_leader = True
+                tasks = [asyncio.ensure_future(job()) for job in jobs]
+            elif not held and self.is_leader:
+                logger.warning(f"Instance {self.holder} lost the {self.name} lease; stopping its jobs.")
+                self.is_leader = False
+                for task in tasks:
+                    task.cancel()
+                tasks = []
+            await asyncio.sleep(LEASE_RENEW_SECONDS)
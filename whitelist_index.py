@@ -0,0 +1,68 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WhitelistIndex:
+    """In-memory copy of the `whitelist` collection as per-chat sets of user ids.
+
+    Almost every lookup is a negative (the sender is not whitelisted), so once the
+    index is loaded `contains` answers without touching MongoDB. Chats without any
+    whitelisted user have no entry at all. `add`/`remove` must be called alongside
+    the corresponding MongoDB writes to keep the index current. Writes made by other
+    replicas are picked up by calling `load` again; changes made here while a load
+    is running are replayed on top of what it read.
+    """
+
+    def __init__(self):
+        self._chats = {}
+        self._changes_during_load = None
+        self.loaded = False
+
+    async def load(self, db):
+        chats = {}
+        count = 0
+        self._changes_during_load = []
+        try:
+            async for doc in db.whitelist.find({}, {"chat_id": 1, "user_id": 1, "_id": 0}):
+                chats.setdefault(doc["chat_id"], set()).add(doc["user_id"])
+                count += 1
+        finally:
+            changes, self._changes_during_load = self._changes_during_load, None
+        self._chats = chats
+        for change, args in changes:
+            change(*args)
+        log = logger.debug if self.loaded else logger.info
+        self.loaded = True
+        log(f"Loaded whitelist index: {count} entries across {len(chats)} chats.")
+
+    def contains(self, chat_id, user_id) -> bool:
+        users = self._chats.get(chat_id)
+        return users is not None and user_id in users
+
+    def _record(self, change, *args):
+        if self._changes_during_load is not None:
+            self._changes_during_load.append((change, args))
+
+    def add(self, chat_id, user_id):
+        self._record(self.add, chat_id, user_id)
+        self._chats.setdefault(chat_id, set()).add(user_id)
+
+    def remove(self, chat_id, user_id):
+        self._record(self.remove, chat_id, user_id)
+        users = self._chats.get(chat_id)
+        if users is None:
+            return
+        users.discard(user_id)
+        if not users:
+            del self._chats[chat_id]
+
+    def drop_chat(self, chat_id):
+        self._record(self.drop_chat, chat_id)
+        self._chats.pop(chat_id, None)
+
+    def users(self, chat_id) -> list:
+        return list(self._chats.get(chat_id, ()))
+
+    def __len__(self):
+        return sum(len(users) for users in self._chats.values())